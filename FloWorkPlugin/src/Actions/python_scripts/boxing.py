@@ -1,91 +1,91 @@
+import argparse
 import cv2
 import mediapipe as mp
-import numpy as np
-import math
 import random
 import platform
-import pygame
+from frame_grabber import LatestFrameGrabber, open_source
+from roi_tracker import RoiHandTracker
+from flow_tracker import FlowHandTracker
+from frame_buffers import to_rgb, mirror_result
+from inference_backend import make_hand_backend, add_backend_args
+from boxing_overlay import BoxingOverlay
+from crack_effects import CrackEffects, crack_segments
+from punch_detector import PunchDetector, PUNCH_TYPES
+from sound_bank import SoundBank
 
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
+USE_ROI_TRACKER = False  # run the model on a crop around last frame's hand
+ROI_INPUT_SIZE = 256
+MAX_HANDS = 2  # each hand has its own punch track
+USE_FLOW_TRACKER = False  # model on keyframes only, optical flow in between
+FLOW_MAX_INTERVAL = 6
+
+# everything is timed in seconds from the capture timestamps, so the game plays
+# the same at any camera / inference rate
+INFERENCE_HZ = None  # run the hand model at most this often (None: every frame)
+HIT_TEXT_SEC = 3.0  # hit label fade-out, was 90 frames
+CRACK_FADE_PER_SEC = (0.24, 0.45)  # crack alpha lost per second, was 0.008..0.015 per frame
+
+# --backend legacy (mp.solutions, blocking), tasks (MediaPipe Tasks, LIVE_STREAM)
+# or process (mp.solutions in --workers N processes)
+args = add_backend_args(argparse.ArgumentParser("boxing")).parse_args()
+if (USE_ROI_TRACKER or USE_FLOW_TRACKER) and args.backend != "legacy":
+    print(f"ROI / flow tracking need the legacy backend, {args.backend} runs on every full frame")
+    USE_ROI_TRACKER = USE_FLOW_TRACKER = False
+
+def make_detector(make_hands):
+    detector = make_hands()
+    if USE_ROI_TRACKER:
+        detector = RoiHandTracker(detector, make_hands(), input_size=ROI_INPUT_SIZE, max_hands=MAX_HANDS)
+    if USE_FLOW_TRACKER:
+        detector = FlowHandTracker(detector, max_interval=FLOW_MAX_INTERVAL)
+    return detector
+
+backend = make_hand_backend(
+    args.backend,
+    max_hands=MAX_HANDS,
+    min_detection=0.5,
+    min_tracking=0.5,
+    model_path=args.hand_model,
+    wrap=make_detector,
+    workers=args.workers
 )
 
-cap = cv2.VideoCapture(1)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+CAMERA_SOURCE = 1  # camera index, "synthetic" or a video file path
+cap = LatestFrameGrabber(open_source(CAMERA_SOURCE, 1280, 720)).start()
 
-pygame.mixer.init()
-punch_sound = pygame.mixer.Sound(r"D:\MeiPlugin\src\Actions\python_scripts\punch.wav") 
+# every hit sound decoded up front, played on its own mixer channel; silent
+# when there is no audio device
+sounds = SoundBank()
 
 class TextDisplay:
     def __init__(self):
         self.active_texts = []
 
-    def add_text(self, text, position, color, duration=60):
+    def add_text(self, text, position, color, t, duration=2.0):
         self.active_texts.append({
             'text': text,
             'position': position,
             'color': color,
-            'duration': duration,
-            'original_duration': duration
+            'start': t,
+            'duration': duration
         })
 
-    def update_and_draw(self, frame):
+    def update_and_draw(self, overlay, t):
         texts_to_remove = []
         for i, text_data in enumerate(self.active_texts):
-            alpha = text_data['duration'] / text_data['original_duration']
+            alpha = 1.0 - (t - text_data['start']) / text_data['duration']
             if alpha > 0:
-                color = tuple(int(c * alpha) for c in text_data['color'])
-                
-                cv2.putText(frame, text_data['text'], 
-                            (text_data['position'][0] + 3, text_data['position'][1] + 3),
-                            cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 8)
-                
-                cv2.putText(frame, text_data['text'], text_data['position'],
-                            cv2.FONT_HERSHEY_SIMPLEX, 2, color, 5)
-                text_data['duration'] -= 1
+                # pre-rendered once per (text, colour), faded with a lookup table
+                overlay.draw_hit_text(text_data['text'], text_data['position'],
+                                      text_data['color'], min(alpha, 1.0))
             else:
                 texts_to_remove.append(i)
         for i in reversed(texts_to_remove):
             self.active_texts.pop(i)
 
-def create_crack_lines(center, num_lines=8, max_length=100):
-    lines = []
-    for i in range(num_lines):
-        angle = random.uniform(0, 2 * math.pi)
-        length = random.uniform(20, max_length)
-        end_x = int(center[0] + math.cos(angle) * length)
-        end_y = int(center[1] + math.sin(angle) * length)
-        lines.append([(center[0], center[1]), (end_x, end_y)])
-        if random.random() < 0.6:
-            branch_length = length * random.uniform(0.3, 0.7)
-            branch_angle = angle + random.uniform(-0.5, 0.5)
-            branch_start_ratio = random.uniform(0.3, 0.8)
-            branch_start_x = int(center[0] + math.cos(angle) * length * branch_start_ratio)
-            branch_start_y = int(center[1] + math.sin(angle) * length * branch_start_ratio)
-            branch_end_x = int(branch_start_x + math.cos(branch_angle) * branch_length)
-            branch_end_y = int(branch_start_y + math.sin(branch_angle) * branch_length)
-            lines.append([(branch_start_x, branch_start_y), (branch_end_x, branch_end_y)])
-    return lines
-
-def draw_screen_cracks(frame, crack_effects):
-    for crack_data in crack_effects:
-        lines = crack_data['lines']
-        alpha = crack_data['alpha']
-        for line in lines:
-            start_point = line[0]
-            end_point = line[1]
-            intensity = int(255 * alpha)
-            cv2.line(frame, start_point, end_point, (intensity, intensity, 255), 4)
-            cv2.line(frame, start_point, end_point, (255, 255, 255), 2)
-    return frame
-
 def setup_transparent_window():
     window_name = "Boxing Game"
     cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
@@ -106,154 +106,73 @@ def setup_transparent_window():
             win32gui.SetLayeredWindowAttributes(hwnd, 0x000000, 0, win32con.LWA_COLORKEY)
     return window_name
 
-def create_transparent_background(width, height):
-    
-    return np.zeros((height, width, 3), dtype=np.uint8)
-
-def is_fist(hand_landmarks):
-    landmarks = hand_landmarks.landmark
-    finger_tips = [4, 8, 12, 16, 20]
-    finger_pips = [3, 6, 10, 14, 18]
-    finger_mcp = [2, 5, 9, 13, 17]
-    wrist = landmarks[0]
-    bent_fingers = 0
-    for i in range(1, 5):
-        tip = landmarks[finger_tips[i]]
-        pip = landmarks[finger_pips[i]]
-        mcp = landmarks[finger_mcp[i]]
-        tip_to_wrist = ((tip.x - wrist.x) ** 2 + (tip.y - wrist.y) ** 2) ** 0.5
-        pip_to_wrist = ((pip.x - wrist.x) ** 2 + (pip.y - wrist.y) ** 2) ** 0.5
-        if tip_to_wrist < pip_to_wrist:
-            bent_fingers += 1
-        if tip.y > mcp.y:
-            bent_fingers += 0.5
-    thumb_tip = landmarks[4]
-    thumb_mcp = landmarks[2]
-    thumb_to_wrist = ((thumb_tip.x - wrist.x) ** 2 + (thumb_tip.y - wrist.y) ** 2) ** 0.5
-    thumb_mcp_to_wrist = ((thumb_mcp.x - wrist.x) ** 2 + (thumb_mcp.y - wrist.y) ** 2) ** 0.5
-    if thumb_to_wrist < thumb_mcp_to_wrist * 1.1:
-        bent_fingers += 1
-    return bent_fingers >= 3.5
-
-def calculate_hand_compactness(hand_landmarks):
-    landmarks = hand_landmarks.landmark
-    xs = [lm.x for lm in landmarks]
-    ys = [lm.y for lm in landmarks]
-    width = max(xs) - min(xs)
-    height = max(ys) - min(ys)
-    center_x = sum(xs) / len(xs)
-    center_y = sum(ys) / len(ys)
-    total_distance = sum(((lm.x - center_x) ** 2 + (lm.y - center_y) ** 2) ** 0.5 for lm in landmarks)
-    avg_distance = total_distance / len(landmarks)
-    compactness = avg_distance / (width * height + 0.001)
-    return compactness
-
 window_name = setup_transparent_window()
 text_display = TextDisplay()
 score = 0
-prev_area = None
-prev_compactness = None
-cooldown = 0
-crack_effects = []
-prev_center_x = None
+punch_detector = PunchDetector()
+crack_effects = None  # CrackEffects, sized with the overlay
+prev_t = None
+next_inference = float("-inf")
+overlay = None  # black = transparent; one buffer, only the drawn regions are cleared
 
 print("Boxing Game Started! Make a fist and punch towards the camera! Press ESC to exit.")
 
-while cap.isOpened():
-    success, frame = cap.read()
-    if not success:
+while cap.is_running():
+    grabbed = cap.get()
+    if grabbed is None:
         break
     
-    frame = cv2.flip(frame, 1)
+    # the camera image is never shown, so instead of flipping it the landmarks
+    # are mirrored after inference (same coordinates and handedness as before)
+    frame = grabbed.image
     frame_height, frame_width = frame.shape[:2]
-    display_frame = create_transparent_background(frame_width, frame_height)
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    result = hands.process(rgb_frame)
+    if overlay is None or (overlay.width, overlay.height) != (frame_width, frame_height):
+        overlay = BoxingOverlay(frame_width, frame_height)
+        crack_effects = CrackEffects(frame_width, frame_height)
+    overlay.begin_frame()
+    dt = 0.0 if prev_t is None else grabbed.t - prev_t
+    prev_t = grabbed.t
+    # with the tasks backend this is the newest finished result (None = nothing
+    # new yet), the frames keep being drawn while inference is in flight; the
+    # tag is the capture time of the frame the result belongs to
+    if grabbed.t >= next_inference:
+        if INFERENCE_HZ:
+            next_inference = max(next_inference + 1.0 / INFERENCE_HZ, grabbed.t)
+        done = backend.infer(to_rgb(frame), grabbed.t, grabbed.t)
+    else:
+        done = backend.poll()  # frames between inferences still pick up a finished result
+    result = mirror_result(done[1]) if done is not None else None
     
-    punch_detected = False
-    punch_position = None
-    punch_type = None
-
-    if result.multi_hand_landmarks:
-        for hand_idx, hand_landmarks in enumerate(result.multi_hand_landmarks):
-            handedness = result.multi_handedness[hand_idx].classification[0].label
-            is_fist_shape = is_fist(hand_landmarks)
-            compactness = calculate_hand_compactness(hand_landmarks)
-            xs = [lm.x for lm in hand_landmarks.landmark]
-            ys = [lm.y for lm in hand_landmarks.landmark]
-            width = max(xs) - min(xs)
-            height = max(ys) - min(ys)
-            area = width * height
-            center_x = int(sum(xs) / len(xs) * frame_width)
-            center_y = int(sum(ys) / len(ys) * frame_height)
-            punch_position = (center_x, center_y)
-            delta_x = 0 if prev_center_x is None else center_x - prev_center_x
-
-            if prev_area is not None and prev_compactness is not None:
-                growth = area - prev_area
-                compactness_change = compactness - prev_compactness
-                if cooldown == 0 and is_fist_shape and growth > 0.010 and compactness_change < -0.05:
-                    score += 10
-                    cooldown = 15
-                    punch_detected = True
-                    punch_sound.play()
-                    if handedness == "Left" and delta_x > 40:
-                        punch_type = ("LEFT HOOK!", (255, 100, 100))
-                    elif handedness == "Right" and delta_x < -40:
-                        punch_type = ("RIGHT HOOK!", (100, 255, 100))
-                    else:
-                        punch_type = ("STRAIGHT!", (100, 100, 255))
-                    text_display.add_text(punch_type[0], 
-                                          (punch_position[0] - 120, punch_position[1] - 30),
-                                          punch_type[1], duration=90)
-            prev_area = area
-            prev_compactness = compactness
-            prev_center_x = center_x
-
-    if punch_detected and punch_position:
-        crack_lines = create_crack_lines(punch_position, 
-                                         num_lines=random.randint(12, 20), 
-                                         max_length=random.randint(150, 250))
-        crack_effects.append({
-            'lines': crack_lines, 
-            'alpha': 1.0, 
-            'fade_speed': random.uniform(0.008, 0.015) 
-        })
-
-    crack_effects_to_remove = []
-    for i, crack_data in enumerate(crack_effects):
-        crack_data['alpha'] -= crack_data['fade_speed']
-        if crack_data['alpha'] <= 0:
-            crack_effects_to_remove.append(i)
-    for i in reversed(crack_effects_to_remove):
-        crack_effects.pop(i)
-    if crack_effects:
-        display_frame = draw_screen_cracks(display_frame, crack_effects)
-
-    text_display.update_and_draw(display_frame)
-
-    if cooldown > 0:
-        cooldown -= 1
-
-    padding = 40  
-    per_digit_width = 30  
-    score_length = padding * 2 + len(str(score)) * per_digit_width
-    score_length = max(score_length, 280) 
-    score_bg = display_frame.copy()
-    cv2.rectangle(score_bg, (20, 20), (20 + score_length, 100), (50, 50, 50), -1)
-    cv2.addWeighted(score_bg, 0.8, display_frame, 0.2, 0, display_frame)
-    cv2.rectangle(display_frame, (20, 20), (20 + score_length, 100), (255, 255, 255), 2)
-
-    cv2.putText(display_frame, f"Score: {score}", (38, 78),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 6)
-    cv2.putText(display_frame, f"Score: {score}", (35, 75),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
-    
-
-    cv2.imshow(window_name, display_frame)
+    # all hands of the result in one batch, each matched to its own track
+    punches = punch_detector.update(done[0], result, frame_width, frame_height) if result is not None else []
+
+    for punch in punches:
+        score += 10
+        sounds.play(punch.kind)
+        label, color = PUNCH_TYPES[punch.kind]
+        x, y = punch.position
+        text_display.add_text(label, (x - 120, y - 30), color, grabbed.t, duration=HIT_TEXT_SEC)
+        crack_lines = crack_segments(punch.position, 
+                                     num_lines=random.randint(12, 20), 
+                                     max_length=random.randint(150, 250))
+        # at most MAX_CRACKS at once, the most faded one makes room
+        crack_effects.spawn(crack_lines, fade_speed=random.uniform(*CRACK_FADE_PER_SEC))
+
+    crack_effects.update(dt)
+    if len(crack_effects):
+        overlay.draw_cracks(crack_effects)
+
+    text_display.update_and_draw(overlay, grabbed.t)
+
+    # sprite re-rendered only when the score changes, blended over its own box
+    overlay.draw_score_panel(score)
+
+    cv2.imshow(window_name, overlay.end_frame())
     key = cv2.waitKey(1) & 0xFF
     if key == 27: 
         break
 
 cap.release()
+backend.close()
+sounds.close()
 cv2.destroyAllWindows()
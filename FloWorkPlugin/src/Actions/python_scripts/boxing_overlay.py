@@ -0,0 +1,243 @@
+# boxing_overlay.py — boxing.py's transparent overlay without full-frame work
+#
+# boxing.py used to allocate a new black frame every frame, copy all of it to
+# blend one translucent score box with cv2.addWeighted over the whole 1280x720
+# image, and draw every hit label twice with cv2.putText. Here:
+#   - one persistent buffer, cleared with the dirty rectangles of HudCompositor
+#   - the score panel is a sprite rendered when the score changes and blended
+#     over its own rectangle only
+#   - hit labels are rendered once per (text, colour) and faded with cv2.LUT
+# The output matches the old drawing code: exactly for hard-edged text, within
+# a few levels where OpenCV anti-aliases glyph edges (see the benchmark).
+import cv2
+import numpy as np
+
+from hud_compositor import HudCompositor
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# score panel, same geometry as the old boxing.py drawing
+PANEL_ORIGIN = (20, 20)
+PANEL_HEIGHT = 80
+PANEL_MIN_WIDTH = 280
+PANEL_PADDING = 40
+PANEL_DIGIT_WIDTH = 30
+PANEL_GREY = 50
+PANEL_OPACITY = 0.8
+
+
+class _Sprite:
+    """
+    Pre-rendered pixels at an offset, composited as out = bg * trans / 255 + image.
+    Both come from drawing the same primitives on black and on white, so this is
+    exact for hard-edged text and follows the anti-aliased edges of newer OpenCV.
+    """
+
+    __slots__ = ("x", "y", "image", "trans")
+
+    def __init__(self, x, y, on_black, on_white):
+        self.x, self.y = x, y
+        self.image = on_black
+        self.trans = cv2.subtract(on_white, on_black)
+
+
+def _clip(sprite, x, y, w, h):
+    """Buffer slice and sprite slice of a sprite placed at (x, y), or None if off-screen."""
+    sh, sw = sprite.image.shape[:2]
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(w, x + sw), min(h, y + sh)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+
+def render_hit_label(text, color, font_scale=2):
+    """Shadowed hit text as drawn by the old TextDisplay, relative to its baseline-left corner."""
+    (tw, th), base = cv2.getTextSize(text, FONT, font_scale, 8)
+    pad = 8
+    w, h = tw + 3 + 2 * pad, th + base + 3 + 2 * pad
+    org = (pad, pad + th)
+    layers = []
+    for bg in (0, 255):
+        img = np.full((h, w, 3), bg, np.uint8)
+        cv2.putText(img, text, (org[0] + 3, org[1] + 3), FONT, font_scale, (0, 0, 0), 8)
+        cv2.putText(img, text, org, FONT, font_scale, color, 5)
+        layers.append(img)
+    return _Sprite(-org[0], -org[1], *layers)
+
+
+def render_score_panel(score):
+    """
+    The panel's opaque parts (border, shadowed text) as a sprite, plus the
+    rectangle (x0, y0, x1, y1), inclusive, that gets the translucent grey.
+    """
+    ox, oy = PANEL_ORIGIN
+    width = max(PANEL_PADDING * 2 + len(str(score)) * PANEL_DIGIT_WIDTH, PANEL_MIN_WIDTH)
+    rect = (ox, oy, ox + width, oy + PANEL_HEIGHT)
+    text = f"Score: {score}"
+    (tw, th), base = cv2.getTextSize(text, FONT, 1.5, 6)
+    # sprite covers the border and both text passes
+    x0, y0 = ox - 2, min(oy - 2, 75 - th - 4)
+    x1 = max(rect[2] + 3, 38 + tw + 4)
+    y1 = max(rect[3] + 3, 78 + base + 4)
+    shift = np.array([x0, y0])
+    layers = []
+    for bg in (0, 255):
+        img = np.full((y1 - y0, x1 - x0, 3), bg, np.uint8)
+        cv2.rectangle(img, tuple(rect[:2] - shift), tuple(rect[2:] - shift), (255, 255, 255), 2)
+        cv2.putText(img, text, tuple((38, 78) - shift), FONT, 1.5, (0, 0, 0), 6)
+        cv2.putText(img, text, tuple((35, 75) - shift), FONT, 1.5, (255, 255, 255), 3)
+        layers.append(img)
+    return _Sprite(x0, y0, *layers), rect
+
+
+class BoxingOverlay(HudCompositor):
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self._labels = {}  # (text, colour) -> _Sprite
+        self._faded = {}  # sprite shape -> reused buffer for a faded label
+        self._lut = np.arange(256, dtype=np.float64)
+        self._panel_score = None
+        self._panel = self._panel_rect = self._panel_grey = None
+        self.panel_renders = 0
+
+    def draw_cracks(self, effects):
+        """effects: a crack_effects.CrackEffects of this overlay's size."""
+        for x0, y0, x1, y1 in effects.draw(self.buffer).tolist():
+            self._mark(x0, y0, x1, y1)
+
+    def _blit(self, sprite, x, y, image=None):
+        """Composite `sprite` with its offset at (x, y); `image` replaces its pixels (faded copy)."""
+        h, w = self.buffer.shape[:2]
+        clipped = _clip(sprite, x + sprite.x, y + sprite.y, w, h)
+        if clipped is None:
+            return
+        dst, src = clipped
+        region = self.buffer[dst]
+        cv2.multiply(region, sprite.trans[src], dst=region, scale=1 / 255)
+        cv2.add(region, (sprite.image if image is None else image)[src], dst=region)
+        self._mark(dst[1].start, dst[0].start, dst[1].stop, dst[0].stop)
+
+    def draw_hit_text(self, text, position, color, alpha):
+        """Hit label with its baseline-left corner at `position`, colour faded by alpha."""
+        key = (text, tuple(color))
+        sprite = self._labels.get(key)
+        if sprite is None:
+            sprite = self._labels[key] = render_hit_label(text, color)
+        # int(c * alpha) per channel, like the old per-frame colour
+        lut = (self._lut * alpha).astype(np.uint8)
+        faded = self._faded.get(sprite.image.shape)
+        if faded is None:
+            faded = self._faded[sprite.image.shape] = np.empty_like(sprite.image)
+        cv2.LUT(sprite.image, lut, dst=faded)
+        self._blit(sprite, position[0], position[1], faded)
+
+    def draw_score_panel(self, score):
+        if score != self._panel_score:
+            self._panel_score = score
+            self._panel, self._panel_rect = render_score_panel(score)
+            x0, y0, x1, y1 = self._panel_rect
+            self._panel_grey = np.full((y1 - y0 + 1, x1 - x0 + 1, 3), PANEL_GREY, np.uint8)
+            self.panel_renders += 1
+        x0, y0, x1, y1 = self._panel_rect
+        region = self.buffer[y0 : y1 + 1, x0 : x1 + 1]
+        grey = self._panel_grey[: region.shape[0], : region.shape[1]]  # clipped on tiny frames
+        cv2.addWeighted(grey, PANEL_OPACITY, region, 1 - PANEL_OPACITY, 0, dst=region)
+        self._mark(x0, y0, x1 + 1, y1 + 1)
+        self._blit(self._panel, 0, 0)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: the old per-frame drawing vs. BoxingOverlay on a scripted round
+# (punch every 20 frames, cracks and labels fading out), pixels compared.
+#   python boxing_overlay.py [width height]
+# ---------------------------------------------------------------------------
+def _old_frame(w, h, cracks, texts, score):
+    frame = np.zeros((h, w, 3), dtype=np.uint8)
+    for crack in cracks:
+        intensity = int(255 * crack["alpha"])
+        for start, end in crack["lines"]:
+            cv2.line(frame, start, end, (intensity, intensity, 255), 4)
+            cv2.line(frame, start, end, (255, 255, 255), 2)
+    for text, pos, color, alpha in texts:
+        faded = tuple(int(c * alpha) for c in color)
+        cv2.putText(frame, text, (pos[0] + 3, pos[1] + 3), FONT, 2, (0, 0, 0), 8)
+        cv2.putText(frame, text, pos, FONT, 2, faded, 5)
+    length = max(PANEL_PADDING * 2 + len(str(score)) * PANEL_DIGIT_WIDTH, PANEL_MIN_WIDTH)
+    score_bg = frame.copy()
+    cv2.rectangle(score_bg, (20, 20), (20 + length, 100), (50, 50, 50), -1)
+    cv2.addWeighted(score_bg, 0.8, frame, 0.2, 0, frame)
+    cv2.rectangle(frame, (20, 20), (20 + length, 100), (255, 255, 255), 2)
+    cv2.putText(frame, f"Score: {score}", (38, 78), FONT, 1.5, (0, 0, 0), 6)
+    cv2.putText(frame, f"Score: {score}", (35, 75), FONT, 1.5, (255, 255, 255), 3)
+    return frame
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+    from crack_effects import crack_segments, CrackEffects
+
+    W, H = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (1280, 720)
+    FRAMES = 600
+    random.seed(0)
+    labels = [("STRAIGHT!", (100, 100, 255)), ("LEFT HOOK!", (255, 100, 100)), ("RIGHT HOOK!", (100, 255, 100))]
+
+    # scripted round: the same events for both renderers
+    rng = np.random.RandomState(0)
+    script, spawns = [], []
+    cracks, texts, score = [], [], 0
+    for f in range(FRAMES):
+        spawns.append(None)
+        if f % 20 == 0:
+            score += 10
+            cx, cy = random.randint(0, W), random.randint(0, H)
+            segs = crack_segments((cx, cy), random.randint(12, 20), random.randint(150, 250), rng)
+            spawns[f] = (segs, random.uniform(0.008, 0.015))
+            cracks.append({"lines": [tuple(map(tuple, seg)) for seg in segs.tolist()],
+                           "alpha": 1.0, "fade": spawns[f][1]})
+            text, color = random.choice(labels)
+            texts.append([text, (cx - 120, cy - 30), color, 90, 90])
+        frame_texts = [(t, p, c, d / d0) for t, p, c, d, d0 in texts]
+        script.append(([dict(lines=c["lines"], alpha=c["alpha"]) for c in cracks], frame_texts, score))
+        for c in cracks:
+            c["alpha"] -= c["fade"]
+        cracks = [c for c in cracks if c["alpha"] > 0]
+        for t in texts:
+            t[3] -= 1
+        texts = [t for t in texts if t[3] > 0]
+
+    t0 = time.perf_counter()
+    old = [_old_frame(W, H, c, t, s) for c, t, s in script]
+    ms_old = (time.perf_counter() - t0) / FRAMES * 1000
+
+    overlay = BoxingOverlay(W, H)
+    effects = CrackEffects(W, H)
+    mismatches = max_diff = 0
+    t_new = 0.0
+    for (_, t, s), spawn, ref in zip(script, spawns, old):
+        t0 = time.perf_counter()
+        overlay.begin_frame()
+        if spawn is not None:
+            effects.spawn(*spawn)
+        overlay.draw_cracks(effects)
+        effects.update()
+        for text, pos, color, alpha in t:
+            overlay.draw_hit_text(text, pos, color, alpha)
+        overlay.draw_score_panel(s)
+        out = overlay.end_frame()
+        t_new += time.perf_counter() - t0
+        diff = cv2.absdiff(out, ref).max()
+        max_diff = max(max_diff, diff)
+        mismatches += diff > 0
+    ms_new = t_new / FRAMES * 1000
+    st = overlay.stats()
+    print(f"{W}x{H}, {FRAMES} frames, {len(labels)} labels, score panel re-rendered {overlay.panel_renders}x")
+    print(f"old (alloc + full blend + 2x putText): {ms_old:6.3f} ms/frame")
+    print(f"overlay (sprites + dirty rects)      : {ms_new:6.3f} ms/frame, "
+          f"{st['avg_touched_ratio'] * 100:.1f}% of the buffer touched")
+    # hard-edged text (OpenCV 4) composites exactly; anti-aliased edges may round differently
+    print(f"frames differing from the old output: {mismatches} (max {max_diff} levels)")
+    if max_diff > 3:
+        raise SystemExit(1)
@@ -4,9 +4,10 @@ import cv2
 import numpy as np
 import screen_brightness_control as sbc
 import time
+from frame_buffers import to_gray
 
 def get_environment_brightness(frame):
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    gray = to_gray(frame)  # reused buffer, no new array per reading
     return np.mean(gray)
 
 def adjust_screen_brightness(env_brightness):
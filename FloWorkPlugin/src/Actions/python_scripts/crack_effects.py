@@ -0,0 +1,214 @@
+# crack_effects.py — boxing.py's screen cracks as fixed-capacity NumPy arrays
+#
+# boxing.py kept every crack as a dict holding a list of point tuples, faded
+# them one by one and drew each segment with two cv2.line calls per frame, so a
+# burst of punches meant hundreds of Python-level draw calls per frame. Here the
+# effects are a structure of arrays (segment endpoints, alpha, fade speed, spawn
+# order) with a capacity; fading and expiry are vectorized. Each crack's
+# geometry is rasterized once, at spawn, into a mask over its bounding box and
+# the flat buffer indices of its rim's blue/green bytes, so drawing a live
+# crack is one masked white copy plus one indexed write of the fade intensity
+# instead of two cv2.line calls per segment. When all slots are taken, the
+# most faded crack makes room.
+import math
+
+import cv2
+import numpy as np
+
+MAX_CRACKS = 16  # simultaneous effects
+MAX_SEGMENTS = 40  # per crack: up to 20 rays, each with an optional branch
+
+
+def crack_segments(center, num_lines=8, max_length=100, rng=np.random):
+    """
+    (n, 2, 2) int32 segments radiating from `center`, same shape of crack as the
+    old create_crack_lines: rays of 20..max_length px, 60% with a branch.
+    """
+    cx, cy = center
+    angle = rng.uniform(0, 2 * math.pi, num_lines)
+    length = rng.uniform(20, max_length, num_lines)
+    ends = np.stack([cx + np.cos(angle) * length, cy + np.sin(angle) * length], axis=1)
+    rays = np.empty((num_lines, 2, 2), np.int32)
+    rays[:, 0] = center
+    rays[:, 1] = ends.astype(np.int32)
+
+    branched = rng.random_sample(num_lines) < 0.6
+    k = int(branched.sum())
+    a, l = angle[branched], length[branched]
+    b_len = l * rng.uniform(0.3, 0.7, k)
+    b_angle = a + rng.uniform(-0.5, 0.5, k)
+    ratio = rng.uniform(0.3, 0.8, k)
+    starts = np.stack([cx + np.cos(a) * l * ratio, cy + np.sin(a) * l * ratio], axis=1).astype(np.int32)
+    branches = np.empty((k, 2, 2), np.int32)
+    branches[:, 0] = starts
+    branches[:, 1] = (starts + np.stack([np.cos(b_angle), np.sin(b_angle)], axis=1) * b_len[:, None]).astype(np.int32)
+    return np.concatenate([rays, branches])[:MAX_SEGMENTS]
+
+
+class CrackEffects:
+    def __init__(self, width, height, capacity=MAX_CRACKS):
+        self.width, self.height = width, height
+        self.capacity = capacity
+        self.segments = np.zeros((capacity, MAX_SEGMENTS, 2, 2), np.int32)
+        self.n_segments = np.zeros(capacity, np.int32)
+        self.alpha = np.zeros(capacity)
+        self.fade = np.zeros(capacity)
+        self.seq = np.zeros(capacity, np.int64)  # spawn order, older cracks are drawn first
+        self.alive = np.zeros(capacity, bool)
+        self.bbox = np.zeros((capacity, 4), np.int32)  # x0, y0, x1, y1 (exclusive), clipped
+        self._mask = [None] * capacity  # (h, w) uint8 over bbox, every crack pixel
+        self._rim = [None] * capacity  # indices of the rim's B and G bytes in the flat frame
+        self._white = np.full((height, width, 3), 255, np.uint8)
+        self._next_seq = 0
+
+        # counters
+        self.spawned = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def spawn(self, segments, fade_speed, alpha=1.0):
+        """segments: (n, 2, 2) line endpoints in frame pixels, e.g. from crack_segments()."""
+        free = np.flatnonzero(~self.alive)
+        if len(free):
+            i = int(free[0])
+        else:
+            i = int(np.argmin(self.alpha))
+            self.evicted += 1
+        n = min(len(segments), MAX_SEGMENTS)
+        self.segments[i, :n] = segments[:n]
+        self.n_segments[i] = n
+        self.alpha[i] = alpha
+        self.fade[i] = fade_speed
+        self.seq[i] = self._next_seq
+        self._next_seq += 1
+        self.alive[i] = True
+        self._rasterize(i)
+        self.spawned += 1
+
+    def _rasterize(self, i):
+        """Rim (thickness 4) and core (thickness 2) masks, in the old per-line draw order."""
+        segs = self.segments[i, : self.n_segments[i]]
+        pts = segs.reshape(-1, 2)
+        x0, y0 = np.maximum(pts.min(axis=0) - 3, 0)
+        x1 = min(int(pts[:, 0].max()) + 4, self.width)
+        y1 = min(int(pts[:, 1].max()) + 4, self.height)
+        if x1 <= x0 or y1 <= y0:
+            x0 = y0 = x1 = y1 = 0
+        self.bbox[i] = (x0, y0, x1, y1)
+        label = np.zeros((y1 - y0, x1 - x0), np.uint8)
+        for p, q in (segs - (x0, y0)).tolist():
+            cv2.line(label, p, q, 1, 4)
+            cv2.line(label, p, q, 2, 2)
+        self._mask[i] = (label > 0).view(np.uint8)
+        ys, xs = np.nonzero(label == 1)
+        byte = ((ys + y0) * self.width + xs + x0).astype(np.int32) * 3
+        self._rim[i] = np.concatenate([byte, byte + 1])
+
+    def update(self, elapsed=1):
+        """
+        Fades every crack by fade speed x elapsed (frames or seconds, whichever
+        the fade speeds are given in); fully faded ones are freed.
+        """
+        self.alpha[self.alive] -= self.fade[self.alive] * elapsed
+        self.alive &= self.alpha > 0
+
+    def draw(self, buffer):
+        """
+        Draws the live cracks, oldest first, into a contiguous (h, w, 3) uint8
+        buffer of the size given at construction. Returns the drawn boxes.
+        """
+        flat = buffer.reshape(-1)
+        live = np.flatnonzero(self.alive)
+        live = live[np.argsort(self.seq[live])]
+        intensity = (255 * self.alpha[live]).astype(np.uint8)
+        for i, c in zip(live, intensity):
+            x0, y0, x1, y1 = self.bbox[i]
+            if x1 == x0:
+                continue
+            # white everywhere, then the rim's blue and green down to the fade: (c, c, 255)
+            cv2.copyTo(self._white[: y1 - y0, : x1 - x0], self._mask[i], buffer[y0:y1, x0:x1])
+            flat[self._rim[i]] = c
+        return self.bbox[live]
+
+    def clear(self):
+        self.alive[:] = False
+
+    def stats(self):
+        return {"live": len(self), "capacity": self.capacity, "spawned": self.spawned, "evicted": self.evicted}
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: sustained punching (a crack every --every frames) with the old
+# list-of-dicts + cv2.line drawing vs. CrackEffects, same segments; pixels are
+# compared while nothing had to be evicted.
+#   python crack_effects.py [--every 4] [--frames 600] [--capacity 16]
+# ---------------------------------------------------------------------------
+def _old_step(frame, crack_effects):
+    for crack_data in crack_effects:
+        crack_data["alpha"] -= crack_data["fade_speed"]
+    crack_effects[:] = [c for c in crack_effects if c["alpha"] > 0]
+    for crack_data in crack_effects:
+        intensity = int(255 * crack_data["alpha"])
+        for start, end in crack_data["lines"]:
+            cv2.line(frame, start, end, (intensity, intensity, 255), 4)
+            cv2.line(frame, start, end, (255, 255, 255), 2)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser("crack effects benchmark")
+    ap.add_argument("--every", type=int, default=4, help="frames between punches")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--capacity", type=int, default=MAX_CRACKS)
+    ap.add_argument("--size", default="1280x720")
+    args = ap.parse_args()
+    W, H = map(int, args.size.split("x"))
+
+    rng = np.random.RandomState(0)
+    punches = {}
+    for f in range(0, args.frames, args.every):
+        center = (int(rng.randint(0, W)), int(rng.randint(0, H)))
+        segs = crack_segments(center, rng.randint(12, 21), rng.randint(150, 251), rng)
+        punches[f] = (segs, rng.uniform(0.008, 0.015))
+
+    frame = np.zeros((H, W, 3), np.uint8)
+    old, old_live, ref = [], [], []
+    t_old = 0.0
+    for f in range(args.frames):
+        t0 = time.perf_counter()
+        frame[:] = 0
+        if f in punches:
+            segs, fade = punches[f]
+            old.append({"lines": [(tuple(map(int, p)), tuple(map(int, q))) for p, q in segs],
+                        "alpha": 1.0, "fade_speed": fade})
+        _old_step(frame, old)
+        t_old += time.perf_counter() - t0
+        old_live.append(len(old))
+        ref.append(frame.copy())
+
+    effects = CrackEffects(W, H, args.capacity)
+    mismatches = compared = 0
+    t_new = 0.0
+    for f in range(args.frames):
+        t0 = time.perf_counter()
+        frame[:] = 0
+        if f in punches:
+            effects.spawn(*punches[f])
+        effects.update()
+        effects.draw(frame)
+        t_new += time.perf_counter() - t0
+        if effects.evicted == 0:
+            compared += 1
+            mismatches += not np.array_equal(frame, ref[f])
+
+    print(f"{W}x{H}, {args.frames} frames, punch every {args.every} frames, "
+          f"up to {max(old_live)} cracks alive with the old lists")
+    print(f"old (dict lists, 2x cv2.line per segment): {t_old / args.frames * 1000:6.3f} ms/frame")
+    print(f"CrackEffects (arrays, pre-rasterized)    : {t_new / args.frames * 1000:6.3f} ms/frame  {effects.stats()}")
+    print(f"frames differing from the old output: {mismatches} of {compared} compared (before the first eviction)")
+    if mismatches:
+        raise SystemExit(1)
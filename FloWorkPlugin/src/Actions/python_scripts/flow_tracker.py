@@ -0,0 +1,222 @@
+# flow_tracker.py — full hand inference on keyframes, optical flow in between
+#
+# The landmark model is the biggest fixed per-frame cost. FlowHandTracker runs
+# it only on keyframes and moves the last landmarks forward on the frames in
+# between with pyramidal Lucas-Kanade flow (cv2.calcOpticalFlowPyrLK) on a
+# downscaled grey image. Every tracked point is also flowed back to the
+# previous frame; if it doesn't come back to where it started (forward-backward
+# error), the track is not trusted and the model runs on this frame instead.
+# The keyframe interval adapts to hand speed: long while the hand holds still,
+# down to every frame during a fast move.
+import cv2
+import numpy as np
+
+from hand_features import landmarks_to_array
+from frame_buffers import BufferPool
+
+
+class FlowHandTracker:
+    def __init__(self, hands, max_interval=6, min_interval=1, speed_ref=0.05, scale=0.5,
+                 fb_max=1.0, max_lost=0.1, win=15, levels=2):
+        """
+        hands:        model run on keyframes (anything with Hands.process(rgb)), e.g.
+                      mp.solutions Hands or a RoiHandTracker
+        max_interval: frames from one keyframe to the next while the hand is still
+        min_interval: ... while it moves fast
+        speed_ref:    hand speed (hand sizes per frame) at which the interval halves
+        scale:        flow runs on the frame resized by this factor
+        fb_max:       90th percentile of the forward-backward error (px, downscaled)
+                      above which the track is dropped and a keyframe forced
+        max_lost:     fraction of points the flow may lose before a keyframe is forced
+        win, levels:  Lucas-Kanade window size and pyramid levels
+        """
+        self.hands = hands
+        self.max_interval = max_interval
+        self.min_interval = min_interval
+        self.speed_ref = speed_ref
+        self.scale = scale
+        self.fb_max = fb_max
+        self.max_lost = max_lost
+        self._lk = dict(winSize=(win, win), maxLevel=levels,
+                        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+        self._pool = BufferPool()
+        self._flip = False  # which of the two grey buffers holds the current frame
+        self._prev_gray = None
+        self._pts = None  # (n, 21, 3) landmarks of the last frame, normalized
+        self._labels = self._scores = None
+        self._since_key = 0
+        self.interval = max_interval
+
+        # counters
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.forced = 0  # keyframes forced by the forward-backward / lost-point check
+
+    def reset(self):
+        self._pts = None
+
+    def _gray(self, rgb):
+        h, w = rgb.shape[:2]
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        small = self._pool.get("small", (size[1], size[0], 3))
+        cv2.resize(rgb, size, dst=small, interpolation=cv2.INTER_AREA)
+        self._flip = not self._flip
+        gray = self._pool.get("gray_a" if self._flip else "gray_b", (size[1], size[0]))
+        return cv2.cvtColor(small, cv2.COLOR_RGB2GRAY, dst=gray)
+
+    def process(self, rgb):
+        """Same contract as Hands.process(rgb)."""
+        gray = self._gray(rgb)
+        prev, self._prev_gray = self._prev_gray, gray
+        if (
+            self._pts is not None
+            and prev is not None
+            and prev.shape == gray.shape
+            and self._since_key < self.interval
+        ):
+            result = self._track(prev, gray)
+            if result is not None:
+                self.tracked_frames += 1
+                self._since_key += 1
+                return result
+            self.forced += 1
+        return self._keyframe(rgb)
+
+    def _keyframe(self, rgb):
+        self.keyframes += 1
+        self._since_key = 0
+        result = self.hands.process(rgb)
+        if result is not None and result.multi_hand_landmarks:
+            # copied now: the caller may mirror the result in place afterwards
+            self._pts = np.stack([landmarks_to_array(hl.landmark) for hl in result.multi_hand_landmarks])
+            self._labels = [hd.classification[0].label for hd in result.multi_handedness]
+            self._scores = [hd.classification[0].score for hd in result.multi_handedness]
+        else:
+            self._pts = None
+        return result
+
+    def _track(self, prev, gray):
+        from landmark_recorder import ReplayResult
+
+        gh, gw = gray.shape
+        p0 = (self._pts[..., :2].reshape(-1, 2) * (gw, gh)).astype(np.float32).reshape(-1, 1, 2)
+        p1, st1, _ = cv2.calcOpticalFlowPyrLK(prev, gray, p0, None, **self._lk)
+        back, st2, _ = cv2.calcOpticalFlowPyrLK(gray, prev, p1, None, **self._lk)
+        ok = (st1[:, 0] == 1) & (st2[:, 0] == 1)
+        if (~ok).mean() > self.max_lost:
+            return None
+        fb = np.sqrt(((back - p0)[:, 0] ** 2).sum(axis=1))[ok]
+        if np.percentile(fb, 90) > self.fb_max:
+            return None
+
+        # lost points ride along with their hand's median motion
+        d = (p1 - p0)[:, 0].reshape(len(self._pts), 21, 2)
+        good = ok.reshape(len(self._pts), 21)
+        for i in range(len(d)):
+            d[i, ~good[i]] = np.median(d[i, good[i]], axis=0) if good[i].any() else 0.0
+        pts = self._pts.copy()
+        pts[..., :2] += d / (gw, gh)
+        self._adapt(d, gw, gh)
+        self._pts = pts
+        return ReplayResult(pts, self._labels, self._scores)
+
+    def _adapt(self, d, gw, gh):
+        """Keyframe interval from how far the hands moved, in hand sizes per frame."""
+        span = self._pts[..., :2].max(axis=1) - self._pts[..., :2].min(axis=1)
+        size = np.maximum(span[:, 0] * gw, span[:, 1] * gh)
+        speed = float((np.sqrt((d ** 2).sum(axis=2)).mean(axis=1) / np.maximum(size, 1.0)).max())
+        interval = self.max_interval / (1.0 + speed / self.speed_ref)
+        self.interval = int(round(min(max(interval, self.min_interval), self.max_interval)))
+
+    def close(self):
+        self.hands.close()
+
+    def stats(self):
+        total = self.keyframes + self.tracked_frames
+        return {
+            "keyframes": self.keyframes,
+            "tracked_frames": self.tracked_frames,
+            "forced_keyframes": self.forced,
+            "keyframe_ratio": self.keyframes / total if total else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: keyframe ratio, fps and landmark drift of the flow tracker vs.
+# full inference on every frame of a recorded clip.
+#   python flow_tracker.py <video file> [--max-interval 6] [--max-hands 2]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import time
+    import mediapipe as mp
+
+    ap = argparse.ArgumentParser("optical flow tracker benchmark")
+    ap.add_argument("clip")
+    ap.add_argument("--max-interval", type=int, default=6)
+    ap.add_argument("--scale", type=float, default=0.5)
+    ap.add_argument("--max-hands", type=int, default=2)
+    args = ap.parse_args()
+
+    def make_hands():
+        return mp.solutions.hands.Hands(
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.7,
+            max_num_hands=args.max_hands,
+            static_image_mode=False,
+        )
+
+    cap = cv2.VideoCapture(args.clip)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise SystemExit("no frames in clip")
+    h, w = frames[0].shape[:2]
+
+    def run(process):
+        out = []
+        t0 = time.perf_counter()
+        for rgb in frames:
+            res = process(rgb)
+            if res.multi_hand_landmarks:
+                out.append(np.stack([landmarks_to_array(hl.landmark) for hl in res.multi_hand_landmarks]))
+            else:
+                out.append(None)
+        return out, len(frames) / (time.perf_counter() - t0)
+
+    full_hands = make_hands()
+    ref, fps_full = run(full_hands.process)
+    full_hands.close()
+
+    tracker = FlowHandTracker(make_hands(), max_interval=args.max_interval, scale=args.scale)
+    flow, fps_flow = run(tracker.process)
+    tracker.close()
+
+    errors, rel = [], []
+    for a, b in zip(ref, flow):
+        if a is None or b is None or len(a) != len(b):
+            continue
+        # match hands by wrist position
+        for hand in a:
+            j = np.argmin(np.abs(b[:, 0, :2] - hand[0, :2]).sum(axis=1))
+            d = (b[j, :, :2] - hand[:, :2]) * (w, h)
+            err = np.sqrt((d ** 2).sum(axis=1)).mean()
+            span = (hand[:, :2].max(axis=0) - hand[:, :2].min(axis=0)) * (w, h)
+            errors.append(err)
+            rel.append(err / max(span.max(), 1.0))
+    both = sum(a is not None and b is not None for a, b in zip(ref, flow))
+    only_ref = sum(a is not None and b is None for a, b in zip(ref, flow))
+    only_flow = sum(a is None and b is not None for a, b in zip(ref, flow))
+
+    print(f"frames: {len(frames)} ({w}x{h}), flow at {args.scale:g}x, max interval {args.max_interval}")
+    print(f"full inference : {fps_full:6.1f} fps")
+    print(f"flow tracker   : {fps_flow:6.1f} fps  {tracker.stats()}")
+    print(f"detections     : both {both}, full only {only_ref}, flow only {only_flow}")
+    if errors:
+        print(f"landmark drift vs full inference: mean {np.mean(errors):.2f} px "
+              f"({np.mean(rel) * 100:.1f}% of hand size), p95 {np.percentile(errors, 95):.2f} px")
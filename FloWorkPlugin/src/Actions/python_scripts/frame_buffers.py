@@ -0,0 +1,133 @@
+# frame_buffers.py — preprocessing without per-frame allocations
+#
+# The loops used to cv2.flip() every camera frame for the mirror effect and then
+# cv2.cvtColor() it to RGB, two new full-size arrays per frame. Here the colour
+# conversion writes into a reused buffer (the `dst` argument) and the mirror is
+# applied to the ~21 landmarks per hand after inference instead of to ~1M pixels
+# before it: x -> 1 - x, and Left/Right handedness swapped.
+#
+# One BufferPool per process (`shared_pool`) is used by virtual_touchpad.py,
+# boxing.py, brightness.py and hand_gesture_detection.py.
+import cv2
+import numpy as np
+
+
+class BufferPool:
+    """Named, reusable arrays; a buffer is only reallocated when its shape or dtype changes."""
+
+    def __init__(self):
+        self._buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+            self.allocations += 1
+        return buf
+
+    def stats(self):
+        return {
+            "buffers": len(self._buffers),
+            "bytes": sum(b.nbytes for b in self._buffers.values()),
+            "allocations": self.allocations,
+        }
+
+
+shared_pool = BufferPool()
+
+
+def to_rgb(bgr, pool=None, name="rgb"):
+    """BGR -> RGB into the pool's `name` buffer (valid until the next call with that name)."""
+    pool = pool or shared_pool
+    dst = pool.get(name, bgr.shape, bgr.dtype)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=dst)
+
+
+def to_gray(bgr, pool=None, name="gray"):
+    pool = pool or shared_pool
+    dst = pool.get(name, bgr.shape[:2], bgr.dtype)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+def mirror_image(image, pool=None, name="mirror"):
+    """Horizontal flip into a pooled buffer; only needed where the picture itself is shown."""
+    pool = pool or shared_pool
+    dst = pool.get(name, image.shape, image.dtype)
+    return cv2.flip(image, 1, dst=dst)
+
+
+_OTHER_HAND = {"Left": "Right", "Right": "Left"}
+
+
+def mirror_result(result):
+    """
+    Turn a Hands result on the raw camera image into what a flipped image would
+    have given: x -> 1 - x for every landmark, Left <-> Right. Works in place
+    and returns the result.
+    """
+    if result is None or not result.multi_hand_landmarks:
+        return result
+    for hand in result.multi_hand_landmarks:
+        for lm in hand.landmark:
+            lm.x = 1.0 - lm.x
+    for handedness in result.multi_handedness or ():
+        for c in handedness.classification:
+            c.label = _OTHER_HAND.get(c.label, c.label)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Micro-benchmark: flip + cvtColor (old) vs. pooled cvtColor + landmark mirror.
+#   python frame_buffers.py [width height]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import sys
+    import time
+    import tracemalloc
+    from landmark_recorder import ReplayResult
+
+    W, H = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (1280, 720)
+    N = 300
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (H, W, 3), dtype=np.uint8) for _ in range(4)]
+    hands = rng.uniform(0.2, 0.8, (2, 21, 3))
+
+    def old(frame):
+        flipped = cv2.flip(frame, 1)
+        return cv2.cvtColor(flipped, cv2.COLOR_BGR2RGB)
+
+    pool = BufferPool()
+
+    def new(frame):
+        rgb = to_rgb(frame, pool)
+        # a fresh result per frame, like hands.process would return
+        mirror_result(ReplayResult(hands, ["Left", "Right"], [0.9, 0.9]))
+        return rgb
+
+    def run(fn):
+        fn(frames[0])  # warm-up (and the pool's one-time allocation)
+        tracemalloc.start()
+        peak = 0
+        t0 = time.perf_counter()
+        for i in range(N):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            fn(frames[i % len(frames)])
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+        ms = (time.perf_counter() - t0) / N * 1000
+        tracemalloc.stop()
+        return ms, peak
+
+    # the pixels must match: pooled RGB of the raw frame == flip of the old RGB
+    ref = old(frames[0])
+    assert np.array_equal(cv2.flip(to_rgb(frames[0], pool), 1), ref)
+
+    ms_old, peak_old = run(old)
+    ms_new, peak_new = run(new)
+    frame_mb = W * H * 3 / 1e6
+    print(f"{W}x{H}, {N} frames (frame = {frame_mb:.2f} MB)")
+    print(f"flip + cvtColor          : {ms_old:6.3f} ms/frame, peak alloc {peak_old / 1e6:6.2f} MB/frame")
+    print(f"pooled cvtColor + mirror : {ms_new:6.3f} ms/frame, peak alloc {peak_new / 1e6:6.2f} MB/frame")
+    print(f"saved {ms_old - ms_new:.3f} ms/frame; pool {pool.stats()}")
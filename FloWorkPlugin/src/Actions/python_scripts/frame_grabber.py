@@ -0,0 +1,241 @@
+# frame_grabber.py — background camera capture with a latest-frame-wins slot
+#
+# cap.read() blocks until the driver hands over a frame. When it runs in the
+# same thread as inference, frames pile up in the driver while hands.process()
+# is busy and the loop ends up judging gestures on old images. The grabber
+# keeps reading on its own thread and only ever holds the newest frame.
+import threading
+import time
+import platform
+import cv2
+import numpy as np
+
+
+class Frame:
+    __slots__ = ("image", "t", "seq")
+
+    def __init__(self, image, t, seq):
+        self.image = image  # BGR image as returned by the source
+        self.t = t  # time.monotonic() right after the read returned
+        self.seq = seq  # 0, 1, 2, ... in capture order
+
+
+class SyntheticSource:
+    """
+    Stand-in for cv2.VideoCapture: a dot circling on a grey background at a
+    fixed frame rate. Lets the grabber and the loops run on a box without a camera.
+    """
+
+    def __init__(self, width=1280, height=720, fps=30.0, frames=None):
+        self.width, self.height = width, height
+        self.fps = fps
+        self.frames = frames  # None = endless
+        self._i = 0
+        self._next_t = None
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened or (self.frames is not None and self._i >= self.frames):
+            return False, None
+        # pace like a real camera
+        now = time.monotonic()
+        if self._next_t is None:
+            self._next_t = now
+        if self._next_t > now:
+            time.sleep(self._next_t - now)
+        self._next_t += 1.0 / self.fps
+
+        img = np.full((self.height, self.width, 3), 40, dtype=np.uint8)
+        a = self._i / self.fps * 2.0
+        cx = int(self.width / 2 + self.width / 4 * np.cos(a))
+        cy = int(self.height / 2 + self.height / 4 * np.sin(a))
+        cv2.circle(img, (cx, cy), 40, (180, 200, 230), -1)
+        self._i += 1
+        return True, img
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        return True
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: self.width,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+            cv2.CAP_PROP_FPS: self.fps,
+        }.get(prop, 0.0)
+
+    def release(self):
+        self._opened = False
+
+
+def open_source(spec, width=1280, height=720, api=None):
+    """
+    spec: camera index (int or digit string), "synthetic", or a video file path.
+    api:  capture backend for cameras, e.g. cv2.CAP_DSHOW (ignored off Windows)
+    """
+    if isinstance(spec, str) and spec.isdigit():
+        spec = int(spec)
+    if spec == "synthetic":
+        return SyntheticSource(width, height)
+    if isinstance(spec, int):
+        if api is not None and platform.system() == "Windows":
+            cap = cv2.VideoCapture(spec, api)
+        else:
+            cap = cv2.VideoCapture(spec)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return cap
+    return cv2.VideoCapture(spec)
+
+
+class LatestFrameGrabber:
+    def __init__(self, source, realtime=None):
+        """
+        source:   anything with read()/isOpened()/release() (cv2.VideoCapture,
+                  SyntheticSource, ...)
+        realtime: pace reads at the source's CAP_PROP_FPS. Defaults to True for
+                  video files, which would otherwise be read as fast as possible.
+        """
+        self.source = source
+        if realtime is None:
+            realtime = isinstance(source, cv2.VideoCapture) and source.get(cv2.CAP_PROP_FRAME_COUNT) > 0
+        fps = source.get(cv2.CAP_PROP_FPS) if realtime else 0
+        self._period = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self._cond = threading.Condition()
+        self._latest = None
+        self._consumed = True  # whether _latest has been handed out
+        self._last_seq = -1  # seq of the last frame returned by get()
+        self._running = False
+        self._thread = None
+        self._pending_resolution = None  # applied between reads on the capture thread
+
+        # counters
+        self.captured = 0
+        self.dropped = 0  # overwritten before anyone read them
+        self.duplicated = 0  # handed out more than once
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="frame-grabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        seq = 0
+        next_t = time.monotonic()
+        while self._running:
+            if self._pending_resolution is not None:
+                w, h = self._pending_resolution
+                self._pending_resolution = None
+                self.source.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+                self.source.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+            if self._period:
+                delay = next_t - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_t += self._period
+            ok, image = self.source.read()
+            t = time.monotonic()
+            if not ok:
+                break
+            with self._cond:
+                if not self._consumed:
+                    self.dropped += 1
+                self._latest = Frame(image, t, seq)
+                self._consumed = False
+                self.captured += 1
+                self._cond.notify_all()
+            seq += 1
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def is_running(self):
+        return self._running
+
+    def set_resolution(self, width, height):
+        """Ask the source for a new frame size (takes effect before the next read)."""
+        self._pending_resolution = (int(width), int(height))
+
+    def get(self, timeout=None, fresh=True):
+        """
+        Returns the newest Frame, or None when the source ended / timed out.
+        fresh=True waits for a frame that has not been returned yet
+        (timeout=None waits like cap.read() does);
+        fresh=False returns whatever is in the slot (may be a duplicate).
+        """
+        with self._cond:
+            if fresh:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self._running and (self._latest is None or self._latest.seq == self._last_seq):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+                if self._latest is None or self._latest.seq == self._last_seq:
+                    return None  # stopped without a new frame
+            elif self._latest is None:
+                return None
+            frame = self._latest
+            if frame.seq == self._last_seq:
+                self.duplicated += 1
+            self._last_seq = frame.seq
+            self._consumed = True
+            return frame
+
+    def read(self):
+        """cv2.VideoCapture-style (success, image) for drop-in use."""
+        frame = self.get()
+        if frame is None:
+            return False, None
+        return True, frame.image
+
+    def isOpened(self):
+        return self._running
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self.source.release()
+
+    release = stop
+
+    def stats(self):
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "duplicated": self.duplicated,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Demo: a slow consumer (simulated 60 ms inference) on a 30 fps source.
+#   python frame_grabber.py [synthetic|<camera index>|<video file>]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import sys
+
+    spec = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    grabber = LatestFrameGrabber(open_source(spec)).start()
+    ages = []
+    t_end = time.monotonic() + 5.0
+    while grabber.is_running() and time.monotonic() < t_end:
+        frame = grabber.get()
+        if frame is None:
+            break
+        ages.append(time.monotonic() - frame.t)
+        time.sleep(0.06)  # pretend hands.process() takes 60 ms
+    grabber.stop()
+    print(grabber.stats())
+    if ages:
+        print(f"frame age when picked up: avg {np.mean(ages) * 1000:.1f} ms, max {np.max(ages) * 1000:.1f} ms")
@@ -0,0 +1,441 @@
+# gesture_classifier.py — learned gesture classifiers over normalized landmarks
+#
+# The rules in hand_features.classify are hand-tuned thresholds checked in a
+# fixed order (two before seven before ok). Here the same decision is learned
+# from labelled landmark recordings instead: a k-nearest-neighbour or a small
+# MLP, both plain NumPy, both giving a confidence per class so uncertain frames
+# can be dropped. The rules stay available as RuleClassifier, the baseline.
+#
+#   python gesture_classifier.py --data ok=ok.lmrec --data none=idle.lmrec ... --out gestures.npz
+#   python gesture_classifier.py                      (synthetic hands, benchmark only)
+#
+# One recording per label, recorded with RECORD_LANDMARKS in virtual_touchpad.py
+# while holding that gesture; "none" is everything that should not trigger.
+# The biggest hand of every frame is a sample.
+#
+# The touchpad tracks the biggest hand whether it is a left or a right one, so
+# "Left" hands are mirrored before their features are computed: a model
+# trained on one hand works on the other (synthetic_hands are "Right" hands).
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from hand_features import compute_features, compute_features_one, classify, GESTURE_ORDER
+
+NONE_LABEL = "none"  # class for "no gesture"; predicted as None
+MIRRORED = "Left"  # handedness of the hands that get mirrored
+_TRIU = np.triu_indices(5, k=1)
+
+
+def landmark_features(pts, features=None, handedness=None):
+    """
+    pts: (21, 3) or (N, 21, 3) landmarks
+    handedness: "Left" / "Right" of the hand (one per hand for a stack), None = as is
+    Returns (D,) or (N, D) float32 rows that don't depend on where the hand is,
+    how big it is, how it is rotated in the image plane or which hand it is:
+      42  x, y relative to the wrist, in units of wrist -> middle MCP, rotated
+          so that direction points up, x mirrored for left hands
+       5  finger straightness (hand_features)
+      10  pairwise fingertip distances, same units
+    Straightness and fingertip distances don't change under mirroring, so the
+    hand's own compute_features output can be passed as `features`.
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    if features is None:
+        features = compute_features(pts)
+    xy = pts[..., :2] - pts[..., :1, :2]
+    if handedness is not None:
+        mirror = np.asarray(handedness, dtype=object) == MIRRORED  # () or (N,)
+        if mirror.any():
+            sign = np.where(mirror, -1.0, 1.0)
+            xy = xy * np.stack([sign, np.ones_like(sign)], axis=-1)[..., None, :]
+    axis = xy[..., 9, :]  # wrist -> middle finger MCP
+    scale = np.sqrt((axis * axis).sum(-1))
+    scale = np.where(scale > 0, scale, 1.0)
+    # rotation taking `axis` to (0, -1), i.e. "up" in image coordinates
+    c = -axis[..., 1] / scale
+    s = axis[..., 0] / scale
+    rx = c[..., None] * xy[..., 0] - s[..., None] * xy[..., 1]
+    ry = s[..., None] * xy[..., 0] + c[..., None] * xy[..., 1]
+    rot = np.stack([rx, ry], axis=-1) / scale[..., None, None]
+    tips = features["tip_dist"][..., _TRIU[0], _TRIU[1]] / scale[..., None]
+    return np.concatenate(
+        [rot.reshape(rot.shape[:-2] + (42,)), features["straightness"], tips], axis=-1
+    ).astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Classifiers: predict_proba(pts) -> (N, len(classes)), and a per-hand call
+# ---------------------------------------------------------------------------
+class GestureClassifier(ABC):
+    """Base class; subclasses set `classes` and implement predict_proba and _params."""
+
+    kind = None
+    classes = ()
+
+    @abstractmethod
+    def predict_proba(self, pts, features=None, handedness=None):
+        """
+        pts: (N, 21, 3) -> (N, len(self.classes)) class probabilities.
+        handedness: N "Left" / "Right" labels, None = take the hands as they are
+        """
+
+    def predict(self, pts, features=None, handedness=None):
+        """(labels, confidences) for a stack of hands; labels are class names."""
+        proba = self.predict_proba(pts, features, handedness)
+        best = proba.argmax(axis=1)
+        return np.asarray(self.classes, dtype=object)[best], proba[np.arange(len(best)), best]
+
+    def __call__(self, pts, features=None, handedness=None):
+        """
+        One (21, 3) hand -> (gesture name or None, confidence). `features` is the
+        hand's compute_features (or compute_features_one) output when the caller
+        already has it, `handedness` its "Left" / "Right" label.
+        """
+        hands = None if handedness is None else [handedness]
+        proba = self.predict_proba(np.asarray(pts)[None], _batched(features), hands)[0]
+        best = int(proba.argmax())
+        label = self.classes[best]
+        return (None if label == NONE_LABEL else label), float(proba[best])
+
+    def save(self, path):
+        np.savez(path, kind=self.kind, classes=np.asarray(self.classes), **self._params())
+
+    @abstractmethod
+    def _params(self):
+        """Arrays / scalars save() writes next to kind and classes."""
+
+
+def _batched(features):
+    if features is None:
+        return None
+    return {k: np.asarray(v)[None] for k, v in features.items()}
+
+
+class RuleClassifier(GestureClassifier):
+    """hand_features.classify behind the classifier interface; always fully confident."""
+
+    kind = "rules"
+
+    def __init__(self, order=GESTURE_ORDER):
+        self.classes = tuple(order) + (NONE_LABEL,)
+        self._column = {name: i for i, name in enumerate(self.classes)}
+
+    def predict_proba(self, pts, features=None, handedness=None):
+        # the rules only use mirror-invariant features, handedness doesn't matter
+        if features is None:
+            features = compute_features(pts)
+        labels = classify(features)
+        proba = np.zeros((len(labels), len(self.classes)), dtype=np.float32)
+        cols = [self._column[NONE_LABEL if name is None else name] for name in labels]
+        proba[np.arange(len(labels)), cols] = 1.0
+        return proba
+
+    def _params(self):
+        return {}  # the rules are code; classes carry the order
+
+
+class _Standardized(GestureClassifier):
+    """Shared by the learned models: rows are z-scored with the training statistics."""
+
+    def _fit_scaler(self, X):
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0) + 1e-6
+
+    def _rows(self, pts, features, handedness):
+        return (landmark_features(pts, features, handedness) - self.mean) / self.std
+
+
+class KnnClassifier(_Standardized):
+    kind = "knn"
+
+    def __init__(self, k=7):
+        self.k = k
+
+    def fit(self, pts, labels, handedness=None, max_samples=4000, seed=0):
+        """
+        pts: (N, 21, 3), labels: N class names, handedness: N "Left" / "Right".
+        Keeps at most `max_samples` rows (picked at random) so a query stays
+        one small matrix product.
+        """
+        labels = np.asarray(labels)
+        self.classes = tuple(sorted(set(labels.tolist())))
+        X = landmark_features(pts, handedness=handedness)
+        if len(X) > max_samples:
+            keep = np.random.default_rng(seed).choice(len(X), max_samples, replace=False)
+            X, labels = X[keep], labels[keep]
+        self._fit_scaler(X)
+        self.X = (X - self.mean) / self.std
+        self.y = np.searchsorted(self.classes, labels)
+        self._xx = (self.X * self.X).sum(axis=1)
+        return self
+
+    def predict_proba(self, pts, features=None, handedness=None):
+        Q = self._rows(pts, features, handedness)
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2; the |q|^2 term doesn't change the ranking
+        d = self._xx[None, :] - 2.0 * (Q @ self.X.T)
+        k = min(self.k, len(self.X))
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        dist = d[np.arange(len(Q))[:, None], nearest] + (Q * Q).sum(axis=1)[:, None]
+        weight = 1.0 / (np.sqrt(np.maximum(dist, 0.0)) + 1e-3)
+        proba = np.zeros((len(Q), len(self.classes)), dtype=np.float32)
+        np.add.at(proba, (np.arange(len(Q))[:, None], self.y[nearest]), weight)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def _params(self):
+        return {"k": self.k, "X": self.X, "y": self.y, "mean": self.mean, "std": self.std}
+
+    @classmethod
+    def _from_params(cls, classes, p):
+        model = cls(int(p["k"]))
+        model.classes = classes
+        model.X, model.y, model.mean, model.std = p["X"], p["y"], p["mean"], p["std"]
+        model._xx = (model.X * model.X).sum(axis=1)
+        return model
+
+
+class MlpClassifier(_Standardized):
+    """One hidden tanh layer and a softmax, trained full-batch with Adam."""
+
+    kind = "mlp"
+
+    def __init__(self, hidden=32):
+        self.hidden = hidden
+
+    def fit(self, pts, labels, handedness=None, epochs=400, lr=0.01, l2=1e-4, seed=0):
+        """pts: (N, 21, 3), labels: N class names, handedness: N "Left" / "Right"."""
+        labels = np.asarray(labels)
+        self.classes = tuple(sorted(set(labels.tolist())))
+        X = landmark_features(pts, handedness=handedness).astype(np.float64)
+        self._fit_scaler(X)
+        X = (X - self.mean) / self.std
+        y = np.searchsorted(self.classes, labels)
+        n, dim = X.shape
+        n_cls = len(self.classes)
+        # inverse-frequency weights so a long "none" recording doesn't swamp the rest
+        counts = np.bincount(y, minlength=n_cls)
+        sample_w = (n / (n_cls * np.maximum(counts, 1)))[y] / n
+        onehot = np.eye(n_cls)[y]
+
+        rng = np.random.default_rng(seed)
+        params = [
+            rng.normal(0, 1 / np.sqrt(dim), (dim, self.hidden)),
+            np.zeros(self.hidden),
+            rng.normal(0, 1 / np.sqrt(self.hidden), (self.hidden, n_cls)),
+            np.zeros(n_cls),
+        ]
+        m = [np.zeros_like(p) for p in params]
+        v = [np.zeros_like(p) for p in params]
+        b1, b2 = 0.9, 0.999
+        for step in range(1, epochs + 1):
+            W1, c1, W2, c2 = params
+            h = np.tanh(X @ W1 + c1)
+            proba = _softmax(h @ W2 + c2)
+            g_out = (proba - onehot) * sample_w[:, None]
+            g_h = (g_out @ W2.T) * (1 - h * h)
+            grads = [X.T @ g_h + l2 * W1, g_h.sum(0), h.T @ g_out + l2 * W2, g_out.sum(0)]
+            for p, g, mi, vi in zip(params, grads, m, v):
+                mi *= b1
+                mi += (1 - b1) * g
+                vi *= b2
+                vi += (1 - b2) * g * g
+                p -= lr * (mi / (1 - b1**step)) / (np.sqrt(vi / (1 - b2**step)) + 1e-8)
+        self.W1, self.c1, self.W2, self.c2 = (p.astype(np.float32) for p in params)
+        self.mean = self.mean.astype(np.float32)
+        self.std = self.std.astype(np.float32)
+        return self
+
+    def predict_proba(self, pts, features=None, handedness=None):
+        h = np.tanh(self._rows(pts, features, handedness) @ self.W1 + self.c1)
+        return _softmax(h @ self.W2 + self.c2)
+
+    def _params(self):
+        return {"W1": self.W1, "c1": self.c1, "W2": self.W2, "c2": self.c2,
+                "mean": self.mean, "std": self.std}
+
+    @classmethod
+    def _from_params(cls, classes, p):
+        model = cls(p["W1"].shape[1])
+        model.classes = classes
+        model.W1, model.c1, model.W2, model.c2 = p["W1"], p["c1"], p["W2"], p["c2"]
+        model.mean, model.std = p["mean"], p["std"]
+        return model
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+MODELS = {"knn": KnnClassifier, "mlp": MlpClassifier}
+
+
+def load_classifier(path):
+    """A classifier saved with .save(); "rules" gives the built-in RuleClassifier."""
+    if path == "rules":
+        return RuleClassifier()
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"])
+        classes = tuple(str(c) for c in data["classes"])
+        if kind == RuleClassifier.kind:
+            return RuleClassifier(classes[:-1])
+        if kind not in MODELS:
+            raise ValueError(f"{path}: unknown gesture model kind {kind!r}")
+        return MODELS[kind]._from_params(classes, {k: data[k] for k in data.files})
+
+
+# ---------------------------------------------------------------------------
+# Training data
+# ---------------------------------------------------------------------------
+def load_labelled(pairs, test_fraction=0.25):
+    """
+    pairs: "label=path.lmrec" strings. The last `test_fraction` of every
+    recording is held out (by time, so neighbouring frames don't leak).
+    Returns (train_pts, train_labels, train_handedness), (test_pts, test_labels,
+    test_handedness).
+    """
+    from landmark_recorder import LandmarkRecording
+
+    train, test = ([], [], []), ([], [], [])
+    for pair in pairs:
+        label, _, path = pair.partition("=")
+        if not path:
+            raise SystemExit(f"expected LABEL=PATH, got {pair!r}")
+        _, pts, hands = LandmarkRecording(path).biggest_hand(handedness=True)
+        seen = ~np.isnan(pts[:, 0, 0])
+        pts, hands = pts[seen].astype(np.float64), hands[seen]
+        cut = int(len(pts) * (1 - test_fraction))
+        for (p, l, h), part, part_hands in ((train, pts[:cut], hands[:cut]), (test, pts[cut:], hands[cut:])):
+            p.append(part)
+            l.extend([label] * len(part))
+            h.extend(part_hands)
+        left = int((hands == MIRRORED).sum())
+        print(f"[DATA] {label:<6} {len(pts):6d} frames ({left} {MIRRORED.lower()} hand) from {path}")
+    return (
+        (np.concatenate(train[0]), np.array(train[1]), np.array(train[2], dtype=object)),
+        (np.concatenate(test[0]), np.array(test[1]), np.array(test[2], dtype=object)),
+    )
+
+
+# finger states of the synthetic poses: thumb, index, middle, ring, pinky
+_POSES = {
+    "two": ("curl", "straight", "straight", "curl", "curl"),
+    "seven": ("straight", "straight", "curl", "curl", "curl"),
+    "ok": ("pinch", "pinch", "straight", "straight", "straight"),
+    "four": ("curl", "straight", "straight", "straight", "straight"),
+    # none: open palm, fist and "three"
+    "open": ("straight",) * 5,
+    "fist": ("curl",) * 5,
+    "three": ("curl", "straight", "straight", "straight", "curl"),
+}
+_BASES = np.array([[-0.35, -0.3], [-0.33, -1.0], [-0.11, -1.0], [0.11, -0.95], [0.32, -0.85]])
+_SEGMENTS = np.array([[0.4, 0.35, 0.3], [0.45, 0.28, 0.22], [0.5, 0.3, 0.24], [0.46, 0.28, 0.22], [0.36, 0.22, 0.2]])
+_BENDS = {"straight": (0.0, 0.0, 0.0), "curl": (1.0, 1.7, 1.0), "thumb_curl": (0.6, 1.2, 0.5)}
+
+
+def synthetic_hands(n, noise=1.0, seed=0):
+    """
+    Labelled fake hands for the benchmark when no recordings are given:
+    (n, 21, 3) landmarks in image coordinates and their labels. `noise` scales
+    joint jitter and how far bends stray from the ideal pose.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(_POSES)
+    pick = rng.integers(0, len(names), n)
+    out = np.zeros((n, 21, 3))
+    labels = []
+    for i in range(n):
+        pose = _POSES[names[pick[i]]]
+        labels.append(names[pick[i]] if names[pick[i]] in GESTURE_ORDER else NONE_LABEL)
+        pts = np.zeros((21, 2))
+        for f in range(5):
+            base = _BASES[f]
+            angle = np.arctan2(base[1], base[0]) if f == 0 else -np.pi / 2 + 0.12 * (f - 2.5)
+            state = pose[f]
+            bends = _BENDS["thumb_curl" if (f == 0 and state == "curl") else state] if state != "pinch" else (0.5, 0.9, 0.4)
+            sign = 1.0 if f == 0 else -1.0 if state == "pinch" else 1.0
+            prev = base
+            pts[1 + 4 * f] = base
+            for j in range(3):
+                angle = angle + sign * (bends[j] + rng.normal(0, 0.15 * noise))
+                prev = prev + _SEGMENTS[f, j] * np.array([np.cos(angle), np.sin(angle)])
+                pts[2 + 4 * f + j] = prev
+        if pose[0] == "pinch":
+            # bring the thumb round to touch the index tip
+            target = pts[8] + rng.normal(0, 0.08 * noise, 2)
+            start = pts[1]
+            for j, frac in enumerate((0.4, 0.72, 1.0)):
+                bow = np.array([-(target - start)[1], (target - start)[0]]) * 0.15 * np.sin(np.pi * frac)
+                pts[2 + j] = start + (target - start) * frac + bow
+        pts += rng.normal(0, 0.03 * noise, pts.shape)
+        rot = rng.normal(0, 0.25 * noise)
+        R = np.array([[np.cos(rot), -np.sin(rot)], [np.sin(rot), np.cos(rot)]])
+        scale = rng.uniform(0.1, 0.2)
+        out[i, :, :2] = pts @ R.T * scale + rng.uniform(0.3, 0.7, 2)
+        out[i, :, 2] = rng.normal(0, 0.02, 21)
+    return out, np.array(labels)
+
+
+# ---------------------------------------------------------------------------
+# Train + benchmark: accuracy, per-class recall, confident-frame coverage and
+# per-frame latency (one hand per call, as in the touchpad loop).
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser("train / benchmark gesture classifiers")
+    ap.add_argument("--data", action="append", default=[], metavar="LABEL=PATH",
+                    help="labelled .lmrec recording; repeat per label (use 'none' for no gesture)")
+    ap.add_argument("--model", choices=sorted(MODELS), default="mlp", help="model saved with --out")
+    ap.add_argument("--out", help="where to save the trained --model (.npz)")
+    ap.add_argument("--min-confidence", type=float, default=0.6)
+    ap.add_argument("--noise", type=float, default=1.5, help="synthetic data only")
+    args = ap.parse_args()
+
+    if args.data:
+        (train_pts, train_y, train_h), (test_pts, test_y, test_h) = load_labelled(args.data)
+    else:
+        train_pts, train_y = synthetic_hands(6000, args.noise, seed=1)
+        test_pts, test_y = synthetic_hands(2000, args.noise, seed=2)
+        train_h, test_h = ["Right"] * len(train_y), ["Right"] * len(test_y)
+        print(f"[DATA] synthetic hands, noise {args.noise:g}: {len(train_y)} train / {len(test_y)} test")
+    # the test hands again as the other hand: mirrored image, swapped label
+    mirror_pts = test_pts.copy()
+    mirror_pts[..., 0] = 1.0 - mirror_pts[..., 0]
+    mirror_h = ["Right" if h == MIRRORED else MIRRORED for h in test_h]
+
+    models = {"rules": RuleClassifier()}
+    for kind, cls in MODELS.items():
+        t0 = time.perf_counter()
+        models[kind] = cls().fit(train_pts, train_y, train_h)
+        print(f"[TRAIN] {kind}: {time.perf_counter() - t0:.2f} s")
+
+    classes = sorted(set(test_y.tolist()))
+    print(f"\n{'':8}{'acc':>7}{'mirror':>7}{'conf.acc':>10}{'kept':>7}{'us/frame':>10}  recall "
+          + " ".join(f"{c:>6}" for c in classes))
+    for name, model in models.items():
+        pred, conf = model.predict(test_pts, handedness=test_h)
+        mirror_acc = (model.predict(mirror_pts, handedness=mirror_h)[0] == test_y).mean()
+        correct = pred == test_y
+        confident = conf >= args.min_confidence
+        recall = [correct[test_y == c].mean() for c in classes]
+        # one hand per call; its features are already paid for by touchpad_logic
+        sample = [(pts, compute_features_one(pts), h) for pts, h in zip(test_pts[:500], test_h)]
+        t0 = time.perf_counter()
+        for pts, features, h in sample:
+            model(pts, features, h)
+        us = (time.perf_counter() - t0) / len(sample) * 1e6
+        conf_acc = correct[confident].mean() if confident.any() else float("nan")
+        print(f"{name:8}{correct.mean():7.3f}{mirror_acc:7.3f}{conf_acc:10.3f}{confident.mean():7.2f}{us:10.1f}         "
+              + " ".join(f"{r:6.2f}" for r in recall))
+    print(f"(mirror: accuracy on the test hands as the other hand; conf.acc / kept: accuracy on,\n"
+          f" and share of, frames with confidence >= {args.min_confidence})")
+
+    if args.out:
+        models[args.model].save(args.out)
+        reloaded = load_classifier(args.out)
+        assert np.allclose(reloaded.predict_proba(test_pts[:50], handedness=test_h[:50]),
+                           models[args.model].predict_proba(test_pts[:50], handedness=test_h[:50]))
+        print(f"[SAVE] {args.model} -> {args.out}")
@@ -0,0 +1,283 @@
+# hand_features.py — batched NumPy feature kernel for the 21 MediaPipe hand landmarks
+#
+# Every function here takes a (21, 3) array for one hand or an (N, 21, 3) stack
+# (a whole recorded session) and works on both without Python-level loops.
+# For the one hand the touchpad tracks per frame, NumPy's per-call overhead
+# costs more than the arithmetic; compute_features_one is the same features in
+# plain Python for that case.
+import math
+
+import numpy as np
+
+# landmark indices (same layout as mp.solutions.hands.HandLandmark)
+WRIST = 0
+THUMB, INDEX, MIDDLE, RING, PINKY = range(5)
+FINGER_NAMES = ("thumb", "index", "middle", "ring", "pinky")
+
+# per finger: base joint, middle joint, tip
+# (the thumb uses CMC -> MCP -> TIP, matching the old finger_straight(lm[1], lm[2], lm[4]))
+FINGER_MCP = np.array([1, 5, 9, 13, 17])
+FINGER_PIP = np.array([2, 6, 10, 14, 18])
+FINGER_TIP = np.array([4, 8, 12, 16, 20])
+PALM_IDX = np.arange(0, 5)  # wrist + thumb base joints, used as the palm scale
+_CHAIN = np.stack([FINGER_MCP, FINGER_PIP, FINGER_TIP])  # (3, 5): one gather for all joints
+_PALM = slice(0, 5)  # PALM_IDX as a slice (a view, no gather)
+_FINGERS = tuple(zip(FINGER_MCP.tolist(), FINGER_PIP.tolist(), FINGER_TIP.tolist()))
+# (i, j, tip i, tip j) for every fingertip pair
+_TIP_PAIRS = tuple((i, j, FINGER_TIP[i].item(), FINGER_TIP[j].item()) for i in range(5) for j in range(i + 1, 5))
+
+STRAIGHT_THRESHOLD = 0.9  # cosine between mcp->pip and pip->tip
+OK_CLOSE_THRESHOLD = 0.1  # thumb tip <-> index tip distance (normalized coords)
+
+# checked in this order, the first match wins
+GESTURE_ORDER = ("two", "seven", "ok", "four")
+
+
+def landmarks_to_array(landmarks, out=None):
+    """
+    landmarks: the 21 landmark objects of one hand (hand.landmark)
+    Returns a (21, 3) float64 array of x, y, z. Pass `out` to reuse a buffer.
+    """
+    if out is None:
+        out = np.empty((21, 3), dtype=np.float64)
+    for i, lm in enumerate(landmarks):
+        out[i, 0] = lm.x
+        out[i, 1] = lm.y
+        out[i, 2] = lm.z
+    return out
+
+
+def hands_to_array(multi_hand_landmarks):
+    """Stack every detected hand into a (N, 21, 3) array."""
+    return np.stack([landmarks_to_array(h.landmark) for h in multi_hand_landmarks])
+
+
+def _norm2(v):
+    # |v| for the last axis of size 2, same operation order as the scalar code
+    return np.sqrt(v[..., 0] * v[..., 0] + v[..., 1] * v[..., 1])
+
+
+def compute_features(pts, straight_threshold=STRAIGHT_THRESHOLD):
+    """
+    pts: (21, 3) or (N, 21, 3) landmark array
+    Returns a dict of arrays with the same leading shape:
+      bones        (..., 5, 2)  pip -> tip vector per finger
+      direction    (..., 5, 2)  unit pip -> tip vector (zero if degenerate)
+      straightness (..., 5)     cosine between mcp->pip and pip->tip (0 if degenerate)
+      straight     (..., 5)     straightness >= straight_threshold
+      tip_dist     (..., 5, 5)  pairwise fingertip distances
+      hand_box     (..., 2)     bounding box width, height of all landmarks
+      hand_area    (...)        bounding box area
+      palm_box     (..., 2)     bounding box width, height of the palm landmarks
+    All geometry is 2D (x, y), like the original per-landmark helpers.
+    """
+    xy = np.asarray(pts, dtype=np.float64)[..., :2]
+    # kept to as few array ops as possible: a single hand is the common call and
+    # pays ~1 us of NumPy overhead per op, whatever the array size
+    joints = xy[..., _CHAIN, :]  # (..., 3, 5, 2) mcp / pip / tip
+    seg = joints[..., 1:, :, :] - joints[..., :-1, :, :]  # (..., 2, 5, 2) mcp->pip, pip->tip
+    sq = seg * seg
+    lens = np.sqrt(sq[..., 0] + sq[..., 1])  # same operation order as the scalar code
+    base, bones = seg[..., 0, :, :], seg[..., 1, :, :]
+    base_len, bone_len = lens[..., 0, :], lens[..., 1, :]
+
+    prod = base * bones
+    dot = prod[..., 0] + prod[..., 1]
+    bone_ok = bone_len != 0
+    valid = (base_len != 0) & bone_ok
+    # degenerate fingers divide by 1 instead (dot / zero bones are 0 there anyway)
+    straightness = dot / np.where(valid, base_len * bone_len, 1.0)
+    direction = bones / np.where(bone_ok, bone_len, 1.0)[..., None]
+
+    tip = joints[..., 2, :, :]
+    diff = tip[..., :, None, :] - tip[..., None, :, :]
+    diff *= diff
+    tip_dist = np.sqrt(diff[..., 0] + diff[..., 1])
+
+    hand_box = np.maximum.reduce(xy, axis=-2) - np.minimum.reduce(xy, axis=-2)
+    palm = xy[..., _PALM, :]
+    palm_box = np.maximum.reduce(palm, axis=-2) - np.minimum.reduce(palm, axis=-2)
+
+    return {
+        "bones": bones,
+        "direction": direction,
+        "straightness": straightness,
+        "straight": valid & (straightness >= straight_threshold),
+        "tip_dist": tip_dist,
+        "hand_box": hand_box,
+        "hand_area": hand_box[..., 0] * hand_box[..., 1],
+        "palm_box": palm_box,
+    }
+
+
+def compute_features_one(pts, straight_threshold=STRAIGHT_THRESHOLD):
+    """
+    compute_features for one (21, 3) hand, in plain Python: the same keys and
+    values (bit for bit), as nested lists / floats instead of arrays.
+    np.asarray on any value gives the array compute_features would return.
+    """
+    if isinstance(pts, np.ndarray):
+        xs, ys = pts[:, 0].tolist(), pts[:, 1].tolist()
+    else:
+        xs, ys = [p[0] for p in pts], [p[1] for p in pts]
+    sqrt = math.sqrt
+
+    bones, direction, straightness, straight = [], [], [], []
+    for mcp, pip, tip in _FINGERS:
+        bx, by = xs[pip] - xs[mcp], ys[pip] - ys[mcp]
+        vx, vy = xs[tip] - xs[pip], ys[tip] - ys[pip]
+        base_len = sqrt(bx * bx + by * by)
+        bone_len = sqrt(vx * vx + vy * vy)
+        dot = bx * vx + by * vy
+        valid = base_len != 0 and bone_len != 0
+        cos = dot / (base_len * bone_len) if valid else dot
+        norm = bone_len if bone_len != 0 else 1.0
+        bones.append([vx, vy])
+        direction.append([vx / norm, vy / norm])
+        straightness.append(cos)
+        straight.append(valid and cos >= straight_threshold)
+
+    tip_dist = [[0.0] * 5, [0.0] * 5, [0.0] * 5, [0.0] * 5, [0.0] * 5]
+    for i, j, a, b in _TIP_PAIRS:
+        dx, dy = xs[a] - xs[b], ys[a] - ys[b]
+        tip_dist[i][j] = tip_dist[j][i] = sqrt(dx * dx + dy * dy)
+
+    hand_box = [max(xs) - min(xs), max(ys) - min(ys)]
+    palm_x, palm_y = xs[_PALM], ys[_PALM]
+    return {
+        "bones": bones,
+        "direction": direction,
+        "straightness": straightness,
+        "straight": straight,
+        "tip_dist": tip_dist,
+        "hand_box": hand_box,
+        "hand_area": hand_box[0] * hand_box[1],
+        "palm_box": [max(palm_x) - min(palm_x), max(palm_y) - min(palm_y)],
+    }
+
+
+def _is_one(features):
+    # compute_features_one output or compute_features of a single (21, 3) hand
+    s = features["straight"]
+    return isinstance(s, list) or s.ndim == 1
+
+
+def gesture_flags(features, ok_close=OK_CLOSE_THRESHOLD):
+    """
+    Evaluates every gesture predicate at once.
+    Returns a dict name -> bool array (one entry per hand), plain bools for one hand.
+    """
+    if _is_one(features):
+        return _flags_one(features, ok_close)
+    s = features["straight"]
+    thumb, index, middle, ring, pinky = (s[..., i] for i in range(5))
+    d = features["direction"]
+
+    # index vs middle and middle vs pinky pointing directions
+    im_dot = d[..., INDEX, 0] * d[..., MIDDLE, 0] + d[..., INDEX, 1] * d[..., MIDDLE, 1]
+    mp_dot = d[..., MIDDLE, 0] * d[..., PINKY, 0] + d[..., MIDDLE, 1] * d[..., PINKY, 1]
+
+    return {
+        # index and middle together, pinky pointing the other way
+        "two": (im_dot > 0.5) & (mp_dot < -0.6),
+        "seven": (im_dot < 0.6) & (mp_dot > 0.5) & thumb & index,
+        # thumb tip touches index tip, the other three fingers are straight
+        "ok": (features["tip_dist"][..., INDEX, THUMB] <= ok_close)
+        & ~index
+        & middle
+        & ring
+        & pinky,
+        "three": index & middle & ring & ~thumb & ~pinky,
+        "four": ~thumb & index & middle & ring & pinky,
+    }
+
+
+def _flags_one(features, ok_close):
+    """gesture_flags for a single hand in plain Python: a few scalar compares
+    are far cheaper than the same number of 0-d NumPy ops."""
+    s, d = features["straight"], features["direction"]
+    if isinstance(s, np.ndarray):
+        s, d = s.tolist(), d.tolist()
+    thumb, index, middle, ring, pinky = s
+    (ix, iy), (mx, my), (px, py) = d[INDEX], d[MIDDLE], d[PINKY]
+    im_dot = ix * mx + iy * my
+    mp_dot = mx * px + my * py
+    return {
+        "two": im_dot > 0.5 and mp_dot < -0.6,
+        "seven": im_dot < 0.6 and mp_dot > 0.5 and thumb and index,
+        "ok": bool(features["tip_dist"][INDEX][THUMB] <= ok_close)
+        and not index
+        and middle
+        and ring
+        and pinky,
+        "three": index and middle and ring and not thumb and not pinky,
+        "four": not thumb and index and middle and ring and pinky,
+    }
+
+
+def classify(features, order=GESTURE_ORDER):
+    """
+    Returns the gesture name (or None) for one hand, or an object array of
+    names for a stack of hands.
+    """
+    flags = gesture_flags(features)
+    if _is_one(features):
+        return next((name for name in order if flags[name]), None)
+    labels = np.full(features["hand_area"].shape, None, dtype=object)
+    # lowest priority first so earlier names overwrite later ones
+    for name in reversed(order):
+        labels[flags[name]] = name
+    if labels.ndim == 0:
+        return labels.item()
+    return labels
+
+
+def classify_landmarks(pts):
+    """Shortcut: (21, 3) or (N, 21, 3) landmarks -> gesture name(s)."""
+    return classify(compute_features(pts))
+
+
+# ---------------------------------------------------------------------------
+# Self check: compares against the original per-landmark predicates that
+# virtual_touchpad.py used before this kernel (kept in test_hand_features.py,
+# which runs the same comparison under pytest), then times them all.
+#   python hand_features.py
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import time
+    from collections import Counter
+
+    from test_hand_features import as_landmarks, random_hands, reference_decide
+
+    N = 20000
+    stack = random_hands(N)
+
+    objects = [as_landmarks(p) for p in stack]
+    t0 = time.perf_counter()
+    expected = [reference_decide(lm) for lm in objects]
+    t_ref = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scalar = [classify(compute_features_one(p)) for p in stack]
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [classify_landmarks(p) for p in stack]
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batched = classify_landmarks(stack)
+    t_batch = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(expected, scalar))
+    mismatches += sum(a != b for a, b in zip(expected, single))
+    mismatches += sum(a != b for a, b in zip(expected, batched))
+    print(f"hands: {N}, labels: {dict(Counter(expected))}")
+    print(f"mismatches vs reference: {mismatches}")
+    # one hand: plain Python (the touchpad's per-frame path); stacks: the kernel
+    print(f"reference (per hand) : {t_ref / N * 1e6:8.2f} us/hand")
+    print(f"scalar    (per hand) : {t_scalar / N * 1e6:8.2f} us/hand")
+    print(f"kernel    (per hand) : {t_single / N * 1e6:8.2f} us/hand")
+    print(f"kernel    (batched)  : {t_batch / N * 1e6:8.2f} us/hand")
+    if mismatches:
+        raise SystemExit(1)
@@ -0,0 +1,315 @@
+# hud_compositor.py — dirty-rectangle renderer for the transparent touchpad HUD
+#
+# Black (0, 0, 0) is the transparent colour key of the HUD window, so instead of
+# clearing the whole screen-sized buffer every frame we only clear the boxes that
+# were drawn into on the previous frame.
+import math
+import numpy as np
+import cv2
+
+from velocity_estimator import SlidingVelocity
+
+TRAIL_COLOR = (60, 220, 255)  # (B, G, R) of a fresh trail point
+GESTURE_POINT_COLOR = (40, 210, 255)
+
+
+class HudCompositor:
+    def __init__(self, width, height, scale=1.0, trail_fade_sec=0.5, fade_levels=16):
+        """
+        width, height: screen size in pixels; all draw calls take screen coords
+        scale: internal render resolution (e.g. 0.5 renders at half size and the
+               fullscreen HUD window stretches it back up)
+        fade_levels: how many steps the trail fade is quantized into
+        """
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.buffer = np.zeros(
+            (max(1, round(height * scale)), max(1, round(width * scale)), 3),
+            dtype=np.uint8,
+        )
+        self.trail_fade_sec = trail_fade_sec
+        self.fade_levels = fade_levels
+
+        # level -> (colour, stroke width), level 0 = fully faded; the stroke is as
+        # wide as the dots the trail used to put on every point (round joins)
+        self._fade_lut = [None]
+        for level in range(1, fade_levels + 1):
+            a = level / fade_levels
+            color = tuple(int(c * a) for c in TRAIL_COLOR)
+            thickness = max(1, int(10 * a * scale))
+            radius = max(1, int(max(2, int(8 * a)) * scale))
+            self._fade_lut.append((color, max(thickness, 2 * radius)))
+
+        self._dirty = []  # (x0, y0, x1, y1) drawn this frame
+        self._prev_dirty = []  # drawn last frame, cleared on the next begin_frame
+
+        # measurements
+        self.pixels_touched = 0  # cleared + drawn pixels of the last frame
+        self.frames = 0
+        self.total_pixels_touched = 0
+
+    # ---- frame lifecycle ----
+    def begin_frame(self):
+        """Clear only what was drawn last frame."""
+        touched = 0
+        buf = self.buffer
+        for x0, y0, x1, y1 in self._prev_dirty:
+            buf[y0:y1, x0:x1] = 0
+            touched += (x1 - x0) * (y1 - y0)
+        self.pixels_touched = touched
+        self._dirty = []
+
+    def end_frame(self):
+        """Call after the last draw; returns the buffer to show."""
+        drawn = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in self._dirty)
+        self.pixels_touched += drawn
+        self.total_pixels_touched += self.pixels_touched
+        self.frames += 1
+        self._prev_dirty = self._dirty
+        return self.buffer
+
+    def stats(self):
+        total = self.buffer.shape[0] * self.buffer.shape[1]
+        avg = self.total_pixels_touched / self.frames if self.frames else 0.0
+        return {
+            "buffer_pixels": total,
+            "pixels_touched": self.pixels_touched,
+            "avg_pixels_touched": avg,
+            "avg_touched_ratio": avg / total,
+        }
+
+    # ---- helpers ----
+    def _s(self, v):
+        return int(v * self.scale)
+
+    def _mark(self, x0, y0, x1, y1):
+        # clip to the buffer; x1/y1 are exclusive
+        h, w = self.buffer.shape[:2]
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if x1 > x0 and y1 > y0:
+            self._dirty.append((x0, y0, x1, y1))
+
+    def _mark_around(self, x, y, reach):
+        self._mark(x - reach, y - reach, x + reach + 1, y + reach + 1)
+
+    # ---- primitives ----
+    def draw_cursor(self, x, y, color=(0, 255, 255)):
+        img = self.buffer
+        cx, cy = self._s(x), self._s(y)
+        r_dot, r_ring, arm = self._s(10), self._s(20), self._s(30)
+        ring_t = max(1, self._s(2))
+        cv2.circle(img, (cx, cy), max(1, r_dot), color, -1)
+        cv2.circle(img, (cx, cy), max(1, r_ring), color, ring_t)
+        cv2.line(img, (cx - arm, cy), (cx + arm, cy), color, 1)
+        cv2.line(img, (cx, cy - arm), (cx, cy + arm), color, 1)
+        self._mark_around(cx, cy, max(arm, r_ring + ring_t) + 1)
+
+    def draw_trail(self, trail_points, now):
+        """
+        trail_points: deque of (x, y, t), oldest first
+        Segments are grouped by quantized fade level; every run of one level
+        goes out in a single cv2.polylines call.
+        """
+        n = len(trail_points)
+        if n < 2:
+            return
+        pts = np.asarray(trail_points, dtype=np.float64)
+        # age of the newer endpoint of each segment
+        age = now - pts[1:, 2]
+        a = 1.0 - np.clip(age / self.trail_fade_sec, 0.0, 1.0)
+        levels = np.ceil(a * self.fade_levels).astype(np.int64)
+        live = np.flatnonzero(levels > 0)
+        if live.size == 0:
+            return
+        first, last = int(live[0]), int(live[-1])
+        xy = (pts[first : last + 2, :2] * self.scale).astype(np.int32)
+        levels = levels[first : last + 1]
+
+        # segment runs of equal level: [starts[k], ends[k]) in segment indices
+        cuts = np.flatnonzero(np.diff(levels)) + 1
+        starts = np.concatenate(([0], cuts)).tolist()
+        ends = np.concatenate((cuts, [len(levels)])).tolist()
+        runs = {}
+        for s0, s1 in zip(starts, ends):
+            runs.setdefault(int(levels[s0]), []).append(xy[s0 : s1 + 1])
+
+        reach = 0
+        for level, polys in runs.items():
+            if level > 0:
+                color, thickness = self._fade_lut[level]
+                cv2.polylines(self.buffer, polys, False, color, thickness, cv2.LINE_AA)
+                reach = max(reach, thickness)
+
+        x0, y0 = xy.min(axis=0)
+        x1, y1 = xy.max(axis=0)
+        reach += 2  # anti-aliasing fringe
+        self._mark(int(x0) - reach, int(y0) - reach, int(x1) + reach + 1, int(y1) + reach + 1)
+
+    def draw_gesture_points(self, x, y, gesture, offset_px=None):
+        """
+        Draw extra points relative to (x,y) based on gesture.
+        two  -> one above
+        ok   -> two under
+        four -> one above + two under
+        """
+        if not gesture:
+            return
+        if offset_px is None:
+            offset_px = self.height / 10
+
+        offsets = [(0, 0)]
+        if gesture == "two":
+            offsets = [(0, -offset_px)]
+        elif gesture == "ok":
+            offsets = [(0, offset_px), (0, 2 * offset_px)]
+        elif gesture == "four":
+            offsets = [(0, -offset_px), (0, offset_px), (0, 2 * offset_px)]
+        elif gesture == "seven":
+            offsets = [(offset_px * 2, -offset_px), (-offset_px, -offset_px)]
+
+        img = self.buffer
+        r_dot, r_ring = max(1, self._s(8)), max(1, self._s(14))
+        ring_t = max(1, self._s(2))
+        for dx, dy in offsets:
+            cx, cy = self._s(x + dx), self._s(y + dy)
+            cv2.circle(img, (cx, cy), r_dot, GESTURE_POINT_COLOR, -1, lineType=cv2.LINE_AA)
+            cv2.circle(img, (cx, cy), r_ring, GESTURE_POINT_COLOR, ring_t, lineType=cv2.LINE_AA)
+            self._mark_around(cx, cy, r_ring + ring_t + 1)
+
+    def draw_vline(self, x, color, thickness=1):
+        """Full-height guide line (used while the Alt-Tab switcher is open)."""
+        cx = self._s(x)
+        h = self.buffer.shape[0]
+        cv2.line(self.buffer, (cx, 0), (cx, h), color, thickness)
+        self._mark(cx - thickness - 1, 0, cx + thickness + 2, h)
+
+    def draw_box(self, x0, y0, x1, y1, color, thickness=3):
+        """Rectangle outline in screen coords (e.g. the window an Alt-Tab move targets)."""
+        t = max(1, self._s(thickness))
+        p0, p1 = (self._s(x0), self._s(y0)), (self._s(x1), self._s(y1))
+        cv2.rectangle(self.buffer, p0, p1, color, t)
+        # only the four edges are dirty, not the whole window area
+        self._mark(p0[0] - t, p0[1] - t, p1[0] + t + 1, p0[1] + t + 1)
+        self._mark(p0[0] - t, p1[1] - t, p1[0] + t + 1, p1[1] + t + 1)
+        self._mark(p0[0] - t, p0[1] - t, p0[0] + t + 1, p1[1] + t + 1)
+        self._mark(p1[0] - t, p0[1] - t, p1[0] + t + 1, p1[1] + t + 1)
+
+    def draw_label(self, text, x, y, color, font_scale=0.9):
+        """Text with its baseline-left corner at (x, y) in screen coords."""
+        fs = font_scale * self.scale
+        t = max(1, self._s(2))
+        (tw, th), base = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, fs, t)
+        org = (self._s(x), self._s(y))
+        cv2.putText(self.buffer, text, org, cv2.FONT_HERSHEY_SIMPLEX, fs, color, t, cv2.LINE_AA)
+        self._mark(org[0] - 2, org[1] - th - 2, org[0] + tw + 2, org[1] + base + 2)
+
+
+class LatestSnapshot:
+    """
+    Single-slot hand-over from the gesture thread to the HUD thread. publish()
+    swaps in a new (never mutated afterwards) snapshot with one reference
+    assignment, which is atomic in CPython, so neither side ever waits.
+    """
+
+    def __init__(self):
+        self._item = (0, None)  # (version, snapshot)
+
+    def publish(self, snap):
+        self._item = (self._item[0] + 1, snap)
+
+    def latest(self):
+        """(version, snapshot); version grows by one per publish()."""
+        return self._item
+
+
+class CursorExtrapolator:
+    """
+    Predicts where the cursor is *now* from the last few inference results, so
+    a 60 Hz HUD keeps moving between 15-20 Hz updates instead of stepping.
+    """
+
+    def __init__(self, window_sec=0.15, max_ahead=0.1):
+        """
+        window_sec: how much recent motion the velocity is fitted over
+        max_ahead:  never predict further than this past the newest sample
+        """
+        self.max_ahead = max_ahead
+        self._track = SlidingVelocity(window_sec)
+
+    def reset(self):
+        self._track.clear()
+
+    def update(self, t, x, y):
+        self._track.add(t, x, y)
+
+    def predict(self, t):
+        """(x, y) at time t, or None without samples."""
+        if not len(self._track):
+            return None
+        t_last, x, y, _ = self._track[-1]
+        ahead = min(max(t - t_last, 0.0), self.max_ahead)
+        if ahead == 0.0 or len(self._track) < 2:
+            return x, y
+        vx, vy = self._track.velocity()
+        return x + vx * ahead, y + vy * ahead
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: full clear + redraw vs. dirty rectangles on a moving cursor.
+#   python hud_compositor.py [width height]
+# ---------------------------------------------------------------------------
+def _full_redraw(buf, comp, trail, now, x, y):
+    # what the touchpad loop did before: memset everything, draw straight in
+    buf.fill(0)
+    saved = comp.buffer
+    comp.buffer = buf
+    comp.draw_trail(trail, now)
+    comp.draw_cursor(x, y)
+    comp.draw_gesture_points(x, y, "four")
+    comp.buffer = saved
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from collections import deque
+
+    W, H = (int(sys.argv[1]), int(sys.argv[2])) if len(sys.argv) > 2 else (3840, 2160)
+    FRAMES = 300
+    FPS = 30.0
+
+    def run(comp, full):
+        trail = deque(maxlen=40)
+        buf = np.zeros((H, W, 3), np.uint8)
+        t0 = time.perf_counter()
+        for f in range(FRAMES):
+            now = f / FPS
+            x = int(W / 2 + W / 4 * math.cos(now * 2))
+            y = int(H / 2 + H / 4 * math.sin(now * 3))
+            trail.append((x, y, now))
+            while trail and now - trail[0][2] > comp.trail_fade_sec:
+                trail.popleft()
+            if full:
+                _full_redraw(buf, comp, trail, now, x, y)
+            else:
+                comp.begin_frame()
+                comp.draw_trail(trail, now)
+                comp.draw_cursor(x, y)
+                comp.draw_gesture_points(x, y, "four")
+                comp.end_frame()
+        return (time.perf_counter() - t0) / FRAMES * 1000
+
+    print(f"screen {W}x{H}, {FRAMES} frames")
+    ms = run(HudCompositor(W, H), full=True)
+    print(f"full clear+redraw      : {ms:6.2f} ms/frame, {W * H:>10d} px touched/frame")
+    for scale in (1.0, 0.5):
+        comp = HudCompositor(W, H, scale=scale)
+        ms = run(comp, full=False)
+        st = comp.stats()
+        print(
+            f"dirty rects scale={scale:<4}: {ms:6.2f} ms/frame, "
+            f"{st['avg_pixels_touched']:>10.0f} px touched/frame "
+            f"({st['avg_touched_ratio'] * 100:.1f}% of buffer)"
+        )
@@ -0,0 +1,351 @@
+# inference_backend.py — hand / face models behind one submit-and-collect call
+#
+# "legacy" runs the mp.solutions graphs (Hands, FaceDetection): infer() blocks
+# until the model is done and returns that frame's result. "tasks" runs the
+# MediaPipe Tasks HandLandmarker / FaceDetector in LIVE_STREAM mode: infer()
+# only queues the frame (detect_async) and returns the newest result that came
+# back on MediaPipe's callback thread since the last call, possibly for an
+# earlier frame, or None when nothing new is ready. The caller gets its own
+# `tag` back with each result to pair it with the frame it belongs to.
+# poll() returns such a finished result without queueing a frame, so a caller
+# that skips frames (idle) or waits for the camera can still pick it up as
+# soon as it is there instead of on the next infer().
+#
+# Hand results always look like legacy Hands results (multi_hand_landmarks /
+# multi_handedness), so mirror_result, touchpad_logic and the recorder don't
+# care which backend produced them. Face results are lists of FaceBox.
+#
+#   python inference_backend.py clip.mp4 [--fps 30] [--hand-model hand_landmarker.task]
+import os
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+
+BACKENDS = ("legacy", "tasks")
+HAND_BACKENDS = BACKENDS + ("process",)  # mp.solutions Hands in worker processes (inference_worker)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+HAND_MODEL = os.path.join(SCRIPT_DIR, "hand_landmarker.task")
+FACE_MODEL = os.path.join(SCRIPT_DIR, "blaze_face_short_range.tflite")
+MODEL_URLS = {
+    HAND_MODEL: "https://storage.googleapis.com/mediapipe-models/hand_landmarker/"
+    "hand_landmarker/float16/latest/hand_landmarker.task",
+    FACE_MODEL: "https://storage.googleapis.com/mediapipe-models/face_detector/"
+    "blaze_face_short_range/float16/latest/blaze_face_short_range.tflite",
+}
+
+# one detected face, box in normalized image coordinates
+FaceBox = namedtuple("FaceBox", "score x y w h")
+
+
+class _Stats:
+    """submitted / results / dropped counters and recent submit -> result latencies."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.results = 0
+        self.dropped = 0  # frames the model skipped because it was still busy
+        self.latencies = deque(maxlen=1000)
+
+    def stats(self):
+        lat = np.array(self.latencies) * 1000
+        return {
+            "submitted": self.submitted,
+            "results": self.results,
+            "dropped": self.dropped,
+            "latency_p50_ms": float(np.percentile(lat, 50)) if lat.size else 0.0,
+            "latency_p95_ms": float(np.percentile(lat, 95)) if lat.size else 0.0,
+        }
+
+
+# ---------------- synchronous (mp.solutions) ----------------
+class SyncBackend(_Stats):
+    """
+    Wraps anything with a blocking process(rgb): mp.solutions Hands or
+    FaceDetection, or a RoiHandTracker around them.
+    """
+
+    asynchronous = False
+
+    def __init__(self, detector, convert=None):
+        """convert: optional function applied to each raw result (e.g. to FaceBox lists)"""
+        super().__init__()
+        self.detector = detector
+        self._convert = convert
+
+    def infer(self, rgb, t, tag=None):
+        """(tag, result) for this frame; never None."""
+        self.submitted += 1
+        t0 = time.monotonic()
+        result = self.detector.process(rgb)
+        self.latencies.append(time.monotonic() - t0)
+        self.results += 1
+        return tag, (self._convert(result, rgb) if self._convert else result)
+
+    def poll(self):
+        """infer() already returned every result."""
+        return None
+
+    def close(self):
+        self.detector.close()
+
+
+def legacy_hands(max_hands=2, min_detection=0.7, min_tracking=0.7, model_complexity=1):
+    """model_complexity: 1 = full landmark model, 0 = lite (faster, a little less accurate)"""
+    import mediapipe as mp
+
+    return mp.solutions.hands.Hands(
+        min_detection_confidence=min_detection,
+        min_tracking_confidence=min_tracking,
+        max_num_hands=max_hands,
+        model_complexity=model_complexity,
+        static_image_mode=False,
+    )
+
+
+def _legacy_faces_to_boxes(result, rgb):
+    out = []
+    for d in (result.detections if result else None) or ():
+        rb = d.location_data.relative_bounding_box
+        out.append(FaceBox(float(d.score[0]) if d.score else 0.0, rb.xmin, rb.ymin,
+                           max(rb.width, 0.0), max(rb.height, 0.0)))
+    return out
+
+
+# ---------------- asynchronous (MediaPipe Tasks, LIVE_STREAM) ----------------
+class _LiveStream(_Stats):
+    """
+    Common part of the Tasks backends: timestamps, pending frames and the
+    single result slot written by MediaPipe's callback thread.
+    """
+
+    asynchronous = True
+
+    def __init__(self):
+        super().__init__()
+        self._task = None
+        self._pending = {}  # timestamp_ms -> (tag, submit time)
+        self._lock = threading.Lock()
+        self._last_ts = -1
+        self._done = None  # newest (tag, result), taken by infer() / poll()
+
+    def _image(self, rgb):
+        import mediapipe as mp
+
+        # mp.Image copies the pixels, so the caller may reuse its RGB buffer right away
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+
+    def infer(self, rgb, t, tag=None):
+        """
+        Queues the frame captured at `t` (seconds, monotonic) and returns the
+        newest finished (tag, result), or None if no new result arrived.
+        """
+        ts = max(int(t * 1000), self._last_ts + 1)  # LIVE_STREAM wants increasing ms
+        self._last_ts = ts
+        with self._lock:
+            self._pending[ts] = (tag, time.monotonic())
+        self.submitted += 1
+        self._task.detect_async(self._image(rgb), ts)
+        return self.poll()
+
+    def poll(self):
+        """The newest finished (tag, result) not returned yet, or None; queues nothing."""
+        with self._lock:
+            done, self._done = self._done, None
+        return done
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        now = time.monotonic()
+        with self._lock:
+            # anything queued before this frame that never came back was skipped
+            skipped = [ts for ts in self._pending if ts < timestamp_ms]
+            for ts in skipped:
+                del self._pending[ts]
+            tag, t_submit = self._pending.pop(timestamp_ms, (None, now))
+        self.dropped += len(skipped)
+        self.results += 1
+        self.latencies.append(now - t_submit)
+        done = (tag, self._convert(result, output_image))
+        with self._lock:
+            self._done = done
+
+    def close(self):
+        self._task.close()
+
+
+def _model_path(path):
+    if not os.path.exists(path):
+        url = MODEL_URLS.get(path, "the MediaPipe model page")
+        raise FileNotFoundError(f"{path} not found; download it from {url}")
+    return path
+
+
+class TasksHands(_LiveStream):
+    def __init__(self, model_path=HAND_MODEL, max_hands=2, min_detection=0.7, min_tracking=0.7):
+        super().__init__()
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        options = vision.HandLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=_model_path(model_path)),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=max_hands,
+            min_hand_detection_confidence=min_detection,
+            min_hand_presence_confidence=min_tracking,
+            min_tracking_confidence=min_tracking,
+            result_callback=self._on_result,
+        )
+        self._task = vision.HandLandmarker.create_from_options(options)
+
+    def _convert(self, result, output_image):
+        from landmark_recorder import ReplayResult
+
+        if not result.hand_landmarks:
+            return ReplayResult((), (), ())
+        pts = np.array([[(lm.x, lm.y, lm.z) for lm in hand] for hand in result.hand_landmarks])
+        labels = [h[0].category_name for h in result.handedness]
+        scores = [h[0].score for h in result.handedness]
+        return ReplayResult(pts, labels, scores)
+
+
+class TasksFaces(_LiveStream):
+    def __init__(self, model_path=FACE_MODEL, min_conf=0.5):
+        super().__init__()
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        options = vision.FaceDetectorOptions(
+            base_options=BaseOptions(model_asset_path=_model_path(model_path)),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            min_detection_confidence=min_conf,
+            result_callback=self._on_result,
+        )
+        self._task = vision.FaceDetector.create_from_options(options)
+
+    def _convert(self, result, output_image):
+        w, h = output_image.width, output_image.height
+        out = []
+        for d in result.detections or ():
+            b = d.bounding_box  # pixels
+            score = d.categories[0].score if d.categories else 0.0
+            out.append(FaceBox(score, b.origin_x / w, b.origin_y / h, b.width / w, b.height / h))
+        return out
+
+
+# ---------------- factories ----------------
+def make_hand_backend(name="legacy", max_hands=2, min_detection=0.7, min_tracking=0.7,
+                      model_path=HAND_MODEL, wrap=None, workers=1, model_complexity=1):
+    """
+    wrap:    legacy only, function(make_hands) -> detector, e.g. to put a
+             RoiHandTracker around the Hands instances
+    workers: process only, number of worker processes
+    model_complexity: legacy / process only, see legacy_hands
+    """
+    if name == "legacy":
+        def make():
+            return legacy_hands(max_hands, min_detection, min_tracking, model_complexity)
+
+        return SyncBackend(wrap(make) if wrap else make())
+    if name == "tasks":
+        return TasksHands(model_path, max_hands, min_detection, min_tracking)
+    if name == "process":
+        from inference_worker import ProcessHands
+
+        return ProcessHands(workers, max_hands=max_hands, min_detection=min_detection,
+                            min_tracking=min_tracking, model_complexity=model_complexity)
+    raise ValueError(f"unknown inference backend {name!r}, expected one of {HAND_BACKENDS}")
+
+
+def make_face_backend(name="legacy", min_conf=0.5, model_selection=0, model_path=FACE_MODEL):
+    if name == "legacy":
+        import mediapipe as mp
+
+        det = mp.solutions.face_detection.FaceDetection(model_selection, min_conf)
+        return SyncBackend(det, _legacy_faces_to_boxes)
+    if name == "tasks":
+        return TasksFaces(model_path, min_conf)
+    raise ValueError(f"unknown inference backend {name!r}, expected one of {BACKENDS}")
+
+
+def add_backend_args(ap, default="legacy", hands=True, faces=False):
+    """The --backend / --hand-model / --workers / --face-model options shared by the scripts."""
+    ap.add_argument("--backend", choices=HAND_BACKENDS if hands else BACKENDS, default=default,
+                    help="legacy: mp.solutions, blocking; tasks: MediaPipe Tasks LIVE_STREAM"
+                    + ("; process: mp.solutions in worker processes" if hands else ""))
+    if hands:
+        ap.add_argument("--hand-model", default=HAND_MODEL, help="HandLandmarker .task file (tasks only)")
+        ap.add_argument("--workers", type=int, default=1, help="inference processes (process only)")
+    if faces:
+        ap.add_argument("--face-model", default=FACE_MODEL, help="FaceDetector .tflite file (tasks only)")
+    return ap
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: both backends on the same video, fed at camera pace.
+#   loop blocked: how long infer() holds up the capture loop per frame
+#   latency:      frame submitted -> its result available
+#   result fps:   results per second of wall time; frames skipped by the model
+#   python inference_backend.py clip.mp4 [--fps 30] [--faces]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import cv2
+    from frame_buffers import to_rgb
+
+    ap = argparse.ArgumentParser("inference backend benchmark")
+    ap.add_argument("video", help="video file, or 'synthetic'")
+    ap.add_argument("--fps", type=float, default=None,
+                    help="feed rate; default: the video's fps, 0 = as fast as possible")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--faces", action="store_true", help="benchmark face detection instead of hands")
+    add_backend_args(ap, hands=True, faces=True)
+    args = ap.parse_args()
+
+    if args.video == "synthetic":
+        from frame_grabber import SyntheticSource
+
+        frames = [SyntheticSource().read()[1] for _ in range(60)]
+        fps = 30.0
+    else:
+        cap = cv2.VideoCapture(args.video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = []
+        while len(frames) < args.frames:
+            ok, img = cap.read()
+            if not ok:
+                break
+            frames.append(img)
+        cap.release()
+    if args.fps is not None:
+        fps = args.fps
+    n = args.frames  # the frames are cycled if the clip is shorter
+    print(f"{len(frames)} distinct frames {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{n} fed at {'max rate' if not fps else f'{fps:g} fps'}")
+
+    for name in BACKENDS:
+        try:
+            if args.faces:
+                backend = make_face_backend(name, model_path=args.face_model)
+            else:
+                backend = make_hand_backend(name, model_path=args.hand_model)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"{name:7} skipped: {e}")
+            continue
+        blocked = []
+        t_start = time.monotonic()
+        for i in range(n):
+            if fps:
+                wait = t_start + i / fps - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            t = time.monotonic()
+            backend.infer(to_rgb(frames[i % len(frames)]), t, i)
+            blocked.append(time.monotonic() - t)
+        elapsed = time.monotonic() - t_start
+        time.sleep(0.5 if backend.asynchronous else 0.0)  # let the last results land
+        backend.close()
+        s = backend.stats()
+        blocked = np.array(blocked) * 1000
+        print(
+            f"{name:7} loop blocked p50 {np.percentile(blocked, 50):6.1f} / p95 {np.percentile(blocked, 95):6.1f} ms | "
+            f"latency p50 {s['latency_p50_ms']:6.1f} / p95 {s['latency_p95_ms']:6.1f} ms | "
+            f"{s['results'] / elapsed:5.1f} results/s, {s['dropped']} of {s['submitted']} frames skipped"
+        )
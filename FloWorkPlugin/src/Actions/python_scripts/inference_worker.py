@@ -0,0 +1,352 @@
+# inference_worker.py — hand inference in worker processes, frames in shared memory
+#
+# MediaPipe, the HUD drawing and the gesture logic all share one interpreter and
+# its GIL, so the touchpad tops out at about one core. ProcessHands moves the
+# model into one or more worker processes. Frames go through a SharedFrameRing,
+# a multiprocessing.shared_memory block of preallocated slots that the parent
+# copies each RGB frame into (no pickled images). Only the slot number goes down
+# a pipe to the worker, and only the landmarks (a (n, 21, 3) float32 array plus
+# labels) come back.
+#
+# Each worker has one frame in flight. When every worker is busy the new frame
+# is skipped, like the Tasks LIVE_STREAM mode does, so results stay fresh. A
+# worker that dies is restarted on the same ring; close() stops them all and
+# frees the shared memory.
+#
+# Same infer(rgb, t, tag) / poll() contract as inference_backend: selected
+# with --backend process [--workers N]. A result is only read off the pipe by
+# infer() or poll(), so its latency includes the wait until the caller asks.
+#
+#   python inference_worker.py clip.mp4 [--max-workers 2] [--busy-ms 30]
+import sys
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+
+from inference_backend import _Stats, legacy_hands
+
+# held while __main__ is swapped for a worker start (see ProcessHands._start)
+_SPAWN_LOCK = threading.Lock()
+
+
+class SharedFrameRing:
+    """`slots` frames of up to `max_shape` uint8 each, in one shared memory block."""
+
+    def __init__(self, slots, max_shape=(1080, 1920, 3), name=None):
+        """name: attach to an existing ring (in a worker) instead of creating one"""
+        self.slots = slots
+        self.slot_bytes = int(np.prod(max_shape))
+        self.max_shape = tuple(max_shape)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+            self._owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.free = list(range(slots))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        """The slot's memory as a `shape` uint8 array (no copy)."""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def put(self, slot, image):
+        if image.nbytes > self.slot_bytes:
+            raise ValueError(f"frame {image.shape} does not fit a {self.max_shape} slot")
+        np.copyto(self.view(slot, image.shape), image)
+
+    def close(self):
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _worker_main(ring_name, slots, max_shape, conn, factory, kwargs):
+    """Worker process: frame slot in, landmarks out, until None or the parent is gone."""
+    from hand_features import landmarks_to_array
+
+    ring = SharedFrameRing(slots, max_shape, name=ring_name)
+    detector = factory(**kwargs)
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except (EOFError, OSError):
+                break  # parent went away
+            if msg is None:
+                break
+            slot, ts, shape = msg
+            rgb = ring.view(slot, shape)
+            result = detector.process(rgb)
+            del rgb  # no views into the shared block may outlive it
+            hands = result.multi_hand_landmarks if result is not None else None
+            if hands:
+                pts = np.stack([landmarks_to_array(h.landmark) for h in hands]).astype(np.float32)
+                labels = [hd.classification[0].label for hd in result.multi_handedness]
+                scores = [hd.classification[0].score for hd in result.multi_handedness]
+            else:
+                pts, labels, scores = np.zeros((0, 21, 3), np.float32), [], []
+            conn.send((slot, ts, pts, labels, scores))
+    finally:
+        detector.close()
+        ring.close()
+
+
+class ProcessHands(_Stats):
+    asynchronous = True
+
+    def __init__(self, workers=1, factory=legacy_hands, max_shape=(1080, 1920, 3), max_restarts=5, **kwargs):
+        """
+        workers:      worker processes, each with its own model instance
+        factory:      picklable callable(**kwargs) -> object with process(rgb) / close(),
+                      called inside the worker (default: mp.solutions Hands)
+        max_shape:    largest frame (h, w, 3) the ring slots can hold
+        max_restarts: give up (RuntimeError) after this many worker crashes
+        """
+        super().__init__()
+        self._ctx = mp.get_context("spawn")  # same on Windows and Linux, no forked threads
+        self.ring = SharedFrameRing(workers, max_shape)
+        self._factory = factory
+        self._kwargs = kwargs
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self.stale = 0  # results older than one already returned (workers finish out of order)
+        self.lost = 0  # frames in flight when their worker died
+        self._workers = [None] * workers  # (process, connection)
+        self._busy = [None] * workers  # per worker: (slot, ts, tag, submit time) or None
+        self._last_ts = -1
+        self._newest_ts = -1
+        self._done = None
+        for i in range(workers):
+            self._start(i)
+
+    def _start(self, i):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.ring.name, self.ring.slots, self.ring.max_shape, child, self._factory, self._kwargs),
+            name=f"hands-worker-{i}",
+            daemon=True,
+        )
+        # spawn re-runs the parent's __main__ in the child to unpickle the target.
+        # virtual_touchpad.py / boxing.py have no __main__ guard, so for the start
+        # this module stands in as __main__ (importing it has no side effects).
+        # Restarts happen on the inference thread while the others run: the swap
+        # is serialized and lasts only for proc.start(), and nothing else in the
+        # scripts looks __main__ up (only spawn's preparation data does).
+        with _SPAWN_LOCK:
+            main = sys.modules["__main__"]
+            sys.modules["__main__"] = sys.modules[__name__]
+            try:
+                proc.start()
+            finally:
+                sys.modules["__main__"] = main
+        child.close()
+        self._workers[i] = (proc, parent)
+
+    def _restart(self, i):
+        proc, conn = self._workers[i]
+        conn.close()
+        proc.join(timeout=0.1)
+        if proc.is_alive():  # pipe broke but the process hangs on
+            proc.terminate()
+        if self._busy[i] is not None:
+            self.ring.free.append(self._busy[i][0])
+            self._busy[i] = None
+            self.lost += 1
+        self.restarts += 1
+        print(f"[WORKER] {proc.name} exited (code {proc.exitcode}), restart {self.restarts}/{self.max_restarts}")
+        if self.restarts > self.max_restarts:
+            raise RuntimeError(f"inference worker keeps crashing (exit code {proc.exitcode})")
+        self._start(i)
+
+    def _collect(self):
+        for i, (proc, conn) in enumerate(self._workers):
+            try:
+                while conn.poll():
+                    slot, ts, pts, labels, scores = conn.recv()
+                    self._finish(i, slot, ts, pts, labels, scores)
+            except (EOFError, OSError):
+                self._restart(i)
+                continue
+            if not proc.is_alive():
+                self._restart(i)
+
+    def _finish(self, i, slot, ts, pts, labels, scores):
+        from landmark_recorder import ReplayResult
+
+        _, _, tag, t_submit = self._busy[i]
+        self._busy[i] = None
+        self.ring.free.append(slot)
+        self.results += 1
+        self.latencies.append(time.monotonic() - t_submit)
+        if ts < self._newest_ts:
+            self.stale += 1
+            return
+        self._newest_ts = ts
+        self._done = (tag, ReplayResult(pts, labels, scores))
+
+    def infer(self, rgb, t, tag=None):
+        """
+        Hands the frame captured at `t` to an idle worker (or skips it when all
+        are busy) and returns the newest finished (tag, result), or None.
+        """
+        self._collect()
+        idle = [i for i, busy in enumerate(self._busy) if busy is None]
+        self.submitted += 1
+        if idle and self.ring.free:
+            i = idle[0]
+            slot = self.ring.free.pop()
+            ts = max(int(t * 1000), self._last_ts + 1)
+            self._last_ts = ts
+            self.ring.put(slot, rgb)
+            self._busy[i] = (slot, ts, tag, time.monotonic())
+            try:
+                self._workers[i][1].send((slot, ts, rgb.shape))
+            except (BrokenPipeError, OSError):
+                # died since _collect(): the slot goes back to ring.free, the frame is lost
+                self._restart(i)
+        else:
+            self.dropped += 1
+        return self.poll()
+
+    def poll(self):
+        """Collects what the workers sent back; the newest finished (tag, result) not returned yet, or None."""
+        self._collect()
+        done, self._done = self._done, None
+        return done
+
+    def stats(self):
+        s = super().stats()
+        s.update(workers=len(self._workers), restarts=self.restarts, stale=self.stale, lost=self.lost)
+        return s
+
+    def close(self, timeout=2.0):
+        for proc, conn in self._workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for proc, conn in self._workers:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout)
+            conn.close()
+        self.ring.close()
+
+
+class BusyHands:
+    """
+    Stand-in model for machines without MediaPipe: holds the worker's GIL for
+    `ms` per frame, then reports no hands.
+    """
+
+    def __init__(self, ms=30.0):
+        self.ms = ms
+
+    def process(self, rgb):
+        from landmark_recorder import ReplayResult
+
+        end = time.perf_counter() + self.ms / 1000
+        while time.perf_counter() < end:
+            pass
+        return ReplayResult((), (), ())
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Scaling benchmark: in-process model vs. 1..N worker processes on the same
+# video, fed at camera pace. "parent cpu" is what the main process spends per
+# frame (the copy into shared memory and the result handling for the workers),
+# i.e. what is left over for drawing and the gesture logic. Between frames the
+# loop poll()s every --poll-ms like virtual_touchpad does; --poll-ms 0 only
+# collects on the next frame's infer().
+#   python inference_worker.py clip.mp4 [--fps 30] [--max-workers 2] [--busy-ms 30] [--poll-ms 5]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import cv2
+    from frame_buffers import to_rgb
+    from inference_backend import SyncBackend
+
+    ap = argparse.ArgumentParser("inference worker scaling benchmark")
+    ap.add_argument("video", help="video file, or 'synthetic'")
+    ap.add_argument("--fps", type=float, default=None, help="feed rate; default: the video's fps")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--max-workers", type=int, default=2)
+    ap.add_argument("--busy-ms", type=float, default=None,
+                    help="use a CPU-burning stand-in model of this cost instead of MediaPipe")
+    ap.add_argument("--poll-ms", type=float, default=5.0, help="poll() interval between frames, 0 = off")
+    args = ap.parse_args()
+
+    if args.video == "synthetic":
+        from frame_grabber import SyntheticSource
+
+        frames = [SyntheticSource().read()[1] for _ in range(60)]
+        fps = 30.0
+    else:
+        cap = cv2.VideoCapture(args.video)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        frames = []
+        while len(frames) < args.frames:
+            ok, img = cap.read()
+            if not ok:
+                break
+            frames.append(img)
+        cap.release()
+    fps = args.fps or fps
+    if args.busy_ms is not None:
+        factory, kwargs = BusyHands, {"ms": args.busy_ms}
+    else:
+        factory, kwargs = legacy_hands, {}
+    h, w = frames[0].shape[:2]
+    print(f"{w}x{h}, {args.frames} frames at {fps:g} fps, model: "
+          f"{'busy %g ms' % args.busy_ms if args.busy_ms is not None else 'mediapipe Hands'}, "
+          f"{'poll every %g ms' % args.poll_ms if args.poll_ms > 0 else 'no poll between frames'}")
+
+    def run(backend):
+        t_start = time.monotonic()
+        cpu0 = time.process_time()
+        for i in range(args.frames):
+            t_next = t_start + i / fps
+            while time.monotonic() < t_next:
+                if args.poll_ms > 0:
+                    backend.poll()
+                    time.sleep(min(args.poll_ms / 1000, max(0.0, t_next - time.monotonic())))
+                else:
+                    time.sleep(max(0.0, t_next - time.monotonic()))
+            backend.infer(to_rgb(frames[i % len(frames)]), time.monotonic(), i)
+        elapsed = time.monotonic() - t_start
+        cpu = time.process_time() - cpu0
+        time.sleep(0.3)
+        backend.poll()  # collect the stragglers
+        backend.close()
+        return elapsed, cpu
+
+    configs = [("in-process", lambda: SyncBackend(factory(**kwargs)))]
+    for n in range(1, args.max_workers + 1):
+        configs.append((f"{n} worker{'s' if n > 1 else ''}", lambda n=n: ProcessHands(n, factory, (h, w, 3), **kwargs)))
+    for name, make in configs:
+        backend = make()
+        if isinstance(backend, ProcessHands):
+            backend.infer(to_rgb(frames[0]), time.monotonic())  # warm-up: model load in the workers
+            while backend.results == 0:
+                backend.infer(to_rgb(frames[0]), time.monotonic())
+                time.sleep(0.05)
+            backend.submitted = backend.results = backend.dropped = 0
+            backend.latencies.clear()
+        elapsed, cpu = run(backend)
+        s = backend.stats()
+        print(
+            f"{name:11} {s['results'] / elapsed:6.1f} results/s ({s['dropped']} of {s['submitted']} frames skipped) | "
+            f"latency p50 {s['latency_p50_ms']:6.1f} / p95 {s['latency_p95_ms']:6.1f} ms | "
+            f"parent cpu {cpu / args.frames * 1000:5.2f} ms/frame"
+        )
@@ -0,0 +1,395 @@
+# input_injector.py — send key presses from a worker thread instead of the vision loop
+#
+# Every pyautogui call sleeps for pyautogui.PAUSE (0.1 s by default), so a
+# 4-step Alt-Tab move used to freeze tracking for ~0.4 s. The gesture loop now
+# only posts actions; the worker drains whatever has piled up, merges repeated
+# presses and opposite zoom steps, and emits the key events of the whole batch
+# in one backend call (a single SendInput on Windows).
+import threading
+import time
+import platform
+from collections import deque
+
+
+# ---------------- Backends ----------------
+class RecordingBackend:
+    """Fake backend: remembers every key event with its timestamp (for Linux / tests)."""
+
+    def __init__(self):
+        self.events = []  # (t, key, down)
+        self.calls = 0  # number of send() calls, i.e. OS calls a real backend would make
+
+    def send(self, events):
+        t = time.monotonic()
+        self.calls += 1
+        for key, down in events:
+            self.events.append((t, key, down))
+
+    def keys(self):
+        """Events as compact strings, e.g. ['+alt', '+tab', '-tab']."""
+        return [("+" if down else "-") + key for _, key, down in self.events]
+
+
+class PyAutoGuiBackend:
+    """Portable fallback; skips pyautogui's per-call PAUSE."""
+
+    def __init__(self):
+        import pyautogui
+
+        self._pg = pyautogui
+
+    def send(self, events):
+        for key, down in events:
+            if down:
+                self._pg.keyDown(key, _pause=False)
+            else:
+                self._pg.keyUp(key, _pause=False)
+
+
+class SendInputBackend:
+    """Windows: the whole event list goes out in one SendInput call."""
+
+    VK = {
+        "alt": 0x12,
+        "ctrl": 0x11,
+        "shift": 0x10,
+        "win": 0x5B,
+        "tab": 0x09,
+        "left": 0x25,
+        "up": 0x26,
+        "right": 0x27,
+        "down": 0x28,
+        "+": 0xBB,  # VK_OEM_PLUS
+        "-": 0xBD,  # VK_OEM_MINUS
+        "enter": 0x0D,
+        "esc": 0x1B,
+    }
+    EXTENDED = {"win", "left", "up", "right", "down"}
+    KEYEVENTF_EXTENDEDKEY = 0x0001
+    KEYEVENTF_KEYUP = 0x0002
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong)),
+            ]
+
+        class MOUSEINPUT(ctypes.Structure):  # only here so INPUT has the right size
+            _fields_ = [
+                ("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong)),
+            ]
+
+        class INPUTUNION(ctypes.Union):
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("U", INPUTUNION)]
+
+        self._ctypes = ctypes
+        self._KEYBDINPUT = KEYBDINPUT
+        self._INPUT = INPUT
+        self._send_input = ctypes.windll.user32.SendInput
+
+    def send(self, events):
+        if not events:
+            return
+        arr = (self._INPUT * len(events))()
+        for i, (key, down) in enumerate(events):
+            flags = 0 if down else self.KEYEVENTF_KEYUP
+            if key in self.EXTENDED:
+                flags |= self.KEYEVENTF_EXTENDEDKEY
+            arr[i].type = 1  # INPUT_KEYBOARD
+            arr[i].U.ki = self._KEYBDINPUT(self.VK[key], 0, flags, 0, None)
+        self._send_input(len(events), arr, self._ctypes.sizeof(self._INPUT))
+
+
+def default_backend():
+    if platform.system() == "Windows":
+        return SendInputBackend()
+    return PyAutoGuiBackend()
+
+
+# ---------------- Actions ----------------
+class Action:
+    __slots__ = ("kind", "args", "t_posted", "t_sent", "tag")
+
+    def __init__(self, kind, args, tag=None):
+        self.kind = kind  # "hotkey" | "press" | "down" | "up" | "zoom" | "call"
+        self.args = args
+        self.t_posted = time.monotonic()
+        self.t_sent = None
+        self.tag = tag  # whatever the poster set in injector.tag (e.g. the frame seq)
+
+    def __repr__(self):
+        return f"Action({self.kind}, {self.args})"
+
+
+def merge_actions(actions):
+    """
+    Collapse neighbouring actions that can be sent as one:
+      press(k, a) + press(k, b) -> press(k, a + b)
+      zoom(a) + zoom(b)         -> zoom(a + b), dropped when it nets to 0
+    Returns (merged list, number of actions folded away).
+    """
+    out = []
+    for act in actions:
+        prev = out[-1] if out else None
+        if prev is not None and prev.kind == act.kind == "press" and prev.args[0] == act.args[0]:
+            prev.args = (prev.args[0], prev.args[1] + act.args[1])
+        elif prev is not None and prev.kind == act.kind == "zoom":
+            prev.args = (prev.args[0] + act.args[0],)
+            if prev.args[0] == 0:
+                out.pop()
+        else:
+            out.append(act)
+    return out, len(actions) - len(out)
+
+
+def action_events(act):
+    """Action -> list of (key, down) events."""
+    if act.kind == "down":
+        return [(act.args[0], True)]
+    if act.kind == "up":
+        return [(act.args[0], False)]
+    if act.kind == "press":
+        key, times = act.args
+        return [(key, True), (key, False)] * times
+    if act.kind == "hotkey":
+        keys = act.args
+        return [(k, True) for k in keys] + [(k, False) for k in reversed(keys)]
+    if act.kind == "zoom":
+        steps = act.args[0]
+        key = "+" if steps > 0 else "-"
+        return [("ctrl", True)] + [(key, True), (key, False)] * abs(steps) + [("ctrl", False)]
+    return []
+
+
+# ---------------- Worker ----------------
+class InputInjector:
+    def __init__(self, backend=None, history=256):
+        self.backend = backend if backend is not None else default_backend()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._busy = False
+        self.history = deque(maxlen=history)  # sent Actions with timestamps
+        self.tag = None  # copied into every Action posted while it is set
+        self.on_sent = None  # callable(Action), called on the worker after sending
+
+        # counters
+        self.posted = 0
+        self.merged = 0
+        self.batches = 0
+        self.failed = 0  # actions whose send or call raised (logged, then dropped)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="input-injector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, flush=True):
+        if flush:
+            self.flush()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    # ---- posting (never blocks) ----
+    def _post(self, kind, *args):
+        act = Action(kind, args, self.tag)
+        with self._cond:
+            self._queue.append(act)
+            self.posted += 1
+            self._cond.notify()
+        return act
+
+    def hotkey(self, *keys):
+        return self._post("hotkey", *keys)
+
+    def press(self, key, times=1):
+        if times > 0:
+            return self._post("press", key, times)
+
+    def key_down(self, key):
+        return self._post("down", key)
+
+    def key_up(self, key):
+        return self._post("up", key)
+
+    def zoom(self, steps):
+        """steps > 0 zooms in (Ctrl +), < 0 zooms out (Ctrl -)."""
+        if steps:
+            return self._post("zoom", steps)
+
+    def call(self, fn):
+        """Run fn on the worker once everything posted before it has been sent."""
+        return self._post("call", fn)
+
+    def flush(self, timeout=2.0):
+        """Wait until the queue is empty and the worker is idle."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._busy) and time.monotonic() < deadline:
+                self._cond.wait(0.01)
+
+    # ---- worker ----
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    return  # stopped and drained
+                batch = list(self._queue)
+                self._queue.clear()
+                self._busy = True
+            try:
+                self._emit(batch)
+            except Exception as e:  # e.g. on_sent raised; the worker has to outlive it
+                print(f"[INPUT] batch of {len(batch)} failed: {e!r}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _emit(self, batch):
+        batch, folded = merge_actions(batch)
+        self.merged += folded
+        events, pending = [], []
+        for act in batch:
+            if act.kind == "call":
+                self._send(events, pending)
+                events, pending = [], []
+                self._call(act)
+            else:
+                events.extend(action_events(act))
+                pending.append(act)
+        self._send(events, pending)
+
+    def _call(self, act):
+        fn = act.args[0]
+        try:
+            fn()
+        except Exception as e:
+            self.failed += 1
+            print(f"[INPUT] call {getattr(fn, '__name__', fn)} failed: {e!r}")
+            return
+        self._sent([act], time.monotonic())
+
+    def _send(self, events, pending):
+        if not pending:
+            return
+        try:
+            self.backend.send(events)
+        except Exception as e:  # e.g. KeyError for a key the backend has no code for
+            self.failed += len(pending)
+            print(f"[INPUT] sending {pending} failed: {e!r}")
+            return
+        self.batches += 1
+        self._sent(pending, time.monotonic())
+
+    def _sent(self, acts, t):
+        for act in acts:
+            act.t_sent = t
+            self.history.append(act)
+            if self.on_sent is not None:
+                self.on_sent(act)
+
+    def stats(self):
+        delays = [a.t_sent - a.t_posted for a in self.history if a.t_sent is not None]
+        return {
+            "posted": self.posted,
+            "merged": self.merged,
+            "batches": self.batches,
+            "failed": self.failed,
+            "max_delay_ms": max(delays) * 1000 if delays else 0.0,
+        }
+
+
+class ImmediateInjector:
+    """
+    Same interface as InputInjector without the worker: every action is sent
+    (and every call() run) inline, stamped with `clock()`. Used for replays,
+    where a simulated clock has to stay deterministic.
+    """
+
+    def __init__(self, backend=None, clock=time.monotonic):
+        self.backend = backend if backend is not None else RecordingBackend()
+        self.clock = clock
+        self.history = []  # every Action, t_posted == t_sent == clock()
+        self.posted = 0
+        self.tag = None
+        self.on_sent = None
+
+    def start(self):
+        return self
+
+    def stop(self, flush=True):
+        pass
+
+    def flush(self, timeout=None):
+        pass
+
+    def _post(self, kind, *args):
+        act = Action(kind, args, self.tag)
+        act.t_posted = act.t_sent = self.clock()
+        self.posted += 1
+        self.history.append(act)
+        if kind == "call":
+            args[0]()
+        else:
+            self.backend.send(action_events(act))
+        if self.on_sent is not None:
+            self.on_sent(act)
+        return act
+
+    hotkey = InputInjector.hotkey
+    press = InputInjector.press
+    key_down = InputInjector.key_down
+    key_up = InputInjector.key_up
+    zoom = InputInjector.zoom
+    call = InputInjector.call
+
+    def stats(self):
+        return {"posted": self.posted}
+
+
+# ---------------------------------------------------------------------------
+# Demo on the recording backend: an Alt-Tab walk and a zoom wobble.
+#   python input_injector.py
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    rec = RecordingBackend()
+    inj = InputInjector(rec).start()
+
+    t0 = time.perf_counter()
+    inj.key_down("alt")
+    inj.press("tab")
+    for _ in range(4):
+        inj.press("right")
+    inj.key_up("alt")
+    for step in (1, 1, -1, 1, -1, -1, -1):
+        inj.zoom(step)
+    post_ms = (time.perf_counter() - t0) * 1000
+    inj.stop()
+
+    print(f"posting 14 actions took {post_ms:.3f} ms on the caller thread")
+    print(f"(inline pyautogui with PAUSE=0.1 would have blocked ~{14 * 100} ms)")
+    print("events:", " ".join(rec.keys()))
+    print("stats:", inj.stats(), "backend calls:", rec.calls)
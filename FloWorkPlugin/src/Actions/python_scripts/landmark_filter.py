@@ -0,0 +1,156 @@
+# landmark_filter.py — One-Euro smoothing for all 21 hand landmarks at once
+#
+# Raw MediaPipe landmarks shake by a few pixels even on a still hand, which made
+# the Alt-Tab selection flicker between neighbours. The One-Euro filter is a
+# low-pass whose cutoff rises with speed: heavy smoothing while the hand holds
+# still, almost none during a fast move, so swipes don't lag. The filter state
+# for every landmark lives in (21, 3) arrays, one update is a handful of vector ops.
+import math
+import numpy as np
+
+
+def _alpha(cutoff, dt):
+    """Smoothing factor of an exponential low-pass with this cutoff (Hz); cutoff may be an array."""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroLandmarkFilter:
+    def __init__(self, min_cutoff=0.5, beta=20.0, d_cutoff=1.0, max_jump=0.25):
+        """
+        min_cutoff: cutoff (Hz) while the landmark is still; lower = smoother, more lag
+        beta:       how fast the cutoff grows with speed (per normalized unit / s)
+        d_cutoff:   cutoff (Hz) of the speed estimate itself
+        max_jump:   wrist move (normalized coords) in one frame that counts as a
+                    different hand -> reset instead of smoothing across it
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.max_jump = max_jump
+        self._x = None  # (21, 3) filtered landmarks
+        self._dx = None  # (21, 3) filtered speed
+        self._t = None
+        self.hand_id = None
+        self.resets = 0
+
+    def reset(self):
+        self._x = self._dx = self._t = None
+        self.hand_id = None
+
+    def __call__(self, pts, t, hand_id=None):
+        """
+        pts:     (21, 3) landmarks of the tracked hand (normalized coords)
+        t:       timestamp in seconds
+        hand_id: anything identifying the hand (e.g. the handedness label);
+                 a change resets the filter
+        Returns the filtered (21, 3) array (a new array; `pts` is not modified).
+        """
+        pts = np.asarray(pts, dtype=np.float64)
+        if self._x is not None and (
+            hand_id != self.hand_id
+            or t <= self._t
+            or np.hypot(*(pts[0, :2] - self._x[0, :2])) > self.max_jump
+        ):
+            self.resets += 1
+            self.reset()
+        if self._x is None:
+            self._x = pts.copy()
+            self._dx = np.zeros_like(pts)
+            self._t = t
+            self.hand_id = hand_id
+            return self._x.copy()
+
+        dt = t - self._t
+        self._t = t
+        # speed, itself low-passed
+        dx = (pts - self._x) / dt
+        self._dx += _alpha(self.d_cutoff, dt) * (dx - self._dx)
+        # one cutoff per landmark from its (x, y) speed, shared by x, y and z
+        speed = np.hypot(self._dx[:, 0], self._dx[:, 1])
+        a = _alpha(self.min_cutoff + self.beta * speed, dt)[:, None]
+        self._x += a * (pts - self._x)
+        return self._x.copy()
+
+
+# ---------------------------------------------------------------------------
+# Jitter / lag report.
+#   python landmark_filter.py [recording] [--fps 30]
+# A recording is a landmark_recorder .lmrec file (biggest hand per frame is
+# used) or an .npz with "t" (T,) and "landmarks" (T, 21, 3) of one hand.
+# Without one, a synthetic hand (hold, swipe, hold) with camera-like noise is
+# used, where the error against the clean path can be reported too.
+#   jitter: RMS of the part a 5-frame centered average removes, in screen px
+#   lag:    shift (ms) that best lines the output up with the raw signal
+# ---------------------------------------------------------------------------
+def _jitter_px(seq, scale):
+    k = 5
+    kernel = np.ones(k) / k
+    xy = seq[:, 12, :2] * scale
+    smooth = np.stack([np.convolve(xy[:, i], kernel, mode="valid") for i in range(2)], axis=1)
+    return float(np.sqrt(((xy[k // 2 : -(k // 2)] - smooth) ** 2).sum(axis=1).mean()))
+
+
+def _lag_ms(raw, out, dt, max_shift=10):
+    a, b = raw[:, 12, 0], out[:, 12, 0]
+    best, best_err = 0, np.inf
+    for s in range(max_shift + 1):
+        err = np.abs(b[s:] - a[: len(a) - s]).mean()
+        if err < best_err:
+            best, best_err = s, err
+    return best * dt * 1000
+
+
+def _synthetic(fps, rng, seconds=6.0, noise=0.004):
+    t = np.arange(int(fps * seconds)) / fps
+    base = rng.uniform(0.3, 0.7, size=(21, 2))
+    # hold 2 s, swipe across 40% of the frame in 0.4 s, hold, slow drift back
+    path = np.interp(t, [0, 2, 2.4, 4, 6], [0, 0, 0.4, 0.4, 0.25])
+    clean = np.zeros((len(t), 21, 3))
+    clean[:, :, :2] = base
+    clean[:, :, 0] += path[:, None]
+    noisy = clean + rng.normal(0, noise, clean.shape)
+    return t, noisy, clean
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser("One-Euro landmark filter report")
+    ap.add_argument("recording", nargs="?")
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--screen-width", type=int, default=1920)
+    args = ap.parse_args()
+
+    clean = None
+    if args.recording:
+        if args.recording.endswith(".npz"):
+            data = np.load(args.recording)
+            t, raw = data["t"], data["landmarks"]
+        else:
+            from landmark_recorder import LandmarkRecording
+
+            t, raw = LandmarkRecording(args.recording).biggest_hand()
+            keep = ~np.isnan(raw[:, 0, 0])  # frames without a hand
+            t, raw = t[keep], raw[keep].astype(np.float64)
+    else:
+        t, raw, clean = _synthetic(args.fps, np.random.default_rng(0))
+    dt = float(np.median(np.diff(t)))
+    scale = args.screen_width
+
+    settings = [("raw", None)] + [
+        (f"min_cutoff={mc:<4} beta={b:<4}", (mc, b))
+        for mc, b in ((2.0, 1.0), (1.0, 10.0), (0.5, 10.0), (0.5, 20.0), (0.3, 20.0))
+    ]
+    print(f"{len(t)} frames, dt {dt * 1000:.1f} ms, px relative to a {scale}px wide screen")
+    for name, cfg in settings:
+        if cfg is None:
+            out = raw
+        else:
+            f = OneEuroLandmarkFilter(min_cutoff=cfg[0], beta=cfg[1])
+            out = np.stack([f(p, ti) for p, ti in zip(raw, t)])
+        line = f"{name:<26}: jitter {_jitter_px(out, scale):5.2f} px, lag {_lag_ms(raw, out, dt):5.1f} ms"
+        if clean is not None:
+            err = np.hypot(*((out[:, 12, :2] - clean[:, 12, :2]) * scale).T)
+            line += f", error vs clean path mean {err.mean():5.2f} px / max {err.max():6.2f} px"
+        print(line)
@@ -0,0 +1,284 @@
+# landmark_recorder.py — record hand landmarks to disk and replay them
+#
+# File layout: a 64-byte header followed by fixed-size frame records, so a file
+# can be appended to while recording and opened as one numpy.memmap for replay
+# (nothing is parsed up front, an hour-long session opens instantly).
+#
+#   header : magic "LMRK", version u16, landmark dtype ('e' float16 | 'f' float32),
+#            max_hands u8, zero padding
+#   record : t f8 | n_hands u1 | handedness u1[H] (0 left, 1 right, 255 none)
+#            | score f2[H] | landmarks dtype[H, 21, 3]
+#
+# With float16 and 2 hands a record is 267 bytes: ~29 MB per hour at 30 fps.
+import os
+import struct
+import numpy as np
+
+from hand_features import landmarks_to_array
+
+MAGIC = b"LMRK"
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<4sHcB")
+HANDEDNESS = {"Left": 0, "Right": 1}
+HANDEDNESS_NAMES = {v: k for k, v in HANDEDNESS.items()}
+NO_HAND = 255
+
+
+def record_dtype(max_hands, lm_dtype):
+    return np.dtype(
+        [
+            ("t", "<f8"),
+            ("n_hands", "u1"),
+            ("handedness", "u1", (max_hands,)),
+            ("score", "<f2", (max_hands,)),
+            ("landmarks", lm_dtype, (max_hands, 21, 3)),
+        ]
+    )
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path}: not a landmark recording (short header)")
+    magic, version, code, max_hands = _HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a landmark recording (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported recording version {version}")
+    return np.dtype("<" + code.decode()), max_hands
+
+
+# ---------------- Writing ----------------
+class LandmarkRecorder:
+    def __init__(self, path, max_hands=2, precision="float16", flush_every=30):
+        """
+        path:        output file; an existing recording with the same layout is appended to
+        precision:   "float16" (compact, ~1 px at 1080p) or "float32"
+        flush_every: frames buffered before they are written out
+        """
+        lm_dtype = np.dtype(precision).newbyteorder("<")
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            file_dtype, file_hands = _read_header(path)
+            if file_dtype != lm_dtype or file_hands != max_hands:
+                raise ValueError(f"{path}: recorded as {file_dtype}/{file_hands} hands, not {lm_dtype}/{max_hands}")
+            self._file = open(path, "r+b")
+            # drop a half-written record left by a crash
+            size = os.path.getsize(path)
+            itemsize = record_dtype(max_hands, lm_dtype).itemsize
+            self._file.truncate(HEADER_SIZE + (size - HEADER_SIZE) // itemsize * itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self._file = open(path, "wb")
+            header = _HEADER.pack(MAGIC, VERSION, lm_dtype.char.encode(), max_hands)
+            self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+        self.path = path
+        self.max_hands = max_hands
+        self.dtype = record_dtype(max_hands, lm_dtype)
+        self.flush_every = flush_every
+        self._buf = np.zeros(flush_every, dtype=self.dtype)
+        self._pending = 0
+        self.frames = 0
+
+    def write(self, t, result):
+        """Record one MediaPipe Hands result (or None / no hands) taken at time t."""
+        hands = result.multi_hand_landmarks if result is not None else None
+        if not hands:
+            self.write_arrays(t, None)
+            return
+        pts = np.stack([landmarks_to_array(hl.landmark) for hl in hands])
+        labels = [hd.classification[0].label for hd in result.multi_handedness]
+        scores = [hd.classification[0].score for hd in result.multi_handedness]
+        self.write_arrays(t, pts, labels, scores)
+
+    def write_arrays(self, t, landmarks, labels=(), scores=()):
+        """landmarks: (N, 21, 3) or None; labels: "Left"/"Right" per hand."""
+        rec = self._buf[self._pending]
+        rec["t"] = t
+        n = 0 if landmarks is None else min(len(landmarks), self.max_hands)
+        rec["n_hands"] = n
+        rec["handedness"] = NO_HAND
+        rec["score"] = 0
+        rec["landmarks"] = 0
+        if n:
+            rec["landmarks"][:n] = landmarks[:n]
+            rec["handedness"][:n] = [HANDEDNESS.get(label, NO_HAND) for label in labels[:n]]
+            rec["score"][:n] = scores[:n]
+        self._pending += 1
+        self.frames += 1
+        if self._pending == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._buf[: self._pending].tobytes())
+            self._pending = 0
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- Reading ----------------
+class _Landmark:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+
+class _HandLandmarks:
+    __slots__ = ("landmark",)
+
+    def __init__(self, pts):
+        self.landmark = [_Landmark(float(x), float(y), float(z)) for x, y, z in pts]
+
+
+class _Category:
+    __slots__ = ("label", "score")
+
+    def __init__(self, label, score):
+        self.label, self.score = label, score
+
+
+class _Handedness:
+    __slots__ = ("classification",)
+
+    def __init__(self, label, score):
+        self.classification = [_Category(label, score)]
+
+
+class ReplayResult:
+    """Quacks like a MediaPipe Hands result, so recorded frames go through the same code."""
+
+    __slots__ = ("multi_hand_landmarks", "multi_handedness")
+
+    def __init__(self, landmarks, labels, scores):
+        if len(landmarks):
+            self.multi_hand_landmarks = [_HandLandmarks(p) for p in landmarks]
+            self.multi_handedness = [_Handedness(lb, float(s)) for lb, s in zip(labels, scores)]
+        else:  # MediaPipe uses None, not an empty list
+            self.multi_hand_landmarks = None
+            self.multi_handedness = None
+
+
+class LandmarkRecording:
+    def __init__(self, path):
+        lm_dtype, max_hands = _read_header(path)
+        self.path = path
+        self.max_hands = max_hands
+        self.dtype = record_dtype(max_hands, lm_dtype)
+        count = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:  # memmap refuses empty files
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def t(self):
+        return self.records["t"]
+
+    @property
+    def duration(self):
+        return float(self.t[-1] - self.t[0]) if len(self) else 0.0
+
+    def frame(self, i):
+        """(t, landmarks (n, 21, 3) float32, labels, scores) of frame i."""
+        rec = self.records[i]
+        n = int(rec["n_hands"])
+        pts = rec["landmarks"][:n].astype(np.float32)
+        labels = [HANDEDNESS_NAMES.get(int(c), "") for c in rec["handedness"][:n]]
+        return float(rec["t"]), pts, labels, rec["score"][:n].astype(np.float32)
+
+    def frames(self):
+        for i in range(len(self)):
+            yield self.frame(i)
+
+    def results(self):
+        """(t, ReplayResult) per frame, for code written against MediaPipe results."""
+        for t, pts, labels, scores in self.frames():
+            yield t, ReplayResult(pts, labels, scores)
+
+    def biggest_hand(self, handedness=False):
+        """
+        The times and (T, 21, 3) float32 of the largest hand per frame (NaN when
+        none); with handedness=True also its (T,) "Left" / "Right" / "" labels.
+        """
+        lm = self.records["landmarks"].astype(np.float32)
+        n = self.records["n_hands"]
+        span = lm[..., :2].max(axis=2) - lm[..., :2].min(axis=2)
+        area = span[..., 0] * span[..., 1]
+        area[np.arange(self.max_hands)[None, :] >= n[:, None]] = -1
+        pick = area.argmax(axis=1)
+        out = lm[np.arange(len(lm)), pick]
+        out[n == 0] = np.nan
+        t = np.asarray(self.t, dtype=np.float64)
+        if not handedness:
+            return t, out
+        codes = self.records["handedness"][np.arange(len(lm)), pick]
+        names = np.full(256, "", dtype=object)
+        for code, name in HANDEDNESS_NAMES.items():
+            names[code] = name
+        return t, out, names[codes]
+
+
+# ---------------------------------------------------------------------------
+# Size / load / replay check on a synthetic session.
+#   python landmark_recorder.py [existing.lmrec] [--minutes 60]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import time
+    from hand_features import compute_features, classify
+
+    ap = argparse.ArgumentParser("landmark recorder check")
+    ap.add_argument("recording", nargs="?")
+    ap.add_argument("--minutes", type=float, default=60.0)
+    ap.add_argument("--precision", default="float16")
+    args = ap.parse_args()
+
+    path = args.recording
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), "landmark_recorder_check.lmrec")
+        if os.path.exists(path):
+            os.remove(path)
+        rng = np.random.default_rng(0)
+        frames = int(args.minutes * 60 * 30)
+        base = rng.uniform(0.3, 0.7, size=(2, 21, 3)).astype(np.float32)
+        t0 = time.perf_counter()
+        with LandmarkRecorder(path, precision=args.precision, flush_every=300) as rec:
+            for i in range(frames):
+                n = i % 3  # 0, 1 or 2 hands
+                pts = base[:n] + rng.normal(0, 0.01, (n, 21, 3)).astype(np.float32) if n else None
+                rec.write_arrays(i / 30.0, pts, ["Right", "Left"][:n], [0.9, 0.8][:n])
+        print(f"wrote {frames} frames ({args.minutes:g} min @30 fps) in {time.perf_counter() - t0:.2f} s")
+
+    t0 = time.perf_counter()
+    recording = LandmarkRecording(path)
+    print(f"opened {path}: {len(recording)} frames in {(time.perf_counter() - t0) * 1000:.2f} ms, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+    # replay through the gesture classifier, as fast as it goes
+    t0 = time.perf_counter()
+    counts = {}
+    for t, pts, labels, scores in recording.frames():
+        if len(pts):
+            for name in classify(compute_features(pts)):
+                counts[name] = counts.get(name, 0) + 1
+    elapsed = time.perf_counter() - t0
+    print(f"replayed {len(recording)} frames in {elapsed:.2f} s "
+          f"({recording.duration / max(elapsed, 1e-9):.0f}x real time), gestures {counts}")
@@ -0,0 +1,165 @@
+# latency_probe.py — per-frame stage timestamps, from camera capture to key emission
+#
+# Every frame gets a row in a preallocated ring buffer (one float64 per stage),
+# keyed by the frame's sequence number. Stages stamp their row as the frame
+# passes; marking is one array store, cheap enough to leave on all the time.
+# Rows are only read when a summary is asked for (on exit, or twice a second
+# for the HUD readout).
+import threading
+import time
+from collections import deque
+import numpy as np
+
+STAGES = ("capture", "convert", "inference", "classify", "enqueue", "emit", "present")
+# what each stage's "step" time is measured from
+PREVIOUS = {
+    "convert": "capture",
+    "inference": "convert",
+    "classify": "inference",
+    "enqueue": "inference",  # actions are posted while classify runs
+    "emit": "enqueue",
+    "present": "classify",
+}
+
+
+class LatencyProbe:
+    def __init__(self, capacity=4096, stages=STAGES):
+        self.stages = tuple(stages)
+        self._index = {name: i for i, name in enumerate(self.stages)}
+        self.capacity = capacity
+        self._t = np.full((capacity, len(self.stages)), np.nan)
+        self._seq = np.full(capacity, -1, dtype=np.int64)
+        self.counts = {}  # event name -> count (dropped frames, skips, ...)
+        self._lock = threading.Lock()
+        self._hud_text = ""
+        self._hud_stamp = 0.0
+
+    # ---- recording ----
+    def begin(self, seq, t_capture):
+        """Start the row for frame `seq`, overwriting the oldest one."""
+        i = seq % self.capacity
+        self._t[i] = np.nan
+        self._t[i, 0] = t_capture
+        self._seq[i] = seq
+
+    def mark(self, seq, stage, t=None):
+        """Stamp `stage` for frame `seq`; the first stamp wins, stale rows are ignored."""
+        i = seq % self.capacity
+        if self._seq[i] != seq:
+            return
+        j = self._index[stage]
+        if self._t[i, j] != self._t[i, j]:  # NaN: not stamped yet
+            self._t[i, j] = time.monotonic() if t is None else t
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def on_action_sent(self, action):
+        """InputInjector.on_sent hook: actions tagged with a frame seq stamp enqueue / emit."""
+        if action.tag is not None:
+            self.mark(action.tag, "enqueue", action.t_posted)
+            self.mark(action.tag, "emit", action.t_sent)
+
+    # ---- reading ----
+    def summary(self):
+        """
+        stage -> dict(n, step_p50/p95/p99, total_p50/p95/p99) in ms
+        step: since the previous stage, total: since capture
+        """
+        rows = self._t[self._seq >= 0]
+        out = {}
+        for name in self.stages[1:]:
+            j = self._index[name]
+            total = (rows[:, j] - rows[:, 0]) * 1000
+            total = total[~np.isnan(total)]
+            if total.size == 0:
+                continue
+            s = {"n": int(total.size)}
+            s["total_p50"], s["total_p95"], s["total_p99"] = np.percentile(total, (50, 95, 99))
+            prev = PREVIOUS.get(name)
+            if prev in self._index:
+                step = (rows[:, j] - rows[:, self._index[prev]]) * 1000
+                step = step[~np.isnan(step)]
+                if step.size:
+                    s["step_p50"], s["step_p95"], s["step_p99"] = np.percentile(step, (50, 95, 99))
+            out[name] = s
+        return out
+
+    def report(self, title="latency"):
+        lines = [f"[{title}] ms, step = since previous stage, total = since capture"]
+        for name, s in self.summary().items():
+            step = (
+                f"step p50 {s['step_p50']:6.1f} p95 {s['step_p95']:6.1f} p99 {s['step_p99']:6.1f}"
+                if "step_p50" in s
+                else " " * 41
+            )
+            lines.append(
+                f"  {name:<10} n={s['n']:<6d} {step} | "
+                f"total p50 {s['total_p50']:6.1f} p95 {s['total_p95']:6.1f} p99 {s['total_p99']:6.1f}"
+            )
+        if self.counts:
+            lines.append(f"  counts: {dict(self.counts)}")
+        return "\n".join(lines)
+
+    def hud_text(self, every=0.5):
+        """One-line readout for the HUD, recomputed at most every `every` seconds."""
+        now = time.monotonic()
+        if now - self._hud_stamp >= every:
+            self._hud_stamp = now
+            s = self.summary()
+            parts = []
+            for name in ("inference", "present", "emit"):
+                if name in s:
+                    parts.append(f"{name} p50 {s[name]['total_p50']:.0f} / p95 {s[name]['total_p95']:.0f} ms")
+            self._hud_text = "  ".join(parts)
+        return self._hud_text
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds (render fps, inference fps, ...)."""
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self._times = deque()
+        self.total = 0
+
+    def tick(self, t=None):
+        t = time.monotonic() if t is None else t
+        self._times.append(t)
+        self.total += 1
+        while self._times and t - self._times[0] > self.window:
+            self._times.popleft()
+
+    def rate(self):
+        times = self._times
+        if len(times) < 2:
+            return 0.0
+        span = times[-1] - times[0]
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Overhead check: cost of begin + marks per frame, and a sample report.
+#   python latency_probe.py
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    probe = LatencyProbe()
+    rng = np.random.default_rng(0)
+    frames = 20000
+    t0 = time.perf_counter()
+    for seq in range(frames):
+        t = seq / 30.0
+        probe.begin(seq, t)
+        probe.mark(seq, "convert", t + 0.002)
+        probe.mark(seq, "inference", t + 0.002 + rng.gamma(4, 0.004))
+        probe.mark(seq, "classify", t + 0.030)
+        probe.mark(seq, "present", t + 0.034)
+        if seq % 50 == 0:
+            probe.mark(seq, "enqueue", t + 0.029)
+            probe.mark(seq, "emit", t + 0.029 + rng.exponential(0.001))
+    us = (time.perf_counter() - t0) / frames * 1e6
+    t0 = time.perf_counter()
+    print(probe.report("latency (synthetic)"))
+    print(f"begin + 4-6 marks: {us:.2f} us/frame, report over {probe.capacity} rows: "
+          f"{(time.perf_counter() - t0) * 1000:.1f} ms")
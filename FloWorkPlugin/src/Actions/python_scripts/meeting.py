@@ -1,7 +1,10 @@
-import argparse, time, logging, base64, sys
+import argparse, time, logging, sys
 from dataclasses import dataclass
-from typing import List, Optional
-import cv2, numpy as np, mediapipe as mp
+from typing import List
+import cv2
+from inference_backend import make_face_backend, add_backend_args
+from frame_buffers import to_rgb
+from meeting_sources import add_source_args, make_frame_source
 
 # OBS v5 client
 from obsws_python import ReqClient
@@ -43,20 +46,20 @@ class Face:
     area: float
 
 class FaceDet:
-    def __init__(self, model_sel=0, min_conf=0.5):
-        mpfd=mp.solutions.face_detection
-        self.det=mpfd.FaceDetection(model_sel, min_conf)
-    
+    def __init__(self, model_sel=0, min_conf=0.5, backend="legacy", model_path=None):
+        opts={"model_path": model_path} if model_path else {}
+        self.det=make_face_backend(backend, min_conf, model_sel, **opts)
+        self.last: List[Face]=[]
+
     def detect(self, bgr) -> List[Face]:
-        rgb=cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
-        res=self.det.process(rgb)
-        out=[]
-        if res and res.detections:
-            for d in res.detections:
-                s=float(d.score[0]) if d.score else 0.0
-                rb=d.location_data.relative_bounding_box
-                out.append(Face(s, max(rb.width,0)*max(rb.height,0)))
-        return out
+        # tasks 後端為非同步：回傳最新完成的結果，尚未完成時沿用上一次的結果
+        done=self.det.infer(to_rgb(bgr), time.monotonic())
+        if done is not None:
+            self.last=[Face(b.score, b.w*b.h) for b in done[1]]
+        return self.last
+
+    def close(self):
+        self.det.close()
 
 # ------- 兼容的 OBS 資料存取函數 -------
 def safe_get_scenes(client):
@@ -121,38 +124,6 @@ def safe_get_inputs(client):
         logging.error(f"取得輸入來源列表失敗: {e}")
         return []
 
-def obs_get_source_frame(client: ReqClient, source_name: str, w: int, h: int) -> Optional[np.ndarray]:
-    """安全地取得來源截圖 - 使用原始 API 調用"""
-    try:
-        # 使用原始 API 調用避免 obsws-python 的方法問題
-        response = client.send("GetSourceScreenshot", {
-            "sourceName": source_name,
-            "imageFormat": "png",
-            "imageWidth": w,
-            "imageHeight": h
-        }, raw=True)
-        
-        if not isinstance(response, dict):
-            logging.error(f"截圖回應格式異常: {type(response)}")
-            return None
-            
-        image_data = response.get("imageData")
-        if not image_data: 
-            logging.error("圖像資料為空")
-            return None
-            
-        # 處理 base64 資料
-        if "," in image_data: 
-            image_data = image_data.split(",", 1)[1]
-            
-        img = cv2.imdecode(np.frombuffer(base64.b64decode(image_data), np.uint8),
-                           cv2.IMREAD_COLOR)
-        return img
-        
-    except Exception as e:
-        logging.error("GetSourceScreenshot 失敗：%s", e)
-        return None
-
 def main():
     ap=argparse.ArgumentParser("Presence via OBS v5")
     ap.add_argument("--mode", choices=["meet","zoom"], required=True)
@@ -176,6 +147,9 @@ def main():
     ap.add_argument("--log-level", default="INFO",
                     choices=["DEBUG","INFO","WARNING","ERROR"])
     ap.add_argument("--logfile", default=None)
+    add_backend_args(ap, hands=False, faces=True)
+    # obs: GetSourceScreenshot (--shot-format jpg/bmp/png), cam: OBS Virtual Camera, file: --video
+    add_source_args(ap)
     args=ap.parse_args()
 
     handlers=[logging.StreamHandler()]
@@ -201,12 +175,23 @@ def main():
         logging.error("找不到場景 Live/BRB。現有場景：%s", scenes)
         return
         
-    inputs = safe_get_inputs(client)
-    if args.camera_source_name not in inputs:
-        logging.error("找不到輸入來源：%s。現有輸入來源：%s", args.camera_source_name, inputs)
+    if args.frame_source == "obs":
+        inputs = safe_get_inputs(client)
+        if args.camera_source_name not in inputs:
+            logging.error("找不到輸入來源：%s。現有輸入來源：%s", args.camera_source_name, inputs)
+            return
+
+    try:
+        source = make_frame_source(args.frame_source, args.shot_width, args.shot_height,
+                                   client=client, source_name=args.camera_source_name,
+                                   image_format=args.shot_format, quality=args.shot_quality,
+                                   cam_index=args.cam_index, video=args.video)
+    except (ValueError, IOError) as e:
+        logging.error(f"畫面來源開啟失敗: {e}")
         return
 
-    det = FaceDet(min_conf=min(args.conf_in,args.conf_out))
+    det = FaceDet(min_conf=min(args.conf_in,args.conf_out),
+                  backend=args.backend, model_path=args.face_model)
     state="PRESENT"; hist=[]; warm=0; last=time.time()
 
     def single_present(faces: List[Face]) -> bool:
@@ -214,14 +199,13 @@ def main():
         area = args.area_in if state=="ABSENT" else args.area_out
         return any(f.score>=conf and f.area>=area for f in faces)
 
-    logging.info("開始偵測：來源=%s  Live=%s  BRB=%s",
-                 args.camera_source_name, args.live_scene, args.brb_scene)
+    logging.info("開始偵測：來源=%s (%s)  Live=%s  BRB=%s",
+                 args.camera_source_name, args.frame_source, args.live_scene, args.brb_scene)
 
     try:
         while True:
             t0=time.time()
-            frame = obs_get_source_frame(client, args.camera_source_name,
-                                         args.shot_width, args.shot_height)
+            frame = source.read()
             if frame is None:
                 logging.warning("抓不到來源畫面（請檢查來源名稱/設定）")
                 time.sleep(0.3); continue
@@ -307,8 +291,11 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        det.close()
+        source.close()
         cv2.destroyAllWindows()
-        logging.info("已停止。")
+        logging.info("已停止。 推論統計：%s", det.det.stats())
+        logging.info("畫面來源統計：%s", source.stats())
 
 if __name__=="__main__":
     main()
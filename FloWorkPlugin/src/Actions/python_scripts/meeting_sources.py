@@ -0,0 +1,335 @@
+# meeting_sources.py — where meeting.py gets the camera image it polls
+#
+# meeting.py asked OBS for a PNG screenshot on every poll: OBS renders the
+# source, compresses it losslessly, base64-encodes it into a JSON websocket
+# message, and the script reverses all of that (b64decode + cv2.imdecode)
+# before face detection on a 640x360 image. The sources here share one
+# read() -> BGR image (or None) call:
+#   obs   the same GetSourceScreenshot request, with a selectable imageFormat
+#         (jpg / bmp / png) and compression quality; jpg is the cheapest to
+#         encode, ship and decode, bmp skips compression but sends ~700 KB of
+#         base64 per 640x360 poll
+#   cam   the OBS Virtual Camera (or any capture device) read on a background
+#         thread, so a poll just takes the newest frame — no encoding at all
+#   file  a video file, for running the detector on a recording
+# Every source returns frames at the requested poll size and counts per-poll
+# latency and CPU time (stats()).
+import base64
+import logging
+import platform
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from frame_buffers import BufferPool
+from frame_grabber import LatestFrameGrabber, open_source
+
+SOURCES = ("obs", "cam", "file")
+SHOT_FORMATS = ("jpg", "bmp", "png")
+
+
+class _PollStats:
+    """Per-poll wall time and process CPU time of read()."""
+
+    def __init__(self):
+        self.polls = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)
+        self.cpu = deque(maxlen=1000)
+
+    def read(self):
+        t0, c0 = time.perf_counter(), time.process_time()
+        img = self._read()
+        self.latencies.append(time.perf_counter() - t0)
+        self.cpu.append(time.process_time() - c0)
+        self.polls += 1
+        self.failed += img is None
+        return img
+
+    def stats(self):
+        lat = np.array(self.latencies) * 1000
+        cpu = np.array(self.cpu) * 1000
+        return {
+            "polls": self.polls,
+            "failed": self.failed,
+            "latency_p50_ms": float(np.percentile(lat, 50)) if lat.size else 0.0,
+            "latency_p95_ms": float(np.percentile(lat, 95)) if lat.size else 0.0,
+            "cpu_mean_ms": float(cpu.mean()) if cpu.size else 0.0,
+        }
+
+
+class ObsScreenshotSource(_PollStats):
+    def __init__(self, client, source_name, width=640, height=360, image_format="jpg", quality=-1):
+        """
+        client:       obsws_python ReqClient (anything with send(request, data, raw=True))
+        image_format: jpg / bmp / png, what OBS encodes the screenshot as
+        quality:      imageCompressionQuality, 0..100 (jpg quality, png speed), -1 = OBS default
+        """
+        super().__init__()
+        if image_format not in SHOT_FORMATS:
+            raise ValueError(f"unknown screenshot format {image_format!r}, expected one of {SHOT_FORMATS}")
+        self.client = client
+        self._request = {
+            "sourceName": source_name,
+            "imageFormat": image_format,
+            "imageWidth": width,
+            "imageHeight": height,
+            "imageCompressionQuality": quality,
+        }
+
+    def _read(self):
+        try:
+            response = self.client.send("GetSourceScreenshot", self._request, raw=True)
+            if not isinstance(response, dict):
+                logging.error(f"截圖回應格式異常: {type(response)}")
+                return None
+
+            image_data = response.get("imageData")
+            if not image_data:
+                logging.error("圖像資料為空")
+                return None
+
+            # "data:image/jpg;base64,..."
+            if "," in image_data:
+                image_data = image_data.split(",", 1)[1]
+            return cv2.imdecode(np.frombuffer(base64.b64decode(image_data), np.uint8), cv2.IMREAD_COLOR)
+
+        except Exception as e:
+            logging.error("GetSourceScreenshot 失敗：%s", e)
+            return None
+
+    def close(self):
+        pass
+
+
+class _Resized(_PollStats):
+    """Frames scaled to the poll size into a reused buffer (valid until the next read)."""
+
+    def __init__(self, width, height):
+        super().__init__()
+        self.size = (width, height)
+        self._pool = BufferPool()
+
+    def _fit(self, img):
+        if img is None or (img.shape[1], img.shape[0]) == self.size:
+            return img
+        dst = self._pool.get("poll", (self.size[1], self.size[0], 3))
+        return cv2.resize(img, self.size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+class CameraSource(_Resized):
+    def __init__(self, index, width=640, height=360, capture_size=(1280, 720), timeout=1.0):
+        """
+        index:        capture device of the OBS Virtual Camera (DirectShow on Windows)
+        capture_size: resolution asked from the device, frames are then scaled to width x height
+        timeout:      how long read() waits when no frame has arrived yet
+        """
+        super().__init__(width, height)
+        api = cv2.CAP_DSHOW if platform.system() == "Windows" else None
+        self._grabber = LatestFrameGrabber(open_source(int(index), *capture_size, api=api)).start()
+        self.timeout = timeout
+
+    def _read(self):
+        # newest frame, even if the last poll already had it; wait only at startup
+        frame = self._grabber.get(fresh=False) or self._grabber.get(timeout=self.timeout)
+        return self._fit(frame.image if frame is not None else None)
+
+    def close(self):
+        self._grabber.stop()
+
+    def stats(self):
+        return {**super().stats(), **self._grabber.stats()}
+
+
+class VideoFileSource(_Resized):
+    def __init__(self, path, width=640, height=360, realtime=True, loop=True):
+        """
+        realtime: each poll gets the frame at the wall-clock position (frames in
+                  between are skipped); False = the next frame on every poll
+        loop:     start over at the end of the file
+        """
+        super().__init__(width, height)
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"cannot open video {path}")
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.loop = loop
+        self._t0 = None
+        self._pos = 0  # index of the next frame read() would decode
+
+    def _rewind(self):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self._pos = 0
+
+    def _read(self):
+        if self.realtime:
+            now = time.monotonic()
+            if self._t0 is None:
+                self._t0 = now
+            target = int((now - self._t0) * self.fps)
+            # skipped frames are only demuxed (grab), not decoded
+            while self._pos < target:
+                if not self.cap.grab():
+                    if not self.loop:
+                        return None
+                    self._rewind()
+                    self._t0 = now
+                    break
+                self._pos += 1
+        ok, img = self.cap.read()
+        if not ok and self.loop:
+            self._rewind()
+            self._t0 = time.monotonic()
+            ok, img = self.cap.read()
+        self._pos += 1
+        return self._fit(img if ok else None)
+
+    def close(self):
+        self.cap.release()
+
+
+def add_source_args(ap):
+    """The --frame-source / --shot-format / --shot-quality / --cam-index / --video options."""
+    ap.add_argument("--frame-source", choices=SOURCES, default="obs",
+                    help="obs: GetSourceScreenshot; cam: OBS Virtual Camera device; file: --video")
+    ap.add_argument("--shot-format", choices=SHOT_FORMATS, default="jpg", help="obs screenshot encoding")
+    ap.add_argument("--shot-quality", type=int, default=-1, help="obs screenshot quality 0..100, -1 = default")
+    ap.add_argument("--cam-index", type=int, default=1, help="capture device of the virtual camera")
+    ap.add_argument("--video", default=None, help="video file for --frame-source file")
+    return ap
+
+
+def make_frame_source(name, width=640, height=360, client=None, source_name=None,
+                      image_format="jpg", quality=-1, cam_index=1, video=None):
+    if name == "obs":
+        return ObsScreenshotSource(client, source_name, width, height, image_format, quality)
+    if name == "cam":
+        return CameraSource(cam_index, width, height)
+    if name == "file":
+        if not video:
+            raise ValueError("--frame-source file needs --video")
+        return VideoFileSource(video, width, height)
+    raise ValueError(f"unknown frame source {name!r}, expected one of {SOURCES}")
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: per-poll latency and CPU of every source at the meeting.py poll
+# size. Without --obs-password the OBS round trip is emulated in-process
+# (encode at the requested format, base64 into JSON, decode); the encode time
+# stands in for OBS's own work and is reported apart from the client's CPU.
+#   python meeting_sources.py [clip.mp4] [--polls 100] [--cam-index 1]
+#                             [--obs-password pw --camera-source-name Cam]
+# ---------------------------------------------------------------------------
+class _EmulatedObs:
+    """send("GetSourceScreenshot") answered from a video, encoded the way OBS would."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._i = 0
+        self.encode_s = 0.0
+
+    def send(self, request, data, raw=False):
+        import json
+
+        img = self.frames[self._i % len(self.frames)]
+        self._i += 1
+        t0 = time.process_time()
+        fmt, q = data["imageFormat"], data["imageCompressionQuality"]
+        img = cv2.resize(img, (data["imageWidth"], data["imageHeight"]), interpolation=cv2.INTER_AREA)
+        params = []
+        if fmt == "jpg" and q >= 0:
+            params = [cv2.IMWRITE_JPEG_QUALITY, q]
+        ok, buf = cv2.imencode("." + fmt, img, params)
+        message = json.dumps({"imageData": f"data:image/{fmt};base64," + base64.b64encode(buf).decode()})
+        self.encode_s += time.process_time() - t0
+        return json.loads(message)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+
+    ap = argparse.ArgumentParser("meeting frame source benchmark")
+    ap.add_argument("clip", nargs="?", default=None, help="video file (default: a synthetic clip)")
+    ap.add_argument("--polls", type=int, default=100)
+    ap.add_argument("--width", type=int, default=640)
+    ap.add_argument("--height", type=int, default=360)
+    ap.add_argument("--cam-index", type=int, default=None, help="also poll this capture device")
+    ap.add_argument("--obs-host", default="127.0.0.1")
+    ap.add_argument("--obs-port", type=int, default=4455)
+    ap.add_argument("--obs-password", default=None, help="poll a real OBS instead of the emulation")
+    ap.add_argument("--camera-source-name", default=None)
+    args = ap.parse_args()
+
+    clip = args.clip
+    if clip is None:
+        from frame_grabber import SyntheticSource
+
+        clip = os.path.join(tempfile.gettempdir(), "meeting_sources_bench.avi")
+        syn = SyntheticSource(1280, 720, fps=1000.0, frames=60)
+        out = cv2.VideoWriter(clip, cv2.VideoWriter_fourcc(*"MJPG"), 30, (1280, 720))
+        while True:
+            ok, img = syn.read()
+            if not ok:
+                break
+            out.write(img)
+        out.release()
+
+    cap = cv2.VideoCapture(clip)
+    frames = []
+    while len(frames) < 60:
+        ok, img = cap.read()
+        if not ok:
+            break
+        frames.append(img)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"no frames in {clip}")
+
+    def poll(source, n=args.polls):
+        for _ in range(n):
+            source.read()
+        source.close()
+        return source.stats()
+
+    size = (args.width, args.height)
+    print(f"{args.polls} polls at {size[0]}x{size[1]}, source frames {frames[0].shape[1]}x{frames[0].shape[0]}")
+    if args.obs_password:
+        from obsws_python import ReqClient
+
+        client = ReqClient(host=args.obs_host, port=args.obs_port, password=args.obs_password, timeout=3)
+        for fmt in SHOT_FORMATS:
+            st = poll(ObsScreenshotSource(client, args.camera_source_name, *size, fmt))
+            print(f"obs {fmt:4s}: {st['latency_p50_ms']:6.2f} ms p50, {st['latency_p95_ms']:6.2f} ms p95, "
+                  f"client cpu {st['cpu_mean_ms']:5.2f} ms/poll, failed {st['failed']}")
+    else:
+        for fmt, q in (("png", -1), ("bmp", -1), ("jpg", 90), ("jpg", 75)):
+            obs = _EmulatedObs(frames)
+            st = poll(ObsScreenshotSource(obs, "Camera", *size, fmt, q))
+            encode_ms = obs.encode_s / args.polls * 1000
+            print(f"obs {fmt:4s} q{q:3d} (emulated): {st['latency_p50_ms']:6.2f} ms p50, "
+                  f"{st['latency_p95_ms']:6.2f} ms p95, OBS-side encode {encode_ms:5.2f} ms, "
+                  f"client cpu {st['cpu_mean_ms'] - encode_ms:5.2f} ms/poll")
+
+    st = poll(VideoFileSource(clip, *size, realtime=False))
+    print(f"file (next frame)    : {st['latency_p50_ms']:6.2f} ms p50, {st['latency_p95_ms']:6.2f} ms p95, "
+          f"cpu {st['cpu_mean_ms']:5.2f} ms/poll")
+    if args.cam_index is not None:
+        cam = CameraSource(args.cam_index, *size)
+        time.sleep(1.0)  # let the device start
+        c0 = time.process_time()
+        for _ in range(args.polls):
+            cam.read()
+            time.sleep(0.2)  # meeting.py's default poll interval, the grabber keeps reading
+        # the capture thread decodes every camera frame, so count the whole process
+        cpu_ms = (time.process_time() - c0) / args.polls * 1000
+        cam.close()
+        st = cam.stats()
+        print(f"cam {args.cam_index} (grabber)       : {st['latency_p50_ms']:6.2f} ms p50, "
+              f"{st['latency_p95_ms']:6.2f} ms p95, cpu {cpu_ms:5.2f} ms/poll incl. capture thread")
@@ -0,0 +1,357 @@
+# pipeline.py — run capture -> inference -> action as separate stages
+#
+# Serial mode calls every stage inline (what the loops always did). Threaded
+# mode gives each stage its own worker connected by small bounded queues that
+# throw away the oldest item when full, so a slow stage works on fresh data
+# instead of a backlog. One worker per stage + FIFO queues that only ever drop
+# means every stage still sees items in capture order.
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+class DropQueue:
+    """Bounded FIFO; put() never blocks and discards the oldest item when full."""
+
+    def __init__(self, maxsize=1):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the next item, or None when closed / timed out."""
+        with self._cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageTimer:
+    """Keeps the last `window` durations per stage for mean / percentile readouts."""
+
+    def __init__(self, window=1000):
+        self._window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self._window)
+                self._counts[name] = 0
+            self._samples[name].append(seconds)
+            self._counts[name] += 1
+
+    def summary(self):
+        """name -> dict(count, mean_ms, p50_ms, p95_ms, max_ms)"""
+        out = {}
+        with self._lock:
+            items = [(k, np.array(v), self._counts[k]) for k, v in self._samples.items()]
+        for name, arr, count in items:
+            ms = arr * 1000.0
+            out[name] = {
+                "count": count,
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "max_ms": float(ms.max()),
+            }
+        return out
+
+    def report(self, title="stages"):
+        lines = [f"[{title}]"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"  {name:<12} n={s['count']:<6d} mean {s['mean_ms']:7.2f} ms"
+                f"  p50 {s['p50_ms']:7.2f}  p95 {s['p95_ms']:7.2f}  max {s['max_ms']:7.2f}"
+            )
+        return "\n".join(lines)
+
+
+class _Job:
+    __slots__ = ("seq", "t_capture", "payload")
+
+    def __init__(self, seq, t_capture, payload):
+        self.seq = seq
+        self.t_capture = t_capture
+        self.payload = payload
+
+
+class Pipeline:
+    def __init__(self, source, stages, threaded=True, queue_size=1, output_size=1):
+        """
+        source: callable returning the next item or None at the end of input
+                (e.g. LatestFrameGrabber.get). Items with a `.t` attribute use
+                it as their capture time for the end-to-end latency.
+        stages: list of (name, fn); fn(item) -> item for the next stage, or
+                None to skip the rest of the pipeline for this item
+        threaded: False runs everything inline inside get()
+        """
+        self.source = source
+        self.stages = list(stages)
+        self.threaded = threaded
+        self.timer = StageTimer()
+        self.latency = StageTimer()
+        self.skipped = {name: 0 for name, _ in self.stages}
+        self.out_of_order = 0
+        self.error = None  # first exception of a worker, re-raised by get()
+
+        self._queues = [DropQueue(queue_size) for _ in self.stages]
+        self._output = DropQueue(output_size)
+        self._threads = []
+        self._running = False
+        self._seq = 0
+        self._last_out_seq = -1
+
+    # ---- lifecycle ----
+    def start(self):
+        self._running = True
+        if self.threaded:
+            self._spawn("capture", self._capture_loop)
+            for i in range(len(self.stages)):
+                self._spawn(self.stages[i][0], self._stage_loop, i)
+        return self
+
+    def _spawn(self, name, target, *args):
+        t = threading.Thread(target=target, args=args, name=f"pipeline-{name}", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self):
+        self._running = False
+        for q in self._queues:
+            q.close()
+        self._output.close()
+        for t in self._threads:
+            t.join(timeout=2.0)
+
+    # ---- workers ----
+    def _next_job(self):
+        t0 = time.monotonic()
+        item = self.source()
+        self.timer.record("capture", time.monotonic() - t0)
+        if item is None:
+            return None
+        job = _Job(self._seq, getattr(item, "t", t0), item)
+        self._seq += 1
+        return job
+
+    def _run_stage(self, i, job):
+        name, fn = self.stages[i]
+        t0 = time.monotonic()
+        job.payload = fn(job.payload)
+        self.timer.record(name, time.monotonic() - t0)
+        if job.payload is None:
+            self.skipped[name] += 1
+            return None
+        return job
+
+    def _fail(self, name, exc):
+        # a dead worker stops the pipeline; the queues after it get closed by
+        # the caller, so get() wakes up and raises instead of waiting forever
+        if self.error is None:
+            self.error = exc
+        self._running = False
+        print(f"[PIPELINE] {name} failed: {exc!r}")
+
+    def _capture_loop(self):
+        try:
+            while self._running:
+                job = self._next_job()
+                if job is None:
+                    break
+                self._queues[0].put(job)
+        except Exception as e:
+            self._fail("capture", e)
+        finally:
+            self._queues[0].close()
+
+    def _stage_loop(self, i):
+        inbox = self._queues[i]
+        outbox = self._queues[i + 1] if i + 1 < len(self.stages) else self._output
+        try:
+            while self._running:
+                job = inbox.get()
+                if job is None:
+                    break
+                job = self._run_stage(i, job)
+                if job is not None:
+                    outbox.put(job)
+        except Exception as e:
+            self._fail(self.stages[i][0], e)
+        finally:
+            outbox.close()
+
+    # ---- consumer side ----
+    def get(self, timeout=None):
+        """
+        Next finished item from the last stage. Returns None when the input
+        ended, or (threaded mode only) when `timeout` seconds pass without one.
+        Raises what a stage (or the source) raised: inline in serial mode, from
+        the worker thread once everything before it was delivered in threaded mode.
+        """
+        while True:
+            if self.threaded:
+                job = self._output.get(timeout)
+                if job is None:
+                    if self.error is not None:
+                        raise self.error
+                    return None
+            else:
+                job = self._next_job()
+                if job is None:
+                    return None
+                for i in range(len(self.stages)):
+                    job = self._run_stage(i, job)
+                    if job is None:
+                        break
+                if job is None:
+                    continue
+            if job.seq <= self._last_out_seq:  # never happens with single workers
+                self.out_of_order += 1
+                continue
+            self._last_out_seq = job.seq
+            self.latency.record("end_to_end", time.monotonic() - job.t_capture)
+            return job.payload
+
+    def stats(self):
+        return {
+            "stages": self.timer.summary(),
+            "latency": self.latency.summary().get("end_to_end"),
+            "queue_drops": {name: q.dropped for (name, _), q in zip(self.stages, self._queues)},
+            "skipped": dict(self.skipped),
+            "delivered": self._last_out_seq + 1,
+        }
+
+    def report(self):
+        lines = [self.timer.report("pipeline stages" + (" (threaded)" if self.threaded else " (serial)"))]
+        lat = self.latency.summary().get("end_to_end")
+        if lat:
+            lines.append(
+                f"  end-to-end   n={lat['count']:<6d} mean {lat['mean_ms']:7.2f} ms"
+                f"  p50 {lat['p50_ms']:7.2f}  p95 {lat['p95_ms']:7.2f}  max {lat['max_ms']:7.2f}"
+            )
+        drops = {name: q.dropped for (name, _), q in zip(self.stages, self._queues)}
+        lines.append(f"  queue drops: {drops}")
+        return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: serial vs threaded on a recorded clip (needs mediapipe).
+#   python pipeline.py <video file> [--realtime]
+# Without --realtime every frame of the clip is processed, each one handed to
+# the pipeline only once inference took the previous one, so nothing is
+# dropped and results/s is pure throughput; with it, frames arrive at the
+# clip's fps through a LatestFrameGrabber like a camera (latency matters).
+# ---------------------------------------------------------------------------
+class _BlockingClip:
+    """
+    Pipeline source over a video file that never drops: next() waits until the
+    first stage has taken the previous frame (call taken() from that stage).
+    """
+
+    def __init__(self, path):
+        import cv2
+        from frame_grabber import Frame
+
+        self._frame = Frame
+        self._cap = cv2.VideoCapture(path)
+        self._room = threading.Semaphore(1)
+        self._seq = 0
+
+    def __call__(self):
+        self._room.acquire()
+        ok, image = self._cap.read()
+        if not ok:
+            return None
+        self._seq += 1
+        return self._frame(image, time.monotonic(), self._seq - 1)
+
+    def taken(self):
+        self._room.release()
+
+    def release(self):
+        self._cap.release()
+
+
+if __name__ == "__main__":
+    import argparse
+    import cv2
+    import mediapipe as mp
+    from frame_grabber import LatestFrameGrabber, open_source
+    from hand_features import hands_to_array, compute_features, classify
+
+    ap = argparse.ArgumentParser("pipeline benchmark")
+    ap.add_argument("clip")
+    ap.add_argument("--realtime", action="store_true")
+    ap.add_argument("--seconds", type=float, default=20.0)
+    args = ap.parse_args()
+
+    def run(threaded):
+        hands = mp.solutions.hands.Hands(
+            min_detection_confidence=0.7, min_tracking_confidence=0.7, max_num_hands=2
+        )
+
+        def infer(grabbed):
+            if clip is not None:
+                clip.taken()
+            frame = cv2.flip(grabbed.image, 1)
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            return hands.process(rgb)
+
+        def act(result):
+            if result.multi_hand_landmarks:
+                return classify(compute_features(hands_to_array(result.multi_hand_landmarks)))
+            return ()
+
+        if args.realtime:
+            clip, grabber = None, LatestFrameGrabber(open_source(args.clip), realtime=True).start()
+            source = grabber.get
+        else:
+            clip, grabber = _BlockingClip(args.clip), None
+            source = clip
+        pipe = Pipeline(source, [("inference", infer), ("action", act)], threaded=threaded).start()
+        n = 0
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < args.seconds:
+            if pipe.get(timeout=5.0) is None:
+                break
+            n += 1
+        elapsed = time.monotonic() - t0
+        pipe.stop()
+        hands.close()
+        print(pipe.report())
+        if grabber is not None:
+            grabber.stop()
+            print(f"  throughput: {n / elapsed:.1f} results/s, camera drops {grabber.stats()['dropped']}")
+        else:
+            clip.release()
+            # every frame read was processed; queue drops above should stay 0
+            print(f"  throughput: {n / elapsed:.1f} results/s over {n} frames")
+        print()
+
+    run(threaded=False)
+    run(threaded=True)
@@ -0,0 +1,417 @@
+# punch_detector.py — boxing.py's punch detection, per hand, timed by capture timestamps
+#
+# boxing.py counted in frames: a punch was a frame-to-frame growth of the hand
+# box by 0.010 with a compactness drop of 0.05, hooks moved 40 px per frame
+# and the cooldown was 15 frames. At 15 fps the same punch moved twice as far
+# per frame as at 30 fps, so the game played differently with the frame rate
+# and inference could not skip frames. Here every threshold is a per-second
+# rate over the last RATE_WINDOW_SEC of capture timestamps (the reference is
+# interpolated between the two samples around t - window, so the rate covers
+# the same time span at any frame rate), and the cooldown is in seconds.
+#
+# The previous values also used to be single globals shared by every hand, so
+# with two hands the left fist was compared against the right. Each hand now
+# has a track (matched by handedness, then nearest centroid) with a short ring
+# of its time, area, compactness, centre and depth.
+#
+# A frame has one or two hands of 21 points, so the per-frame path is plain
+# Python on floats: NumPy's per-call overhead made a batched version about 3x
+# slower than the old loops. punch_features is the same computation over an
+# (n, 21, 3) array, for recordings and for checking hand_row against.
+import math
+from collections import deque, namedtuple
+
+import numpy as np
+
+# the old per-frame thresholds at the 30 fps they were tuned at
+PUNCH_COOLDOWN_SEC = 0.5  # per hand, was 15 frames for both
+GROWTH_RATE = 0.30  # hand box area (normalized) per second, was 0.010 per frame
+COMPACTNESS_RATE = -1.5  # per second, was -0.05 per frame
+HOOK_SPEED = 1200.0  # sideways px per second, was 40 px per frame
+RATE_WINDOW_SEC = 0.1  # rates are measured over this much time ...
+RATE_MAX_AGE_SEC = 0.3  # ... and not across a gap longer than this (hand was lost)
+
+# tracks
+TRACK_HISTORY = 16  # samples per hand (0.5 s at 30 fps)
+TRACK_TIMEOUT_SEC = 0.5  # a hand unseen this long starts a new track
+TRACK_MAX_JUMP = 0.25  # normalized centroid distance still matched to a track
+
+PUNCH_TYPES = {
+    "left_hook": ("LEFT HOOK!", (255, 100, 100)),
+    "right_hook": ("RIGHT HOOK!", (100, 255, 100)),
+    "straight": ("STRAIGHT!", (100, 100, 255)),
+}
+
+# history columns
+T, AREA, COMPACTNESS, CX, CY, Z = range(6)
+
+# index / middle / ring / little finger joints as strided slices (views, no gather)
+_TIPS, _PIPS, _MCPS = slice(8, 21, 4), slice(6, 19, 4), slice(5, 18, 4)
+_FINGERS = ((8, 6, 5), (12, 10, 9), (16, 14, 13), (20, 18, 17))  # (tip, pip, mcp)
+
+# kind: PUNCH_TYPES key, position: (x, y) px of the fist, speed: approach speed
+# over the rate window in hand sizes per second, hand: handedness of the track
+Punch = namedtuple("Punch", "kind position speed hand")
+
+
+def punch_features(pts):
+    """
+    pts: (n, 21, 3) landmarks of n hands, normalized image coordinates.
+    Returns a (n, 6) float64 array of the history columns (T left 0) and a
+    (n,) bool array: is the hand a fist.
+    """
+    # a few hands of 21 points: the cost is the number of NumPy calls, so
+    # reductions (the slow ones) are shared and 2-D distances written out
+    pts = np.asarray(pts, dtype=np.float64)
+    x, y = pts[..., 0], pts[..., 1]
+    out = np.empty((len(pts), 6))
+    hi, lo = np.maximum.reduce(pts, axis=1), np.minimum.reduce(pts, axis=1)
+    area = (hi[:, 0] - lo[:, 0]) * (hi[:, 1] - lo[:, 1])
+    mean = np.add.reduce(pts, axis=1) / 21
+    dx, dy = x - mean[:, :1], y - mean[:, 1:2]
+    spread = np.add.reduce(np.sqrt(dx * dx + dy * dy), axis=1) / 21
+    out[:, T] = 0.0
+    out[:, AREA] = area
+    out[:, COMPACTNESS] = spread / (area + 0.001)
+    out[:, CX:] = mean
+
+    # fingers count as bent when the tip is nearer the wrist than the PIP joint
+    # (+1) and when the tip is below its knuckle (+0.5); a tucked thumb adds 1
+    wx, wy = x - x[:, :1], y - y[:, :1]
+    to_wrist = np.sqrt(wx * wx + wy * wy)
+    bent = (to_wrist[:, _TIPS] < to_wrist[:, _PIPS]) + 0.5 * (y[:, _TIPS] > y[:, _MCPS])
+    bent = np.add.reduce(bent, axis=1) + (to_wrist[:, 4] < to_wrist[:, 2] * 1.1)
+    return out, bent >= 3.5
+
+
+def hand_row(landmarks):
+    """
+    punch_features of one hand, from its 21 landmark objects (.x .y .z) in one
+    pass. Returns the history columns as a tuple (T 0) and is-a-fist.
+    """
+    hypot = math.hypot
+    xs = [lm.x for lm in landmarks]
+    ys = [lm.y for lm in landmarks]
+    z = sum([lm.z for lm in landmarks]) / 21
+    area = (max(xs) - min(xs)) * (max(ys) - min(ys))
+    cx, cy = sum(xs) / 21, sum(ys) / 21
+    spread = sum(map(hypot, [x - cx for x in xs], [y - cy for y in ys])) / 21
+
+    wx, wy = xs[0], ys[0]
+    bent = 0.0
+    for tip, pip, mcp in _FINGERS:
+        bent += (hypot(xs[tip] - wx, ys[tip] - wy) < hypot(xs[pip] - wx, ys[pip] - wy)) + 0.5 * (ys[tip] > ys[mcp])
+    bent += hypot(xs[4] - wx, ys[4] - wy) < hypot(xs[2] - wx, ys[2] - wy) * 1.1
+    return (0.0, area, spread / (area + 0.001), cx, cy, z), bent >= 3.5
+
+
+class _Track:
+    """One hand's history, the last TRACK_HISTORY rows (tuples of the history columns)."""
+
+    def __init__(self, label, history=TRACK_HISTORY):
+        self.label = label
+        self.rows = deque(maxlen=history)
+        self.ready_at = -math.inf  # end of this hand's cooldown
+
+    @property
+    def last(self):
+        return self.rows[-1]
+
+    def history(self):
+        """(k, 6) samples, oldest first (a copy)."""
+        return np.array(self.rows, dtype=np.float64).reshape(-1, 6)
+
+    def push(self, row):
+        self.rows.append(row)
+
+    def reference(self, t, window, max_age):
+        """History columns interpolated at t - window (None without history that far back)."""
+        t_ref = t - window
+        # walk back from the newest sample; a window is only a few samples long
+        newer = None
+        for row in reversed(self.rows):
+            if row[T] <= t_ref:
+                break
+            newer = row
+        else:
+            return None
+        if t - row[T] > max_age:
+            return None
+        if newer is None:
+            return row
+        u = (t_ref - row[T]) / (newer[T] - row[T])
+        return tuple(a + (b - a) * u for a, b in zip(row, newer))
+
+
+class PunchDetector:
+    def __init__(self, cooldown=PUNCH_COOLDOWN_SEC, window=RATE_WINDOW_SEC, max_age=RATE_MAX_AGE_SEC):
+        self.cooldown = cooldown
+        self.window = window
+        self.max_age = max_age
+        self.tracks = []
+        self.position = None  # (x, y) px of the last hand seen
+        self.punches = 0
+        self.speeds = []  # approach speed of every punch
+
+    def _match(self, labels, rows, t):
+        """Track per hand: same handedness and nearest centroid, else a new track."""
+        self.tracks = [tr for tr in self.tracks if t - tr.last[T] <= TRACK_TIMEOUT_SEC]
+        free = list(self.tracks)
+        out = []
+        for label, row in zip(labels, rows):
+            cands = [tr for tr in free if tr.label == label] or free
+            best = None
+            if cands:
+                cx, cy = row[CX], row[CY]
+                dist, k = min((math.hypot(tr.last[CX] - cx, tr.last[CY] - cy), k) for k, tr in enumerate(cands))
+                if dist <= TRACK_MAX_JUMP:
+                    best = cands[k]
+            if best is None:
+                best = _Track(label)
+                self.tracks.append(best)
+            else:
+                free.remove(best)
+                best.label = label
+            out.append(best)
+        return out
+
+    def update(self, t, result, frame_width, frame_height):
+        """
+        All hands of the (MediaPipe-like) result of the frame captured at `t`
+        (seconds). Returns a list of Punch, usually empty.
+        """
+        hands = result.multi_hand_landmarks if result is not None else None
+        if not hands:
+            return []
+        labels = [hd.classification[0].label for hd in result.multi_handedness]
+        rows, fists = [], []
+        for hand in hands:
+            row, is_fist = hand_row(hand.landmark)
+            rows.append((t,) + row[1:])
+            fists.append(is_fist)
+        tracks = self._match(labels, rows, t)
+
+        punches = []
+        window = self.window
+        for tr, row, is_fist in zip(tracks, rows, fists):
+            ref = tr.reference(t, window, self.max_age)
+            tr.push(row)
+            if ref is None or t < tr.ready_at or not is_fist:
+                continue
+            if (row[AREA] - ref[AREA]) / window > GROWTH_RATE and \
+                    (row[COMPACTNESS] - ref[COMPACTNESS]) / window < COMPACTNESS_RATE:
+                speed_x = (row[CX] - ref[CX]) / window * frame_width
+                if tr.label == "Left" and speed_x > HOOK_SPEED:
+                    kind = "left_hook"
+                elif tr.label == "Right" and speed_x < -HOOK_SPEED:
+                    kind = "right_hook"
+                else:
+                    kind = "straight"
+                # growth of the box size, relative to its size at the start of the window
+                size, size_ref = math.sqrt(row[AREA]), max(math.sqrt(ref[AREA]), 1e-6)
+                speed = (size - size_ref) / size_ref / window
+                position = (int(row[CX] * frame_width), int(row[CY] * frame_height))
+                punches.append(Punch(kind, position, speed, tr.label))
+                tr.ready_at = t + self.cooldown
+                self.punches += 1
+                self.speeds.append(speed)
+        last = rows[-1]
+        self.position = (int(last[CX] * frame_width), int(last[CY] * frame_height))
+        return punches
+
+    def stats(self):
+        return {
+            "punches": self.punches,
+            "tracks": len(self.tracks),
+            "mean_speed": float(np.mean(self.speeds)) if self.speeds else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Replay at several simulated frame rates: a scripted round (straights, hooks,
+# slow drift towards / away from the camera, optionally a second guarding
+# fist) sampled at each rate and run through PunchDetector and through the old
+# frame-counted rules with their shared previous-hand globals. The punch
+# counts of PunchDetector should depend neither on the rate nor on the second
+# hand. Below ~15 fps a 0.15 s punch is one or two samples and may slip
+# between them. test_punch_detector.py runs the same round over rates and seeds.
+#   python punch_detector.py [--fps 15 20 30 60] [--punches 12] [--jitter 0.1] [--two-hands]
+# ---------------------------------------------------------------------------
+def _is_fist_reference(hand_landmarks):
+    """boxing.py's per-landmark fist test, to check punch_features against."""
+    landmarks = hand_landmarks.landmark
+    finger_tips = [4, 8, 12, 16, 20]
+    finger_pips = [3, 6, 10, 14, 18]
+    finger_mcp = [2, 5, 9, 13, 17]
+    wrist = landmarks[0]
+    bent_fingers = 0
+    for i in range(1, 5):
+        tip = landmarks[finger_tips[i]]
+        pip = landmarks[finger_pips[i]]
+        mcp = landmarks[finger_mcp[i]]
+        tip_to_wrist = ((tip.x - wrist.x) ** 2 + (tip.y - wrist.y) ** 2) ** 0.5
+        pip_to_wrist = ((pip.x - wrist.x) ** 2 + (pip.y - wrist.y) ** 2) ** 0.5
+        if tip_to_wrist < pip_to_wrist:
+            bent_fingers += 1
+        if tip.y > mcp.y:
+            bent_fingers += 0.5
+    thumb_tip = landmarks[4]
+    thumb_mcp = landmarks[2]
+    thumb_to_wrist = ((thumb_tip.x - wrist.x) ** 2 + (thumb_tip.y - wrist.y) ** 2) ** 0.5
+    thumb_mcp_to_wrist = ((thumb_mcp.x - wrist.x) ** 2 + (thumb_mcp.y - wrist.y) ** 2) ** 0.5
+    if thumb_to_wrist < thumb_mcp_to_wrist * 1.1:
+        bent_fingers += 1
+    return bent_fingers >= 3.5
+
+
+def _compactness_reference(hand_landmarks):
+    landmarks = hand_landmarks.landmark
+    xs = [lm.x for lm in landmarks]
+    ys = [lm.y for lm in landmarks]
+    width = max(xs) - min(xs)
+    height = max(ys) - min(ys)
+    center_x = sum(xs) / len(xs)
+    center_y = sum(ys) / len(ys)
+    total_distance = sum(((lm.x - center_x) ** 2 + (lm.y - center_y) ** 2) ** 0.5 for lm in landmarks)
+    avg_distance = total_distance / len(landmarks)
+    return avg_distance / (width * height + 0.001)
+
+
+class _OldFrameDetector:
+    """boxing.py's previous rules: counted in frames, one set of globals for all hands."""
+
+    def __init__(self):
+        self.prev = None
+        self.cooldown = 0
+        self.punches = 0
+
+    def update(self, hand_landmarks, frame_width):
+        compactness = _compactness_reference(hand_landmarks)
+        xs = [lm.x for lm in hand_landmarks.landmark]
+        ys = [lm.y for lm in hand_landmarks.landmark]
+        area = (max(xs) - min(xs)) * (max(ys) - min(ys))
+        center_x = int(sum(xs) / len(xs) * frame_width)
+        if self.prev is not None:
+            growth, change = area - self.prev[0], compactness - self.prev[1]
+            if self.cooldown == 0 and _is_fist_reference(hand_landmarks) and growth > 0.010 and change < -0.05:
+                self.punches += 1
+                self.cooldown = 15
+        self.prev = (area, compactness, center_x)
+
+    def end_frame(self):
+        if self.cooldown > 0:
+            self.cooldown -= 1
+
+
+def scripted_round(fps, punches=12, jitter=0.1, two_hands=False, seed=0):
+    """
+    The scripted round sampled at `fps`, intervals jittered by +-jitter:
+    a punch every 1.5 s, every third one a hook (0.15 s out, 0.4 s back).
+    Returns (kinds, frames): the punch kinds in script order and a list of
+    (t, ReplayResult).
+    """
+    from gesture_classifier import synthetic_hands
+    from landmark_recorder import ReplayResult
+
+    # a fist template, centred, ~unit size
+    pts, _ = synthetic_hands(200, noise=1.0, seed=seed)
+    fist = pts[punch_features(pts)[1]][0]
+    fist = fist - fist.mean(axis=0)
+    fist[:, :2] /= np.ptp(fist[:, :2], axis=0).max()
+
+    rng = np.random.default_rng(seed)
+    starts = 1.0 + 1.5 * np.arange(punches)
+    kinds = ["straight" if k % 3 else ("left_hook" if k % 6 == 0 else "right_hook") for k in range(punches)]
+    duration = starts[-1] + 2.0
+
+    def smoothstep(x):
+        x = np.clip(x, 0.0, 1.0)
+        return x * x * (3 - 2 * x)
+
+    def hands_at(t):
+        """Landmarks and handedness at time t: drift + punches."""
+        scale = 0.22 + 0.03 * np.sin(t * 0.8)  # slow drift, no punch
+        cx, cy = 0.5, 0.55
+        label = "Right"
+        for start, kind in zip(starts, kinds):
+            u = smoothstep((t - start) / 0.15) - smoothstep((t - start - 0.2) / 0.4)
+            scale += 0.13 * u
+            if kind != "straight":
+                side = 1.0 if kind == "left_hook" else -1.0
+                cx += side * 0.25 * (smoothstep((t - start + 0.05) / 0.2) - smoothstep((t - start - 0.2) / 0.4))
+                if start - 0.3 <= t <= start + 0.7:
+                    label = "Left" if kind == "left_hook" else "Right"
+        p = fist.copy()
+        p[:, :2] = p[:, :2] * scale + (cx, cy)
+        out, labels = [p], [label]
+        if two_hands:
+            guard = fist.copy()
+            guard[:, :2] = guard[:, :2] * 0.12 + (0.2 if label == "Right" else 0.8, 0.4)
+            out.append(guard)
+            labels.append("Left" if label == "Right" else "Right")
+            if rng.random() < 0.5:  # MediaPipe does not keep the hand order
+                out, labels = out[::-1], labels[::-1]
+        return ReplayResult(out, labels, [1.0] * len(out))
+
+    frames = []
+    t = 0.0
+    while t < duration:
+        frames.append((t, hands_at(t)))
+        t += (1.0 / fps) * (1.0 + rng.uniform(-jitter, jitter))
+    return kinds, frames
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from gesture_classifier import synthetic_hands
+    from landmark_recorder import ReplayResult
+
+    ap = argparse.ArgumentParser("punch detection replay at several frame rates")
+    ap.add_argument("--fps", type=float, nargs="+", default=[15, 20, 30, 60])
+    ap.add_argument("--punches", type=int, default=12)
+    ap.add_argument("--jitter", type=float, default=0.1, help="frame interval jitter, fraction of the interval")
+    ap.add_argument("--two-hands", action="store_true", help="add a second, guarding fist")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    W, H = 1280, 720
+
+    # per-hand and batched features vs. the old per-landmark functions
+    pts, _ = synthetic_hands(2000, noise=1.0, seed=args.seed)
+    hands = ReplayResult(pts, ["Right"] * len(pts), [1.0] * len(pts)).multi_hand_landmarks
+    rows, fist = punch_features(pts)
+    one = [hand_row(h.landmark) for h in hands]
+    ref_fist = np.array([_is_fist_reference(h) for h in hands])
+    ref_comp = np.array([_compactness_reference(h) for h in hands])
+    assert (fist == ref_fist).all() and np.allclose(rows[:, COMPACTNESS], ref_comp), "features differ"
+    assert [f for _, f in one] == ref_fist.tolist() and np.allclose([r for r, _ in one], rows), "hand_row differs"
+    print(f"features identical to the per-landmark functions ({ref_fist.sum()} of {len(pts)} fists)")
+
+    kinds = scripted_round(1.0, args.punches)[0]
+    print(f"{args.punches} punches ({kinds.count('straight')} straight, "
+          f"{args.punches - kinds.count('straight')} hooks), interval jitter {args.jitter:.0%}"
+          f"{', second guarding fist' if args.two_hands else ''}")
+    counts = {}
+    for fps in args.fps:
+        _, frames = scripted_round(fps, args.punches, args.jitter, args.two_hands, args.seed)
+        new, old = PunchDetector(), _OldFrameDetector()
+        found = {k: 0 for k in PUNCH_TYPES}
+        t_new = t_old = 0.0
+        for t, result in frames:
+            t0 = time.perf_counter()
+            for punch in new.update(t, result, W, H):
+                found[punch.kind] += 1
+            t1 = time.perf_counter()
+            for lm in result.multi_hand_landmarks:
+                old.update(lm, W)
+            old.end_frame()
+            t_new += t1 - t0
+            t_old += time.perf_counter() - t1
+        counts[fps] = tuple(found.values())
+        print(f"{fps:5.0f} fps: PunchDetector {new.punches:3d} {found} "
+              f"mean speed {new.stats()['mean_speed']:.2f} sizes/s, {t_new / len(frames) * 1e6:.0f} us/frame | "
+              f"old frame-counted rules {old.punches:3d}, {t_old / len(frames) * 1e6:.0f} us/frame")
+    same = len(set(counts.values())) == 1
+    print("punch counts identical across frame rates" if same else "punch counts DIFFER across frame rates")
+    if not same:
+        raise SystemExit(1)
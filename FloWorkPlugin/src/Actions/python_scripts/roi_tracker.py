@@ -0,0 +1,203 @@
+# roi_tracker.py — run hand inference on a small crop around last frame's hand
+#
+# After the first detection the hand only covers a small part of the 1280x720
+# frame. RoiHandTracker crops a padded square around the previous landmarks,
+# resizes it to a fixed small input, runs the model on that and maps the
+# landmarks back to full-frame coordinates. When a hand is lost (or the
+# handedness score drops) it goes back to full-frame detection on the same frame.
+# A hand that enters outside the crop can't be found there, so the full frame
+# is searched again periodically: every `redetect_every` frames, or every
+# `search_every` frames while fewer than `max_hands` hands are tracked.
+import cv2
+import numpy as np
+
+from hand_features import landmarks_to_array
+
+
+class RoiHandTracker:
+    def __init__(self, hands, roi_hands=None, input_size=256, pad=0.5, min_score=0.6, min_side=0.15,
+                 max_hands=1, redetect_every=30, search_every=5):
+        """
+        hands:      mp.solutions.hands.Hands used for full-frame detection
+        roi_hands:  instance used on the crops (its own tracking state); defaults to `hands`
+        input_size: side of the square crop fed to the model, in pixels
+        pad:        extra margin around the landmark box, as a fraction of its size
+        min_score:  handedness score below which the ROI result is not trusted
+        min_side:   smallest crop, as a fraction of the frame height
+        max_hands:  max_num_hands of the models
+        redetect_every: frames between full-frame searches while max_hands hands are tracked
+        search_every:   ... while fewer are, so a new hand is picked up quickly
+        """
+        self.hands = hands
+        self.roi_hands = roi_hands or hands
+        self.input_size = input_size
+        self.pad = pad
+        self.min_score = min_score
+        self.min_side = min_side
+        self._buf = np.empty((input_size, input_size, 3), dtype=np.uint8)
+        self.max_hands = max_hands
+        self.redetect_every = redetect_every
+        self.search_every = search_every
+        self.box = None  # (x0, y0, side) in pixels, or None = search the full frame
+        self._hands = 0  # hands in the last result
+        self._since_full = 0  # ROI frames since the last full-frame detection
+
+        # counters
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.fallbacks = 0  # ROI inference lost a hand and full frame was re-run
+        self.redetects = 0  # scheduled full-frame searches for hands outside the crop
+
+    def reset(self):
+        self.box = None
+
+    def process(self, rgb):
+        """Same contract as Hands.process(rgb); landmarks are always full-frame."""
+        h, w = rgb.shape[:2]
+        if self.box is not None:
+            every = self.redetect_every if self._hands >= self.max_hands else self.search_every
+            if self._since_full >= every:
+                self.redetects += 1
+            else:
+                result = self._process_roi(rgb, w, h)
+                n = len(result.multi_hand_landmarks) if result is not None else 0
+                if n and n >= self._hands:
+                    self.roi_frames += 1
+                    self._since_full += 1
+                    self._hands = n
+                    self.box = self._next_box(result, w, h)
+                    return result
+                self.fallbacks += 1
+            self.box = None
+
+        self.full_frames += 1
+        self._since_full = 0
+        result = self.hands.process(rgb)
+        self._hands = len(result.multi_hand_landmarks or ())
+        if self._hands:
+            self.box = self._next_box(result, w, h)
+        return result
+
+    def _process_roi(self, rgb, w, h):
+        x0, y0, side = self.box
+        crop = rgb[y0 : y0 + side, x0 : x0 + side]
+        interp = cv2.INTER_AREA if side > self.input_size else cv2.INTER_LINEAR
+        cv2.resize(crop, (self.input_size, self.input_size), dst=self._buf, interpolation=interp)
+        result = self.roi_hands.process(self._buf)
+        if not result.multi_hand_landmarks:
+            return None
+        scores = [hd.classification[0].score for hd in result.multi_handedness]
+        if max(scores) < self.min_score:
+            return None
+        # crop-normalized -> full-frame-normalized (z is scaled like x)
+        sx, sy = side / w, side / h
+        ox, oy = x0 / w, y0 / h
+        for hand in result.multi_hand_landmarks:
+            for lm in hand.landmark:
+                lm.x = ox + lm.x * sx
+                lm.y = oy + lm.y * sy
+                lm.z = lm.z * sx
+        return result
+
+    def _next_box(self, result, w, h):
+        """Padded square (x0, y0, side) around all hands, kept inside the frame."""
+        pts = np.concatenate([landmarks_to_array(hl.landmark)[:, :2] for hl in result.multi_hand_landmarks])
+        px = pts[:, 0] * w
+        py = pts[:, 1] * h
+        cx, cy = (px.min() + px.max()) / 2, (py.min() + py.max()) / 2
+        side = max(px.max() - px.min(), py.max() - py.min()) * (1 + 2 * self.pad)
+        side = int(max(side, self.min_side * h))
+        if side >= min(w, h):
+            return None  # hand fills the frame, a crop would not help
+        x0 = int(min(max(cx - side / 2, 0), w - side))
+        y0 = int(min(max(cy - side / 2, 0), h - side))
+        return x0, y0, side
+
+    def close(self):
+        self.hands.close()
+        if self.roi_hands is not self.hands:
+            self.roi_hands.close()
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            "roi_frames": self.roi_frames,
+            "full_frames": self.full_frames,
+            "fallbacks": self.fallbacks,
+            "redetects": self.redetects,
+            "roi_ratio": self.roi_frames / total if total else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: fps and landmark error of the ROI path vs. full-frame inference.
+#   python roi_tracker.py <video file> [--input-size 256] [--max-hands 2]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+    import time
+    import mediapipe as mp
+
+    ap = argparse.ArgumentParser("ROI tracker benchmark")
+    ap.add_argument("clip")
+    ap.add_argument("--input-size", type=int, default=256)
+    ap.add_argument("--max-hands", type=int, default=2)
+    args = ap.parse_args()
+
+    def make_hands():
+        return mp.solutions.hands.Hands(
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.7,
+            max_num_hands=args.max_hands,
+            static_image_mode=False,
+        )
+
+    cap = cv2.VideoCapture(args.clip)
+    frames = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB))
+    cap.release()
+    if not frames:
+        raise SystemExit("no frames in clip")
+    h, w = frames[0].shape[:2]
+
+    def run(process):
+        out = []
+        t0 = time.perf_counter()
+        for rgb in frames:
+            res = process(rgb)
+            if res.multi_hand_landmarks:
+                out.append(np.stack([landmarks_to_array(hl.landmark) for hl in res.multi_hand_landmarks]))
+            else:
+                out.append(None)
+        return out, len(frames) / (time.perf_counter() - t0)
+
+    full_hands = make_hands()
+    ref, fps_full = run(full_hands.process)
+    full_hands.close()
+
+    tracker = RoiHandTracker(make_hands(), make_hands(), input_size=args.input_size, max_hands=args.max_hands)
+    roi, fps_roi = run(tracker.process)
+
+    errors = []
+    for a, b in zip(ref, roi):
+        if a is None or b is None or len(a) != len(b):
+            continue
+        # match hands by wrist position
+        for hand in a:
+            j = np.argmin(np.abs(b[:, 0, :2] - hand[0, :2]).sum(axis=1))
+            d = (b[j, :, :2] - hand[:, :2]) * (w, h)
+            errors.append(np.sqrt((d ** 2).sum(axis=1)).mean())
+    both = sum(a is not None and b is not None for a, b in zip(ref, roi))
+    only_ref = sum(a is not None and b is None for a, b in zip(ref, roi))
+    only_roi = sum(a is None and b is not None for a, b in zip(ref, roi))
+
+    print(f"frames: {len(frames)} ({w}x{h}), ROI input {args.input_size}px")
+    print(f"full frame : {fps_full:6.1f} fps")
+    print(f"ROI        : {fps_roi:6.1f} fps  {tracker.stats()}")
+    print(f"detections : both {both}, full only {only_ref}, ROI only {only_roi}")
+    if errors:
+        print(f"landmark error vs full frame: mean {np.mean(errors):.2f} px, p95 {np.percentile(errors, 95):.2f} px")
@@ -0,0 +1,252 @@
+# sound_bank.py — hit sounds decoded once, played from a pool of mixer channels
+#
+# boxing.py loaded one punch.wav from a hard-coded path with pygame's default
+# mixer settings and called .play() on that single Sound, so a fast combo
+# either queued behind the previous hit or cut it off. SoundBank decodes every
+# effect file once at startup (wave + NumPy, resampled to the mixer's format),
+# opens the mixer with a small buffer, and plays each hit on its own channel
+# from a fixed pool: a free one if there is one, otherwise the channel that
+# started longest ago. Each punch type has its own variants, files named
+# <kind>*.wav next to this script or, failing that, pitch-shifted copies of
+# punch.wav, and the same variant is not picked twice in a row.
+#
+# Without pygame or an audio device the bank falls back to SilentBackend, which
+# keeps the same channel bookkeeping with a clock, so the game loop runs (and
+# can be benchmarked) headless on Linux.
+import glob
+import os
+import random
+import time
+import wave
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_RATE = 44100
+MIXER_BUFFER = 256  # samples per mixer callback, ~6 ms at 44.1 kHz (pygame default: 512)
+NUM_CHANNELS = 8  # simultaneous hit sounds
+
+# kind -> pitch factors of the punch.wav variants used when no <kind>*.wav exists
+PITCH_VARIANTS = {
+    "straight": (1.0, 1.06, 0.95),
+    "left_hook": (0.85, 0.9),
+    "right_hook": (0.88, 0.93),
+}
+FALLBACK_FILE = "punch.wav"
+
+
+def read_wav(path):
+    """(frames, channels) int16 samples and the sample rate of a PCM .wav file."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        data = np.frombuffer(w.readframes(w.getnframes()), np.int16)
+        return data.reshape(-1, w.getnchannels()), w.getframerate()
+
+
+def convert(samples, rate, target_rate, channels, pitch=1.0):
+    """
+    Resamples (linear) to target_rate, raising the pitch by `pitch` (shorter
+    sound), and up/down-mixes to `channels`. Returns C-contiguous int16.
+    """
+    step = rate / target_rate * pitch
+    n = max(1, int(len(samples) / step))
+    if n != len(samples):
+        pos = np.arange(n) * step
+        src = np.arange(len(samples))
+        samples = np.stack([np.interp(pos, src, samples[:, c]) for c in range(samples.shape[1])], axis=1)
+    if samples.shape[1] != channels:
+        mono = samples.mean(axis=1, keepdims=True)
+        samples = np.repeat(mono, channels, axis=1)
+    return np.ascontiguousarray(np.clip(np.rint(samples), -32768, 32767).astype(np.int16))
+
+
+# ---------------- Backends ----------------
+class SilentBackend:
+    """No audio device: channels are 'busy' for the length of the sound, nothing is heard."""
+
+    def __init__(self, frequency=SAMPLE_RATE, channels=2, num_channels=NUM_CHANNELS):
+        self.frequency, self.channels = frequency, channels
+        self._busy_until = [0.0] * num_channels
+
+    def num_channels(self):
+        return len(self._busy_until)
+
+    def load(self, samples):
+        return len(samples) / self.frequency  # the handle is just the duration
+
+    def busy(self, channel):
+        return time.monotonic() < self._busy_until[channel]
+
+    def play(self, handle, channel):
+        self._busy_until[channel] = time.monotonic() + handle
+
+    def close(self):
+        pass
+
+
+class PygameBackend:
+    """pygame.mixer opened with a small buffer and a fixed number of channels."""
+
+    def __init__(self, frequency=SAMPLE_RATE, buffer=MIXER_BUFFER, num_channels=NUM_CHANNELS):
+        import pygame
+
+        pygame.mixer.pre_init(frequency, -16, 2, buffer)
+        pygame.mixer.init()
+        self._pg = pygame
+        # the device may not have granted what was asked for
+        self.frequency, _, self.channels = pygame.mixer.get_init()
+        pygame.mixer.set_num_channels(num_channels)
+        pygame.mixer.set_reserved(num_channels)  # only this bank's pool plays on them
+        self._channels = [pygame.mixer.Channel(i) for i in range(num_channels)]
+
+    def num_channels(self):
+        return len(self._channels)
+
+    def load(self, samples):
+        return self._pg.mixer.Sound(buffer=samples.tobytes())
+
+    def busy(self, channel):
+        return self._channels[channel].get_busy()
+
+    def play(self, handle, channel):
+        self._channels[channel].play(handle)
+
+    def close(self):
+        self._pg.mixer.quit()
+
+
+def default_backend(buffer=MIXER_BUFFER, num_channels=NUM_CHANNELS):
+    try:
+        return PygameBackend(buffer=buffer, num_channels=num_channels)
+    except Exception as e:  # no pygame, no audio device (pygame.error), ...
+        print(f"[SOUND] no audio ({e}), playing silently")
+        return SilentBackend(num_channels=num_channels)
+
+
+# ---------------- Bank ----------------
+class SoundBank:
+    def __init__(self, backend=None, sound_dir=SCRIPT_DIR, variants=PITCH_VARIANTS):
+        """
+        backend:   PygameBackend / SilentBackend (default: pygame if it opens)
+        sound_dir: where <kind>*.wav and punch.wav are looked up
+        variants:  kind -> pitch factors of punch.wav for kinds without files
+        """
+        self.backend = backend if backend is not None else default_backend()
+        self._variants = {}  # kind -> [handle]
+        self._last = {}  # kind -> index of the variant played last
+        self._started = [0.0] * self.backend.num_channels()  # when each channel last started
+        self.decode_ms = 0.0
+
+        t0 = time.perf_counter()
+        fallback = None
+        for kind, pitches in variants.items():
+            files = sorted(glob.glob(os.path.join(sound_dir, f"{kind}*.wav")))
+            if files:
+                sounds = [self._load(*read_wav(f)) for f in files]
+            else:
+                if fallback is None:
+                    fallback = read_wav(os.path.join(sound_dir, FALLBACK_FILE))
+                sounds = [self._load(*fallback, pitch=p) for p in pitches]
+            self._variants[kind] = sounds
+        self.decode_ms = (time.perf_counter() - t0) * 1000
+
+        # counters
+        self.played = 0
+        self.stolen = 0  # hits that had to cut off an older sound
+        self.unknown = 0  # play() with a kind that has no sounds
+
+    def _load(self, samples, rate, pitch=1.0):
+        b = self.backend
+        return b.load(convert(samples, rate, b.frequency, b.channels, pitch))
+
+    def kinds(self):
+        return list(self._variants)
+
+    def _channel(self):
+        """A free channel, else the one whose sound started longest ago."""
+        for ch in range(len(self._started)):
+            if not self.backend.busy(ch):
+                return ch
+        self.stolen += 1
+        return min(range(len(self._started)), key=self._started.__getitem__)
+
+    def play(self, kind):
+        sounds = self._variants.get(kind)
+        if not sounds:
+            self.unknown += 1
+            return
+        i = random.randrange(len(sounds))
+        if len(sounds) > 1 and i == self._last.get(kind):
+            i = (i + 1) % len(sounds)
+        self._last[kind] = i
+        ch = self._channel()
+        self.backend.play(sounds[i], ch)
+        self._started[ch] = time.monotonic()
+        self.played += 1
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self):
+        return {
+            "backend": type(self.backend).__name__,
+            "variants": {k: len(v) for k, v in self._variants.items()},
+            "decode_ms": self.decode_ms,
+            "played": self.played,
+            "stolen": self.stolen,
+            "unknown": self.unknown,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: a scripted round of combos played into the bank (silent backend by
+# default, --audio for the real mixer) vs. the old single-Sound behaviour,
+# counting hits that cut off or waited behind the previous one, plus the cost
+# of a play() call on the game loop.
+#   python sound_bank.py [--hits-per-sec 6] [--seconds 5] [--audio]
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser("sound bank benchmark")
+    ap.add_argument("--hits-per-sec", type=float, default=6.0, help="combo speed")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--audio", action="store_true", help="play through pygame (needs a device)")
+    args = ap.parse_args()
+
+    bank = SoundBank(default_backend() if args.audio else SilentBackend())
+    samples, rate = read_wav(os.path.join(SCRIPT_DIR, FALLBACK_FILE))
+    length = len(samples) / rate
+    kinds = bank.kinds()
+
+    # one Sound object: a new hit while it still plays restarts or overlaps it
+    # depending on the pygame version; either way the previous hit is not heard
+    # out. Measured on one silent channel playing punch.wav on the same schedule.
+    old = SilentBackend(num_channels=1)
+    old_sound = old.load(samples)
+    old_cut = 0
+    rng = random.Random(0)
+    interval = 1.0 / args.hits_per_sec
+    hits = int(args.seconds * args.hits_per_sec)
+
+    play_us = []
+    t_end = time.monotonic()
+    for _ in range(hits):
+        t0 = time.perf_counter()
+        bank.play(rng.choice(kinds))
+        play_us.append((time.perf_counter() - t0) * 1e6)
+        old_cut += old.busy(0)
+        old.play(old_sound, 0)
+        t_end += interval
+        time.sleep(max(0.0, t_end - time.monotonic()))
+    bank.close()
+
+    st = bank.stats()
+    print(f"{hits} hits at {args.hits_per_sec:g}/s, punch.wav is {length * 1000:.0f} ms long, "
+          f"decoded {sum(st['variants'].values())} variants in {st['decode_ms']:.1f} ms")
+    print(f"mixer buffer {MIXER_BUFFER} samples = {MIXER_BUFFER / SAMPLE_RATE * 1000:.1f} ms "
+          f"(pygame default 512 = {512 / SAMPLE_RATE * 1000:.1f} ms)")
+    print(f"old single Sound: {old_cut} of {hits} hits cut the previous one short")
+    print(f"SoundBank ({NUM_CHANNELS} channels): {st['stolen']} of {hits} hits had to steal a channel, "
+          f"play() {np.median(play_us):.1f} us median, {max(play_us):.1f} us max  {st}")
@@ -0,0 +1,57 @@
+# test_gesture_classifier.py — learned models on synthetic hands, either hand
+#   python -m pytest test_gesture_classifier.py
+import numpy as np
+import pytest
+
+from gesture_classifier import (
+    GestureClassifier, KnnClassifier, MlpClassifier, RuleClassifier, landmark_features, load_classifier, synthetic_hands,
+)
+from hand_features import compute_features_one
+
+
+def mirrored(pts):
+    """The same poses made with the other hand (image mirrored left to right)."""
+    out = np.array(pts, dtype=np.float64)
+    out[..., 0] = 1.0 - out[..., 0]
+    return out
+
+
+@pytest.fixture(scope="module")
+def data():
+    train = synthetic_hands(2000, noise=1.0, seed=1)
+    test_pts, _ = synthetic_hands(300, noise=1.0, seed=2)
+    return train, test_pts
+
+
+def test_mirrored_left_hand_has_the_right_hands_features():
+    pts, _ = synthetic_hands(20, seed=3)
+    right = landmark_features(pts, handedness=["Right"] * len(pts))
+    left = landmark_features(mirrored(pts), handedness=["Left"] * len(pts))
+    np.testing.assert_allclose(left, right, atol=1e-5)
+    # one hand at a time, as touchpad_logic calls it
+    np.testing.assert_allclose(landmark_features(mirrored(pts[0]), handedness="Left"), right[0], atol=1e-5)
+
+
+@pytest.mark.parametrize("cls", [KnnClassifier, MlpClassifier, RuleClassifier])
+def test_mirrored_pose_gets_the_same_class(cls, data):
+    (train_pts, train_y), test_pts = data
+    model = cls() if cls is RuleClassifier else cls().fit(train_pts, train_y, ["Right"] * len(train_y))
+    right, _ = model.predict(test_pts, handedness=["Right"] * len(test_pts))
+    left, _ = model.predict(mirrored(test_pts), handedness=["Left"] * len(test_pts))
+    assert list(left) == list(right)
+    # the per-frame call with the hand's scalar features
+    for pts in test_pts[:20]:
+        assert model(mirrored(pts), compute_features_one(mirrored(pts)), "Left")[0] == \
+            model(pts, compute_features_one(pts), "Right")[0]
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        GestureClassifier()
+
+
+def test_rules_round_trip_through_save(tmp_path):
+    path = str(tmp_path / "rules.npz")
+    RuleClassifier().save(path)
+    loaded = load_classifier(path)
+    assert isinstance(loaded, RuleClassifier) and loaded.classes == RuleClassifier().classes
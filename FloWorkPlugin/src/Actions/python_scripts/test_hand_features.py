@@ -0,0 +1,112 @@
+# test_hand_features.py — the batched kernel against the old per-landmark predicates
+#   python -m pytest test_hand_features.py
+import numpy as np
+
+from hand_features import classify, classify_landmarks, compute_features, compute_features_one
+
+
+class Landmark:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x, self.y = float(x), float(y)
+
+
+def as_landmarks(pts):
+    """(21, 3) array -> landmark objects like hand.landmark, for the reference code."""
+    return [Landmark(x, y) for x, y, _ in pts]
+
+
+def reference_decide(lm):
+    """virtual_touchpad.py's gesture predicates before hand_features."""
+
+    def finger_straight(mcp, pip, tip, threshold=0.9):
+        v1 = [pip.x - mcp.x, pip.y - mcp.y]
+        v2 = [tip.x - pip.x, tip.y - pip.y]
+        dot = v1[0] * v2[0] + v1[1] * v2[1]
+        norm1 = (v1[0] ** 2 + v1[1] ** 2) ** 0.5
+        norm2 = (v2[0] ** 2 + v2[1] ** 2) ** 0.5
+        if norm1 == 0 or norm2 == 0:
+            return False
+        return dot / (norm1 * norm2) >= threshold
+
+    def normalize(v):
+        norm = (v[0] ** 2 + v[1] ** 2) ** 0.5
+        if norm == 0:
+            return [0, 0]
+        return [v[0] / norm, v[1] / norm]
+
+    index_s = finger_straight(lm[5], lm[6], lm[8])
+    middle_s = finger_straight(lm[9], lm[10], lm[12])
+    ring_s = finger_straight(lm[13], lm[14], lm[16])
+    thumb_s = finger_straight(lm[1], lm[2], lm[4])
+    pinky_s = finger_straight(lm[17], lm[18], lm[20])
+
+    v_index = normalize([lm[8].x - lm[6].x, lm[8].y - lm[6].y])
+    v_middle = normalize([lm[12].x - lm[10].x, lm[12].y - lm[10].y])
+    v_pinky = normalize([lm[20].x - lm[18].x, lm[20].y - lm[18].y])
+    im_dot = v_index[0] * v_middle[0] + v_index[1] * v_middle[1]
+    mp_dot = v_middle[0] * v_pinky[0] + v_middle[1] * v_pinky[1]
+
+    if im_dot > 0.5 and mp_dot < -0.6:
+        return "two"
+    if im_dot < 0.6 and mp_dot > 0.5 and thumb_s and index_s:
+        return "seven"
+    dist = ((lm[8].x - lm[4].x) ** 2 + (lm[8].y - lm[4].y) ** 2) ** 0.5
+    if dist <= 0.1 and not index_s and middle_s and ring_s and pinky_s:
+        return "ok"
+    if (not thumb_s) and index_s and middle_s and ring_s and pinky_s:
+        return "four"
+    return None
+
+
+def random_hands(n, seed=0):
+    """Plausible-ish hands: a wrist plus five chains of joints with random bends."""
+    rng = np.random.default_rng(seed)
+    pts = np.zeros((n, 21, 3))
+    pts[:, 0, :2] = rng.uniform(0.3, 0.7, size=(n, 2))
+    for f in range(5):
+        base_angle = -np.pi / 2 + (f - 2) * 0.35 + rng.normal(0, 0.2, n)
+        prev = pts[:, 0, :2]
+        angle = base_angle
+        for j in range(4):
+            angle = angle + rng.choice([0.0, 0.1, 1.5, 3.0], size=n) * rng.uniform(0, 1, n)
+            seg = rng.uniform(0.02, 0.05, n)
+            cur = prev + np.stack([np.cos(angle), np.sin(angle)], axis=1) * seg[:, None]
+            pts[:, 1 + f * 4 + j, :2] = cur
+            prev = cur
+    # snap some thumb tips onto index tips so "ok" is exercised
+    snap = rng.random(n) < 0.2
+    pts[snap, 4, :2] = pts[snap, 8, :2] + rng.normal(0, 0.02, (snap.sum(), 2))
+    pts[:, :, 2] = rng.normal(0, 0.05, (n, 21))
+    return pts
+
+
+def test_single_hand_matches_reference():
+    for pts in random_hands(3000, seed=1):
+        expected = reference_decide(as_landmarks(pts))
+        assert classify_landmarks(pts) == expected
+        assert classify(compute_features_one(pts)) == expected
+
+
+def test_batch_matches_single_hand():
+    stack = random_hands(3000, seed=2)
+    assert list(classify_landmarks(stack)) == [classify_landmarks(p) for p in stack]
+
+
+def test_features_same_for_single_and_batch():
+    stack = random_hands(50, seed=3)
+    batch = compute_features(stack)
+    for i, pts in enumerate(stack):
+        for key, value in compute_features(pts).items():
+            np.testing.assert_array_equal(value, batch[key][i], err_msg=key)
+
+
+def test_scalar_features_same_as_kernel():
+    stack = random_hands(200, seed=4)
+    # a degenerate finger (zero-length bone) takes the divide-by-1 branch
+    stack[0, 8] = stack[0, 6]
+    for pts in stack:
+        kernel = compute_features(pts)
+        for key, value in compute_features_one(pts).items():
+            np.testing.assert_array_equal(np.asarray(value), kernel[key], err_msg=key)
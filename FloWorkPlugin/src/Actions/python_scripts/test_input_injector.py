@@ -0,0 +1,104 @@
+# test_input_injector.py — batching, merging and ordering on the recording backend
+#   python -m pytest test_input_injector.py
+import threading
+
+from input_injector import Action, InputInjector, RecordingBackend, merge_actions
+
+
+class GatedBackend(RecordingBackend):
+    """RecordingBackend whose sends wait for `gate`, so posts pile up behind the first one."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()  # the worker is inside send()
+        self.gate = threading.Event()
+
+    def send(self, events):
+        self.entered.set()
+        self.gate.wait(2.0)
+        super().send(events)
+
+
+def test_merge_folds_presses_and_zoom():
+    acts = [Action("press", ("right", 1)), Action("press", ("right", 2)), Action("press", ("left", 1)),
+            Action("zoom", (1,)), Action("zoom", (-1,)), Action("zoom", (2,)), Action("zoom", (1,))]
+    merged, folded = merge_actions(acts)
+    assert [(a.kind, a.args) for a in merged] == [("press", ("right", 3)), ("press", ("left", 1)), ("zoom", (3,))]
+    assert folded == 4
+
+
+def test_zoom_netting_to_zero_is_dropped():
+    merged, folded = merge_actions([Action("zoom", (1,)), Action("zoom", (-1,))])
+    assert merged == [] and folded == 2
+
+
+def test_merge_does_not_fold_across_other_actions():
+    acts = [Action("press", ("tab", 1)), Action("down", ("alt",)), Action("press", ("tab", 1))]
+    merged, _ = merge_actions(acts)
+    assert [a.kind for a in merged] == ["press", "down", "press"]
+
+
+def test_piled_up_actions_go_out_in_one_send():
+    rec = GatedBackend()
+    inj = InputInjector(rec).start()
+    inj.key_down("ctrl")  # the worker takes this one and blocks on the gate
+    assert rec.entered.wait(2.0)
+    for _ in range(3):
+        inj.press("right")
+    inj.zoom(1)
+    inj.zoom(-1)
+    rec.gate.set()
+    inj.stop()
+    assert rec.keys() == ["+ctrl"] + ["+right", "-right"] * 3
+    assert rec.calls == 2
+    assert inj.stats()["merged"] == 4
+
+
+def test_call_runs_after_everything_posted_before_it():
+    rec = GatedBackend()
+    inj = InputInjector(rec).start()
+    seen = []
+    inj.key_down("alt")
+    assert rec.entered.wait(2.0)
+    inj.press("tab")
+    inj.call(lambda: seen.append(rec.keys()))
+    inj.key_up("alt")
+    rec.gate.set()
+    inj.stop()
+    assert seen == [["+alt", "+tab", "-tab"]]
+    assert rec.keys() == ["+alt", "+tab", "-tab", "-alt"]
+    # the call split the batch: one send before it, one after
+    assert rec.calls == 3
+    assert [a.kind for a in inj.history] == ["down", "press", "call", "up"]
+
+
+def test_timestamps_follow_posting_and_sending():
+    rec = RecordingBackend()
+    inj = InputInjector(rec).start()
+    acts = [inj.hotkey("ctrl", "win", "left"), inj.press("tab", 2)]
+    inj.stop()
+    for act in acts:
+        assert act.t_sent is not None and act.t_sent >= act.t_posted
+    assert [t for t, _, _ in rec.events] == sorted(t for t, _, _ in rec.events)
+    assert acts[0].t_sent <= acts[1].t_sent
+    assert inj.stats()["max_delay_ms"] >= 0.0
+
+
+def test_failing_call_and_send_keep_the_worker_running():
+    class Picky(RecordingBackend):
+        def send(self, events):
+            if any(key == "f13" for key, _ in events):
+                raise KeyError("f13")
+            super().send(events)
+
+    rec = Picky()
+    inj = InputInjector(rec).start()
+    inj.call(lambda: 1 / 0)
+    inj.flush()
+    inj.press("f13")
+    inj.flush()
+    inj.press("tab")
+    inj.stop()
+    assert rec.keys() == ["+tab", "-tab"]
+    assert inj.stats()["failed"] == 2
+    assert [a.kind for a in inj.history] == ["press"]
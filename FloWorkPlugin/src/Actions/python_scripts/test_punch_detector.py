@@ -0,0 +1,36 @@
+# test_punch_detector.py — the scripted round at several frame rates, one hand or two
+#   python -m pytest test_punch_detector.py
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from gesture_classifier import synthetic_hands
+from landmark_recorder import ReplayResult
+from punch_detector import (
+    COMPACTNESS, PunchDetector, _compactness_reference, _is_fist_reference, hand_row, punch_features, scripted_round,
+)
+
+W, H = 1280, 720
+
+
+@pytest.mark.parametrize("two_hands", [False, True])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("fps", [15, 20, 30, 60])
+def test_every_scripted_punch_is_found_once(fps, seed, two_hands):
+    kinds, frames = scripted_round(fps, two_hands=two_hands, seed=seed)
+    detector = PunchDetector()
+    found = Counter(punch.kind for t, result in frames for punch in detector.update(t, result, W, H))
+    assert found == Counter(kinds)
+    assert detector.punches == len(kinds)
+
+
+def test_features_match_the_per_landmark_functions():
+    pts, _ = synthetic_hands(500, noise=1.0, seed=0)
+    hands = ReplayResult(pts, ["Right"] * len(pts), [1.0] * len(pts)).multi_hand_landmarks
+    rows, fist = punch_features(pts)
+    assert fist.tolist() == [_is_fist_reference(h) for h in hands]
+    np.testing.assert_allclose(rows[:, COMPACTNESS], [_compactness_reference(h) for h in hands])
+    one = [hand_row(h.landmark) for h in hands]
+    assert [f for _, f in one] == fist.tolist()
+    np.testing.assert_allclose([r for r, _ in one], rows)
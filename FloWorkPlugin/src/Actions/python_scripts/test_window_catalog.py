@@ -0,0 +1,88 @@
+# test_window_catalog.py — caching, invalidation and z-order on the fake backend
+#   python -m pytest test_window_catalog.py
+import time
+
+from window_catalog import FakeWindowBackend, WindowCatalog
+
+
+def make_backend(n=12, **kwargs):
+    wins = [
+        {"hwnd": 1000 + i, "title": f"window {i}" if i % 3 else "", "tool": i % 7 == 0, "desktop": i % 2}
+        for i in range(n)
+    ]
+    return FakeWindowBackend(wins, **kwargs)
+
+
+def eligible(backend):
+    return [h for h in backend.enum_windows() if backend.is_eligible(h)]
+
+
+def test_windows_are_the_eligible_ones_in_z_order():
+    backend = make_backend()
+    catalog = WindowCatalog(backend)
+    assert catalog.windows() == eligible(backend) == [1002, 1004, 1008, 1010]
+    assert catalog.title(1004) == "window 4"
+    assert len(catalog) == 4
+
+
+def test_cache_is_reused_until_ttl():
+    backend = make_backend()
+    catalog = WindowCatalog(backend, ttl=0.05)
+    catalog.windows()
+    for _ in range(10):
+        catalog.windows()
+    assert backend.enum_calls == 1
+    assert catalog.stats()["refreshes"] == 1 and catalog.stats()["hits"] == 10
+    time.sleep(0.06)
+    catalog.windows()
+    assert backend.enum_calls == 2
+
+
+def test_notifications_mark_the_cache_dirty():
+    backend = make_backend()
+    catalog = WindowCatalog(backend, ttl=float("inf")).watch()
+    catalog.windows()
+    backend.add({"hwnd": 1, "title": "new window"})
+    assert catalog.at(0) == 1
+    backend.remove(1)
+    assert 1 not in catalog.windows()
+    backend.switch_desktop(1)
+    assert catalog.windows() == eligible(backend)
+    assert all(backend.is_eligible(h) for h in catalog.windows())
+    assert catalog.stats()["refreshes"] == 4
+
+
+def test_without_watch_changes_wait_for_invalidate():
+    backend = make_backend()
+    catalog = WindowCatalog(backend, ttl=float("inf"))
+    before = catalog.windows()
+    backend.add({"hwnd": 1, "title": "new window"})
+    assert catalog.windows() == before  # stale: nobody told the catalog
+    catalog.invalidate()
+    assert catalog.at(0) == 1
+
+
+def test_focus_moves_the_window_to_the_front():
+    backend = make_backend()
+    catalog = WindowCatalog(backend, ttl=float("inf"))
+    target = catalog.at(3)
+    assert catalog.focus(target)
+    assert backend.focused == [target]
+    # focus() invalidates by itself, no watch() needed
+    assert catalog.at(0) == target
+    assert not catalog.focus(12345)
+
+
+def test_at_wraps_around_and_handles_no_windows():
+    catalog = WindowCatalog(make_backend())
+    wins = catalog.windows()
+    assert catalog.at(len(wins) + 1) == wins[1]
+    assert catalog.at(-1) == wins[-1]
+    assert WindowCatalog(FakeWindowBackend()).at(1) is None
+
+
+def test_rect_comes_from_the_backend():
+    backend = FakeWindowBackend([{"hwnd": 7, "title": "a", "rect": (1, 2, 3, 4)}])
+    catalog = WindowCatalog(backend)
+    assert catalog.rect(7) == (1, 2, 3, 4)
+    assert catalog.rect(8) == (0, 0, 0, 0)
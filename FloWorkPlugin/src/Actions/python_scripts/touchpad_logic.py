@@ -0,0 +1,496 @@
+# touchpad_logic.py — gesture state machine of the virtual touchpad
+#
+# Everything between "landmarks came in" and "keys went out": gesture start /
+# cancel timing, swipes, the OK Alt-Tab walk, pinch zoom and the idle timer.
+# Nothing in here opens a camera, a window or talks to the OS directly;
+# virtual_touchpad.py plugs the real injector, window list and capture in via
+# configure(), touchpad_replay.py plugs in fakes and a simulated clock.
+import time
+from collections import deque
+import cv2
+import numpy as np
+from hand_features import hands_to_array, compute_features_one, classify
+from velocity_estimator import SlidingVelocity
+from landmark_filter import OneEuroLandmarkFilter
+
+# ---- provided by configure() ----
+SCREEN_W, SCREEN_H = 1920, 1080
+injector = None  # InputInjector-like: hotkey / press / key_down / key_up / zoom / call
+window_catalog = None  # WindowCatalog of the Alt-Tab windows
+on_idle = None  # callable(now, idle) when the idle state flips, e.g. to change resolution
+draw_hand = None  # callable(frame, hand_landmarks) to draw the preview, None = no preview
+# gesture_classifier model (GestureClassifier), None = the hand_features rules
+gesture_model = None
+
+
+def configure(keys, windows, screen_size, idle_hook=None, preview_hook=None, model=None):
+    global injector, window_catalog, SCREEN_W, SCREEN_H, on_idle, draw_hand, gesture_model
+    global gesture_confidence, low_confidence_frames
+    injector = keys
+    window_catalog = windows
+    SCREEN_W, SCREEN_H = screen_size
+    on_idle = idle_hook
+    draw_hand = preview_hook
+    gesture_model = model
+    # counters of the previous run (e.g. an earlier touchpad_replay.replay)
+    gesture_confidence = 1.0
+    low_confidence_frames = 0
+
+
+# variables
+gesture = None
+gesture_start_time = 0
+last_seen_time = None  # capture clock; seeded with the first frame's time
+cancel_cooldown = 0.6  # seconds
+gesture_cancel_time = 0
+detected_gesture = None
+
+# ok variables
+# "direct": highlight the target window on the HUD and focus it on release
+# "keys":   hold Alt and walk the real Alt-Tab switcher with arrow presses
+ALT_TAB_MODE = "direct"
+ok_origin = None
+ok_unitpixels = None
+app_offset = 0
+alt_switch_active = False
+last_target_index = None
+num_apps_cached = 0  # number of Alt-Tab apps on current desktop
+
+# variables for SPEED SWIPE DETECTION
+VX_THRESH = 2.5
+HORIZ_RATIO = 0.7  # How "horizontal" it must be: |vy| <= HORIZ_RATIO * |vx|
+WINDOW_SEC = 0.85  # Time window (seconds) to estimate velocity over recent samples
+TRIGGER_COOLDOWN = 2  # Debounce so one swipe only triggers one hotkey
+SWIPE_MAX_RESIDUAL = 0.3  # max RMS wobble around the fitted line, in palm widths
+
+# Recent (t, x, y, wrist_x) samples with a running least-squares fit over WINDOW_SEC
+track_hist = SlidingVelocity(WINDOW_SEC)
+last_trigger_time = 0.0
+
+# Cursor trail config
+TRAIL_MAX_POINTS = 40  # how many recent points to keep
+TRAIL_FADE_SEC = 0.5  # how long a point stays visible
+trail = deque(maxlen=TRAIL_MAX_POINTS)
+
+# ---- Pinch-to-Zoom (thumb+index) config/state ----
+zoom_origin = None
+zoom_unitpixel = None
+
+# One-Euro smoothing of the tracked hand before the gesture logic
+SMOOTH_LANDMARKS = True
+SMOOTH_MIN_CUTOFF = 0.5  # Hz while still; lower = steadier cursor, more lag
+SMOOTH_BETA = 20.0  # cutoff growth with speed; higher = less lag on fast moves
+
+# ---- Idle: nobody gesturing for a while ----
+IDLE_AFTER_SEC = 10.0  # no hand for this long (last_seen_time: last gesture or hand)
+idle = False
+
+# how long Windows needs to finish a desktop switch before the HUD is recreated
+DESKTOP_SWITCH_SETTLE_SEC = 0.12
+
+# with a gesture_model: frames it is less sure about than this count as no gesture
+GESTURE_MIN_CONFIDENCE = 0.6
+gesture_confidence = 1.0  # of the last decision (always 1.0 for the rules)
+low_confidence_frames = 0
+
+
+# helper functions
+def decide_gesture(features, pts, handedness=None):
+    """
+    features:   hand_features.compute_features_one of the tracked hand
+    pts:        its (21, 3) landmarks
+    handedness: its "Left" / "Right" label; a gesture model mirrors left hands
+    """
+    global gesture_confidence, low_confidence_frames
+    if gesture_model is None:
+        return classify(features)
+    name, gesture_confidence = gesture_model(pts, features, handedness)
+    if gesture_confidence < GESTURE_MIN_CONFIDENCE:
+        low_confidence_frames += 1
+        return None
+    return name
+
+
+def fast_swipe_detector(palm_width, track_hist, w, h, now):
+    global last_trigger_time
+    # Line fit over the whole window, so a single jittery sample can't fake a swipe
+    vx, vy = track_hist.velocity()
+    hand_wide_portion = max(0.1, palm_width)  # avoid div by zero
+    palm_px = hand_wide_portion * SCREEN_W
+
+    # Check horizontal dominance, speed and that the path is roughly a line
+    fast_enough = (
+        abs(vx) / palm_px >= VX_THRESH
+        and track_hist.horizontal_ratio() <= HORIZ_RATIO
+        and track_hist.residual() <= SWIPE_MAX_RESIDUAL * palm_px
+    )
+    diff_side = (track_hist[0][1] - track_hist[0][3]) * (
+        track_hist[-1][1] - track_hist[-1][3]
+    ) < 0
+
+    # print(f"abs vx: {abs(vx):.3f}, hand width: {palm_px:.3f}, horiz: {track_hist.horizontal_ratio():.3f}, residual: {track_hist.residual():.1f}, fast_enough: {fast_enough}, firstdiff: {track_hist[0][1] - track_hist[0][3]:.3f}, lastdiff: {track_hist[-1][1] - track_hist[-1][3]:.3f}, diff_side: {diff_side}")
+
+    if fast_enough and (now - last_trigger_time) >= TRIGGER_COOLDOWN and diff_side:
+        last_trigger_time = now  # reset window so it won't retrigger from same motion
+        if vx > 0:
+            return 1
+        else:
+            return -1
+    return 0
+
+
+# vvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv alt tab section vvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv
+def start_alt_tab_switcher():
+    global alt_switch_active, last_target_index, num_apps_cached
+    if alt_switch_active:
+        return  # already working
+
+    # Count apps on this desktop (cached catalog, no re-enumeration)
+    num_apps_cached = max(1, len(window_catalog))  # avoid 0
+
+    if ALT_TAB_MODE == "keys":
+        # Open the switcher: hold Alt, press Tab once (selection starts at index 1)
+        injector.key_down("alt")
+        injector.press("tab")
+    alt_switch_active = True
+    last_target_index = 1
+    print(f"[OK] Alt-Tab shown (apps={num_apps_cached}, mode={ALT_TAB_MODE})")
+
+
+def update_alt_tab_selection(steps, prefer_dir=None):
+    """
+    Move selection on a circular Alt-Tab ring of size num_apps_cached.
+    1-indexed positions. prefer_dir: 'left' or 'right' to resolve direction.
+    """
+    global last_target_index
+    if not alt_switch_active or num_apps_cached <= 1:
+        return
+
+    N = num_apps_cached
+    # wrap target into 1..N
+    target = ((int(last_target_index + steps) - 1) % N) + 1
+
+    cur = last_target_index or 1  # current selection (1..N)
+
+    # distances on the ring
+    forward = (target - cur) % N  # steps going right
+    backward = (cur - target) % N  # steps going left
+
+    # choose direction
+    if prefer_dir == "left":
+        key = "left"
+        times = backward if backward != 0 else 0
+    elif prefer_dir == "right":
+        key = "right"
+        times = forward if forward != 0 else 0
+    else:
+        # shortest path by default
+        if forward <= backward:
+            key, times = "right", forward
+        else:
+            key, times = "left", backward
+
+    if ALT_TAB_MODE == "keys":
+        injector.press(key, times)
+    # in direct mode the HUD just highlights window_catalog.at(target)
+
+    last_target_index = target
+    ok_origin[0] += steps * ok_unitpixels
+
+
+def end_alt_tab_switcher():
+    global alt_switch_active, last_target_index
+    if not alt_switch_active:
+        return
+    if ALT_TAB_MODE == "keys":
+        injector.key_up("alt")  # confirm selection
+    else:
+        # position N of the Alt-Tab ring is simply the N-th catalog entry
+        target = window_catalog.at(last_target_index)
+        if target is not None:
+            injector.call(lambda: window_catalog.focus(target))
+    alt_switch_active = False
+    print("[OK] Alt-Tab confirmed")
+    last_target_index = None
+
+
+# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^ alt tab section ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
+
+# ---- per-frame state ----
+landmark_filter = OneEuroLandmarkFilter(min_cutoff=SMOOTH_MIN_CUTOFF, beta=SMOOTH_BETA)
+
+x = y = None  # middle tip in screen coords
+features = None  # hand_features of the tracked hand
+hud_needs_recreate = False  # set after a desktop switch, handled on the HUD thread
+
+
+def alt_tab_target():
+    """(rect, title) of the window the OK gesture points at, for the HUD."""
+    if ALT_TAB_MODE != "direct" or not alt_switch_active or last_target_index is None:
+        return None
+    hwnd = window_catalog.at(last_target_index)
+    if hwnd is None:
+        return None
+    return window_catalog.rect(hwnd), window_catalog.title(hwnd)
+
+
+def after_desktop_switch():
+    # runs on the injector thread once Ctrl+Win+arrow has been sent
+    global hud_needs_recreate
+    time.sleep(DESKTOP_SWITCH_SETTLE_SEC)  # let Windows finish switching
+    hud_needs_recreate = True  # HUD has to move to the new desktop
+
+
+def enter_idle(now):
+    global idle
+    idle = True
+    trail.clear()
+    track_hist.clear()
+    print(f"[IDLE] no hand for {now - last_seen_time:.1f}s")
+    if on_idle is not None:
+        on_idle(now, True)
+
+
+def leave_idle(now):
+    global idle
+    idle = False
+    print("[IDLE] hand detected, waking up")
+    if on_idle is not None:
+        on_idle(now, False)
+
+
+def act(inferred):
+    """
+    Gesture state machine + key injection. Returns what the HUD needs to draw,
+    or None when the frame should not be redrawn.
+    inferred: (now, frame, result); frame may be None (replay), result is a
+    MediaPipe Hands result or None for a frame that was not run through the model
+    """
+    global gesture, gesture_start_time, last_seen_time, gesture_cancel_time
+    global detected_gesture, ok_origin, ok_unitpixels, zoom_origin, zoom_unitpixel
+    global x, y, features
+    now, frame, result = inferred
+    if last_seen_time is None:
+        last_seen_time = now  # the idle countdown starts with the first frame
+    if idle and (result is None or not result.multi_hand_landmarks):
+        # idle and still nobody there: nothing to track, nothing to draw
+        return {
+            "now": now,
+            "frame": frame,
+            "x": None,
+            "y": None,
+            "gesture": None,
+            "detected_gesture": None,
+            "ok_active": False,
+            "trail": [],
+        }
+    if idle:
+        leave_idle(now)  # and handle this low resolution frame as usual
+    if result is None:
+        return None  # nothing new to act on
+    h, w = frame.shape[:2] if frame is not None else (SCREEN_H, SCREEN_W)
+
+    if result.multi_hand_landmarks:
+        # Find the biggest hand by bounding box area, on one (N, 21, 3) array
+        all_pts = hands_to_array(result.multi_hand_landmarks)
+        box = all_pts[..., :2].max(axis=1) - all_pts[..., :2].min(axis=1)
+        biggest = int(np.argmax(box[:, 0] * box[:, 1]))
+        hand = result.multi_hand_landmarks[biggest]
+        pts = all_pts[biggest]
+        label = result.multi_handedness[biggest].classification[0].label if result.multi_handedness else None
+        if SMOOTH_LANDMARKS:
+            # handedness label as hand identity: switching hands resets the filter
+            pts = landmark_filter(pts, now, label)
+        # features only for the hand that is actually classified; one hand is
+        # cheaper in plain Python than through the batched kernel
+        features = compute_features_one(pts)
+
+        # Draw landmarks and connections for the biggest hand
+        if draw_hand is not None and frame is not None:
+            draw_hand(frame, hand)
+
+        # Draw landmark indices
+        # for id, lm in enumerate(hand.landmark):
+        # cv2.putText(frame, str(id), (int(lm.x * w), int(lm.y * h)), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+
+        # track middle tip
+        x = int(
+            pts[12, 0] * SCREEN_W
+        )  # we make sure these x and y can DEFINITELY reach all screen
+        y = int(pts[12, 1] * SCREEN_H)
+        # x = int(x * (SCREEN_W / w))
+
+        # Drop points older than TRAIL_FADE_SEC (time-based fade)
+        trail.append((x, y, now))
+        while trail and (now - trail[0][2]) > TRAIL_FADE_SEC:
+            trail.popleft()
+
+        # detect gesture first
+        detected_gesture = decide_gesture(features, pts, label)
+        if detected_gesture:
+            # hand is detected and gesture is posed
+            if (
+                gesture is not None
+                and gesture != detected_gesture
+                and now - last_seen_time > cancel_cooldown
+            ):
+                # gesture has changed from one to another
+                gesture_cancel_time = now
+                ok_origin = None
+                zoom_origin = None
+                if gesture == "ok":
+                    # if previous gesture is OK, we need to end the alt-tab session
+                    end_alt_tab_switcher()
+                print(
+                    f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
+                )
+                print("======================")
+                print()
+                gesture = detected_gesture
+                gesture_start_time = now
+                print(
+                    f"[DETECT] Gesture '{gesture}' detected at {gesture_start_time:.2f}"
+                )
+                track_hist.clear()
+                trail.clear()
+
+            if gesture is None:
+                # no gesture is being recorded currently, so we have the new gesture.
+                gesture = detected_gesture
+                gesture_start_time = now
+                print(
+                    f"[DETECT] Gesture '{gesture}' detected at {gesture_start_time:.2f}"
+                )
+                track_hist.clear()
+                trail.clear()
+
+            # simply update the last seen time for the gesture
+            if gesture is not None and gesture == detected_gesture:
+                last_seen_time = now
+        else:
+            # hand is detected but no known gesture is posed
+            if gesture is not None and now - last_seen_time > cancel_cooldown:
+                # already past the cd time -> this gesture should be killed!
+                print(
+                    f"[cd] Passed the cd time! last gesture was seen {now - last_seen_time} secs ago, killing..."
+                )
+                gesture_cancel_time = now
+                ok_origin = None
+                zoom_origin = None
+                if gesture == "ok":
+                    end_alt_tab_switcher()
+                print(
+                    f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
+                )
+                print("======================")
+                print()
+                gesture = None
+            elif gesture is None:
+                # a hand without a gesture still counts as someone being there
+                last_seen_time = now
+
+        # Sliding window of samples (using middle finger, since it is used in all gestures);
+        # samples older than WINDOW_SEC are dropped inside add()
+        track_hist.add(now, x, y, pts[0, 0] * SCREEN_W)
+    else:
+        # hand is not even detected
+        landmark_filter.reset()
+        if gesture is not None and now - last_seen_time > cancel_cooldown:
+            # already past the cd time -> this gesture should be killed!
+            gesture_cancel_time = now
+            ok_origin = None
+            zoom_origin = None
+            if gesture == "ok":
+                end_alt_tab_switcher()
+            print(
+                f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
+            )
+            print("======================")
+            print()
+            gesture = None
+        elif gesture is None and now - last_seen_time > IDLE_AFTER_SEC:
+            # same clock as the cancel above: nothing posed for a long while
+            enter_idle(now)
+
+    if gesture is not None and len(track_hist) >= 3:
+        # Draw gesture name if active
+        if draw_hand is not None and frame is not None:
+            cv2.putText(
+                frame, gesture, (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4
+            )
+
+        if gesture == "two" or gesture == "four":
+            swipe_direction = fast_swipe_detector(
+                features["palm_box"][0], track_hist, w, h, now
+            )
+            if swipe_direction == 1:
+                if gesture == "two":
+                    # switch to previous page
+                    injector.hotkey("alt", "left")
+                    print("[SWIPE] FAST LEFT → hotkey fired")
+                else:
+                    # switch to previous desktop
+                    injector.hotkey("ctrl", "win", "left")
+                    print("[SWIPE] FAST LEFT → hotkey fired")
+                    injector.call(after_desktop_switch)
+            elif swipe_direction == -1:
+                if gesture == "two":
+                    # switch to next page
+                    injector.hotkey("alt", "right")
+                    print("[SWIPE] FAST RIGHT → hotkey fired")
+                else:
+                    # switch to next desktop
+                    injector.hotkey("ctrl", "win", "right")
+                    print("[SWIPE] FAST RIGHT → hotkey fired")
+                    injector.call(after_desktop_switch)
+
+        elif gesture == "ok":
+            # 1) on first OK frame, set origin and open Alt-Tab
+            if ok_origin is None:
+                ok_origin = [x, y]  # you compute x,y earlier from landmark[12]
+                start_alt_tab_switcher()
+
+            # 2) map finger x to a target index (1..num_apps_cached)
+            #    index 1 is the first app after the currently active one
+            dx = x - ok_origin[0]
+            # positive dx → move right; negative → left
+            ok_unitpixels = SCREEN_W / (num_apps_cached * 1.5)
+            steps = round(dx / ok_unitpixels)
+            if steps != 0:
+                prefer_dir = "left" if steps < 0 else "right"
+                update_alt_tab_selection(steps, prefer_dir)
+            elif ALT_TAB_MODE != "direct":
+                # no movement; the native switcher shows the selection, keep the last HUD frame
+                return None
+            # direct: the HUD is the only place the target shows up, so it is
+            # published from the first OK frame on, moved or not
+
+        elif gesture == "seven":
+            # 1) on first OK frame, set origin
+            if zoom_origin is None:
+                zoom_origin = [x, y]  # you compute x,y earlier from landmark[12]
+
+            # 2) map finger x to a target index (1..num_apps_cached)
+            #    index 1 is the first app after the currently active one
+            dy = y - zoom_origin[1]
+            # positive dx → move right; negative → left
+            zoom_unitpixel = SCREEN_H / 6  # 6 units should be enough
+            steps = round(dy / zoom_unitpixel)
+
+            # finger up (steps < 0) zooms in, down zooms out; the injector
+            # merges steps that pile up before it gets to send them
+            injector.zoom(-steps)
+            zoom_origin[1] += steps * zoom_unitpixel
+
+
+    return {
+        "now": now,
+        "frame": frame,
+        "x": x,
+        "y": y,
+        "gesture": gesture,
+        "detected_gesture": detected_gesture,
+        "ok_active": ok_origin is not None,
+        "trail": list(trail),
+        "alt_tab_target": alt_tab_target(),
+    }
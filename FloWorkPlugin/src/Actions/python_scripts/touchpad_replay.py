@@ -0,0 +1,176 @@
+# touchpad_replay.py — run the touchpad's gesture logic headless on a recording
+#
+#   python touchpad_replay.py session.lmrec [--set VX_THRESH=3.0] [--model gestures.npz] [--verbose]
+#   python touchpad_replay.py clip.mp4 [--fps 30]          (video needs mediapipe)
+#
+# Same decision code as virtual_touchpad.py (touchpad_logic.py), but with an
+# inline recording injector, a fake Alt-Tab window list and no HUD. The clock is
+# the recording's own timestamps, so a run is deterministic and goes as fast as
+# the logic does; no Windows, webcam or display needed. Prints throughput, the
+# gesture timeline and every action that would have been sent.
+import argparse
+import ast
+import contextlib
+import os
+import time
+
+import touchpad_logic as logic
+from input_injector import ImmediateInjector, RecordingBackend
+from window_catalog import WindowCatalog, FakeWindowBackend
+from landmark_filter import OneEuroLandmarkFilter
+from gesture_classifier import load_classifier
+
+
+def recording_source(path):
+    from landmark_recorder import LandmarkRecording
+
+    for t, result in LandmarkRecording(path).results():
+        yield t, None, result
+
+
+def video_source(path, fps=None):
+    """Runs MediaPipe on every frame; the clock is frame index / fps, not wall time."""
+    import cv2
+    import mediapipe as mp
+    from frame_buffers import to_rgb, mirror_result
+
+    cap = cv2.VideoCapture(path)
+    fps = fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    hands = mp.solutions.hands.Hands(
+        min_detection_confidence=0.7,
+        min_tracking_confidence=0.7,
+        max_num_hands=2,
+        static_image_mode=False,
+    )
+    i = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            # same preprocessing as virtual_touchpad.infer
+            yield i / fps, None, mirror_result(hands.process(to_rgb(frame)))
+            i += 1
+    finally:
+        cap.release()
+        hands.close()
+
+
+def fake_windows(n, screen_w, screen_h):
+    """n cascaded windows, topmost first."""
+    return [
+        {
+            "hwnd": 1000 + i,
+            "title": f"Window {i + 1}",
+            "rect": (40 * i, 40 * i, 40 * i + screen_w // 2, 40 * i + screen_h // 2),
+        }
+        for i in range(n)
+    ]
+
+
+def apply_overrides(pairs):
+    """--set NAME=VALUE for touchpad_logic's upper-case settings."""
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if not name.isupper() or not hasattr(logic, name):
+            raise SystemExit(f"unknown touchpad_logic setting: {name}")
+        setattr(logic, name, ast.literal_eval(value))
+    # objects built from settings at import time
+    logic.track_hist.window_sec = logic.WINDOW_SEC
+    logic.landmark_filter = OneEuroLandmarkFilter(
+        min_cutoff=logic.SMOOTH_MIN_CUTOFF, beta=logic.SMOOTH_BETA
+    )
+
+
+def describe(act):
+    if act.kind == "call":
+        return f"call {getattr(act.args[0], '__name__', 'fn')}"
+    return f"{act.kind} {' '.join(str(a) for a in act.args)}"
+
+
+def replay(source, screen, windows=6, verbose=False, model=None):
+    """
+    Feeds every (t, frame, result) through touchpad_logic.act; returns a summary dict.
+    model: gesture_classifier model to decide gestures with, None = the rules
+    """
+    clock = [0.0]
+    backend = RecordingBackend()
+    injector = ImmediateInjector(backend, clock=lambda: clock[0])
+    catalog = WindowCatalog(FakeWindowBackend(fake_windows(windows, *screen)), ttl=float("inf")).watch()
+    logic.configure(injector, catalog, screen, model=model)
+    logic.DESKTOP_SWITCH_SETTLE_SEC = 0.0  # nothing to wait for
+
+    timeline = []  # (t, event)
+    prev_gesture, prev_idle = None, logic.idle
+    frames = 0
+    t_first = t_last = None
+    out = None if verbose else open(os.devnull, "w")
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(out) if out else contextlib.nullcontext():
+        for t, frame, result in source:
+            clock[0] = t
+            if t_first is None:
+                t_first = t
+            t_last = t
+            frames += 1
+            logic.act((t, frame, result))
+            if logic.gesture != prev_gesture:
+                if prev_gesture is not None:
+                    timeline.append((t, f"end   {prev_gesture}"))
+                if logic.gesture is not None:
+                    timeline.append((t, f"start {logic.gesture}"))
+                prev_gesture = logic.gesture
+            if logic.idle != prev_idle:
+                timeline.append((t, "idle" if logic.idle else "wake"))
+                prev_idle = logic.idle
+        logic.end_alt_tab_switcher()
+    elapsed = time.perf_counter() - t0
+    if out:
+        out.close()
+
+    return {
+        "frames": frames,
+        "elapsed": elapsed,
+        "duration": (t_last - t_first) if frames else 0.0,
+        "timeline": timeline,
+        "actions": [(a.t_sent, describe(a)) for a in injector.history],
+        "key_events": len(backend.events),
+        "low_confidence": logic.low_confidence_frames,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser("headless touchpad replay")
+    ap.add_argument("input", help=".lmrec landmark recording or a video file")
+    ap.add_argument("--fps", type=float, default=None, help="video only; default: the file's fps")
+    ap.add_argument("--screen", default="1920x1080")
+    ap.add_argument("--windows", type=int, default=6, help="size of the fake Alt-Tab list")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                    help="override a touchpad_logic setting, e.g. --set VX_THRESH=3.0")
+    ap.add_argument("--model", default=None,
+                    help="gesture model from gesture_classifier.py; default: the built-in rules")
+    ap.add_argument("--verbose", action="store_true", help="keep the logic's own prints")
+    args = ap.parse_args()
+
+    screen = tuple(int(v) for v in args.screen.lower().split("x"))
+    apply_overrides(args.set)
+    if args.input.endswith(".lmrec"):
+        source = recording_source(args.input)
+    else:
+        source = video_source(args.input, args.fps)
+
+    model = load_classifier(args.model) if args.model else None
+    res = replay(source, screen, windows=args.windows, verbose=args.verbose, model=model)
+
+    print(f"[REPLAY] {res['frames']} frames ({res['duration']:.1f} s recorded) in {res['elapsed']:.2f} s: "
+          f"{res['frames'] / max(res['elapsed'], 1e-9):.0f} frames/s, "
+          f"{res['duration'] / max(res['elapsed'], 1e-9):.1f}x real time")
+    if model is not None:
+        print(f"[GESTURE] {args.model}: {res['low_confidence']} frames below "
+              f"{logic.GESTURE_MIN_CONFIDENCE} confidence ignored")
+    print(f"[TIMELINE] {len(res['timeline'])} events")
+    for t, event in res["timeline"]:
+        print(f"  {t:9.3f}s  {event}")
+    print(f"[ACTIONS] {len(res['actions'])} actions, {res['key_events']} key events")
+    for t, what in res["actions"]:
+        print(f"  {t:9.3f}s  {what}")
@@ -0,0 +1,218 @@
+# velocity_estimator.py — streaming least-squares velocity over a sliding time window
+#
+# The swipe detector used to take the first and the last sample of the window
+# and divide; one jittery landmark at either end was enough to fake (or kill) a
+# swipe. SlidingVelocity fits a straight line x(t), y(t) through every sample in
+# the window instead. It keeps running sums, so adding a sample and dropping the
+# expired ones is O(1) per sample and nothing gets copied per frame.
+import math
+from collections import deque
+
+
+class SlidingVelocity:
+    def __init__(self, window_sec, rebase_every=512):
+        """
+        window_sec:   samples older than this (relative to the newest) are dropped
+        rebase_every: recompute the sums from scratch every N samples so float
+                      error from add/remove and a growing time offset can't pile up
+        """
+        self.window_sec = window_sec
+        self.rebase_every = rebase_every
+        self._samples = deque()  # (t, x, y, extra) as passed to add()
+        self._t_ref = 0.0
+        self._since_rebase = 0
+        self._zero()
+
+    def _zero(self):
+        self._n = 0
+        self._st = self._stt = 0.0
+        self._sx = self._sy = 0.0
+        self._stx = self._sty = 0.0
+        self._sxx = self._syy = 0.0
+
+    def _accumulate(self, t, x, y, sign):
+        t -= self._t_ref
+        self._n += sign
+        self._st += sign * t
+        self._stt += sign * t * t
+        self._sx += sign * x
+        self._sy += sign * y
+        self._stx += sign * t * x
+        self._sty += sign * t * y
+        self._sxx += sign * x * x
+        self._syy += sign * y * y
+
+    def _rebase(self):
+        self._zero()
+        self._since_rebase = 0
+        if self._samples:
+            self._t_ref = self._samples[0][0]
+        for t, x, y, _ in self._samples:
+            self._accumulate(t, x, y, 1)
+
+    # ---- deque-like interface (the touchpad loop indexes the oldest / newest sample) ----
+    def __len__(self):
+        return len(self._samples)
+
+    def __getitem__(self, i):
+        return self._samples[i]
+
+    def clear(self):
+        self._samples.clear()
+        self._zero()
+        self._since_rebase = 0
+
+    def add(self, t, x, y, extra=None):
+        """Append a sample and drop the ones that fell out of the window."""
+        if not self._samples:
+            self._t_ref = t
+        self._samples.append((t, x, y, extra))
+        self._accumulate(t, x, y, 1)
+        while self._samples and t - self._samples[0][0] > self.window_sec:
+            t0, x0, y0, _ = self._samples.popleft()
+            self._accumulate(t0, x0, y0, -1)
+        if not self._samples:
+            self._zero()
+        self._since_rebase += 1
+        if self._since_rebase >= self.rebase_every:
+            self._rebase()
+
+    # ---- fit ----
+    def _centered(self):
+        n = self._n
+        ctt = self._stt - self._st * self._st / n
+        ctx = self._stx - self._st * self._sx / n
+        cty = self._sty - self._st * self._sy / n
+        cxx = self._sxx - self._sx * self._sx / n
+        cyy = self._syy - self._sy * self._sy / n
+        return ctt, ctx, cty, cxx, cyy
+
+    def velocity(self):
+        """(vx, vy) slope of the least-squares line, in units per second."""
+        if self._n < 2:
+            return 0.0, 0.0
+        ctt, ctx, cty, _, _ = self._centered()
+        if ctt <= 1e-12:  # all samples at the same time
+            return 0.0, 0.0
+        return ctx / ctt, cty / ctt
+
+    def displacement(self):
+        """(dx, dy) of the fitted line across the window's time span."""
+        vx, vy = self.velocity()
+        span = self._samples[-1][0] - self._samples[0][0] if self._samples else 0.0
+        return vx * span, vy * span
+
+    def residual(self):
+        """RMS distance of the samples from the fitted line (same units as x, y)."""
+        if self._n < 3:
+            return 0.0
+        ctt, ctx, cty, cxx, cyy = self._centered()
+        if ctt <= 1e-12:
+            return 0.0
+        rss = (cxx - ctx * ctx / ctt) + (cyy - cty * cty / ctt)
+        return math.sqrt(max(0.0, rss) / self._n)
+
+    def horizontal_ratio(self):
+        """|vy| / |vx|; 0 is a perfectly horizontal motion, inf a vertical one."""
+        vx, vy = self.velocity()
+        if vx == 0.0:
+            return math.inf if vy else 0.0
+        return abs(vy) / abs(vx)
+
+
+# ---------------------------------------------------------------------------
+# Replay benchmark: false triggers and per-frame cost, two-point vs. fit.
+#   python velocity_estimator.py [--seed 0]
+# Tracks are synthetic 30 fps fingertip paths in screen pixels: real swipes,
+# and "hold" tracks (hand resting / drifting) with occasional one-frame
+# landmark glitches, which is what used to fire swipes by accident.
+# ---------------------------------------------------------------------------
+def _two_point(samples):
+    # what virtual_touchpad.estimate_velocity did
+    t0, x0, y0, _ = samples[0]
+    t1, x1, y1, _ = samples[-1]
+    dt = t1 - t0
+    return (x1 - x0) / dt, (y1 - y0) / dt, x1 - x0, y1 - y0
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import numpy as np
+
+    ap = argparse.ArgumentParser("velocity estimator replay")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tracks", type=int, default=400)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    # same thresholds as the touchpad; palm width fixed at 0.12 of a 1920 screen
+    SCREEN_W, FPS, WINDOW_SEC = 1920, 30.0, 0.85
+    VX_THRESH, HORIZ_RATIO, COOLDOWN = 2.5, 0.7, 2.0
+    MAX_RESIDUAL = 0.3  # in palm widths, as SWIPE_MAX_RESIDUAL
+    PALM_PX = 0.12 * SCREEN_W
+
+    def swipe_track():
+        n = int(FPS * 1.5)
+        t = np.arange(n) / FPS
+        start = int(FPS * 0.5)
+        speed = rng.uniform(1.2, 2.0) * VX_THRESH * PALM_PX * rng.choice([-1, 1])
+        x = np.full(n, 960.0)
+        x[start:] += speed * (t[start:] - t[start])
+        y = 540.0 + 0.1 * speed * np.clip(t - t[start], 0, None) * rng.uniform(-1, 1)
+        return t, x + rng.normal(0, 4, n), y + rng.normal(0, 4, n)
+
+    def hold_track():
+        n = int(FPS * 3)
+        t = np.arange(n) / FPS
+        x = 960 + rng.uniform(-60, 60) * t + rng.normal(0, 6, n)
+        y = 540 + rng.uniform(-30, 30) * t + rng.normal(0, 6, n)
+        for i in rng.choice(n, size=rng.integers(1, 4), replace=False):
+            x[i] += rng.choice([-1, 1]) * rng.uniform(150, 500)  # landmark jumps for one frame
+        return t, x, y
+
+    def replay(tracks, use_fit):
+        fired, cost = 0, 0.0
+        for t, x, y in tracks:
+            est = SlidingVelocity(WINDOW_SEC)
+            hist = deque()
+            last = -1e9
+            for i in range(len(t)):
+                t0 = time.perf_counter()
+                if use_fit:
+                    est.add(t[i], x[i], y[i])
+                    if len(est) >= 3:
+                        vx, _ = est.velocity()
+                        ok = (
+                            abs(vx) / PALM_PX >= VX_THRESH
+                            and est.horizontal_ratio() <= HORIZ_RATIO
+                            and est.residual() <= MAX_RESIDUAL * PALM_PX
+                        )
+                    else:
+                        ok = False
+                else:
+                    hist.append((t[i], x[i], y[i], 0.0))
+                    while hist and t[i] - hist[0][0] > WINDOW_SEC:
+                        hist.popleft()
+                    if len(hist) >= 3:
+                        vx, vy, dx, dy = _two_point(list(hist))
+                        ok = abs(vx) / PALM_PX >= VX_THRESH and abs(dy) <= HORIZ_RATIO * abs(dx)
+                    else:
+                        ok = False
+                cost += time.perf_counter() - t0
+                if ok and t[i] - last >= COOLDOWN:
+                    fired += 1
+                    last = t[i]
+        frames = sum(len(t) for t, _, _ in tracks)
+        return fired, cost / frames * 1e6
+
+    swipes = [swipe_track() for _ in range(args.tracks)]
+    holds = [hold_track() for _ in range(args.tracks)]
+    for name, fit in (("two-point", False), ("least squares", True)):
+        hit, us_a = replay(swipes, fit)
+        false, us_b = replay(holds, fit)
+        print(
+            f"{name:<14}: swipes detected {hit}/{len(swipes)}, "
+            f"false triggers {false}/{len(holds)} hold tracks, "
+            f"{(us_a + us_b) / 2:.2f} us/frame"
+        )
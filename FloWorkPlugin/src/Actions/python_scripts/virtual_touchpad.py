@@ -11,20 +11,31 @@ from absl import logging
 logging.set_verbosity(logging.ERROR)
 
 # import libraries
-from collections import deque
+import argparse
 import cv2
 import mediapipe as mp
-import pyautogui
 import time
 import ctypes
-from ctypes import wintypes
-from comtypes import GUID, IUnknown, COMMETHOD, HRESULT, CoInitialize
-from comtypes.client import CreateObject
 import win32gui
 import numpy as np
 import platform
 import win32con
 import keyboard
+from hud_compositor import HudCompositor, LatestSnapshot, CursorExtrapolator
+import threading
+from collections import namedtuple
+from frame_grabber import LatestFrameGrabber, open_source
+from pipeline import Pipeline
+from roi_tracker import RoiHandTracker
+from flow_tracker import FlowHandTracker
+from inference_backend import make_hand_backend, add_backend_args
+from input_injector import InputInjector
+from window_catalog import WindowCatalog, Win32WindowBackend
+from landmark_recorder import LandmarkRecorder
+from latency_probe import LatencyProbe, RateMeter
+from frame_buffers import to_rgb, mirror_result
+import touchpad_logic as logic  # gesture thresholds and state live there
+from gesture_classifier import load_classifier
 
 cv2.setUseOptimized(True)
 cv2.setNumThreads(0)
@@ -44,447 +55,107 @@ except Exception:
 user32 = ctypes.windll.user32
 SCREEN_W = user32.GetSystemMetrics(0)
 SCREEN_H = user32.GetSystemMetrics(1)
-hud_buffer = np.zeros((SCREEN_H, SCREEN_W, 3), dtype=np.uint8)
-
-# pyautogui.FAILSAFE = False
-# pyautogui.PAUSE = 0.02  # small delay between keys so Alt-Tab UI keeps up
-
-# variables
-gesture = None
-gesture_start_time = 0
-last_seen_time = 0
-cancel_cooldown = 0.6  # seconds
-gesture_cancel_time = 0
-detected_gesture = None
-
-# fingers
-thumb_straight = False
-index_straight = False
-middle_straight = False
-ring_straight = False
-pinky_straight = False
-
-# ok variables
-ok_origin = None
-ok_unitpixels = None
-app_offset = 0
-alt_switch_active = False
-last_target_index = None
-num_apps_cached = 0  # number of Alt-Tab apps on current desktop
-
-# variables for SPEED SWIPE DETECTION
-VX_THRESH = 2.5
-HORIZ_RATIO = 0.7  # How "horizontal" it must be: |vy| <= HORIZ_RATIO * |vx|
-WINDOW_SEC = 0.85  # Time window (seconds) to estimate velocity over recent samples
-TRIGGER_COOLDOWN = 2  # Debounce so one swipe only triggers one hotkey
-
-# Keep recent (t, x, y) samples for velocity estimation
-track_hist = deque()
-last_trigger_time = 0.0
-
-# Cursor trail config
-TRAIL_MAX_POINTS = 40  # how many recent points to keep
-TRAIL_FADE_SEC = 0.5  # how long a point stays visible
-trail = deque(maxlen=TRAIL_MAX_POINTS)
-
-# ---- Pinch-to-Zoom (thumb+index) config/state ----
-zoom_origin = None
-zoom_unitpixel = None
 
-SHOW_PREVIEW = False
-
-
-# helper functions
-def hand_area(landmarks):
-    """
-    returns length of x, length of y, and area
-    """
-    xs = [lm.x for lm in landmarks]
-    ys = [lm.y for lm in landmarks]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
-    return (max_x - min_x), (max_y - min_y), (max_x - min_x) * (max_y - min_y)
+# Key presses are posted to a worker thread (SendInput on Windows), so the
+# vision loop never sleeps on pyautogui.PAUSE
+injector = InputInjector().start()
 
+# per-frame stage timestamps (capture ... emit / present), summarized on exit
+probe = LatencyProbe()
+injector.on_sent = probe.on_action_sent
 
-def palm_area(landmarks):
-    """
-    returns length of x, length of y, and area
-    """
-    xs = [lm.x for lm in landmarks[0:5]]  # wrist + thumb base + index base + pinky base
-    ys = [lm.y for lm in landmarks[0:5]]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
-    return (max_x - min_x), (max_y - min_y), (max_x - min_x) * (max_y - min_y)
-
-
-def finger_straight(mcp, pip, tip, threshold=0.9):
-    v1 = [pip.x - mcp.x, pip.y - mcp.y]
-    v2 = [tip.x - pip.x, tip.y - pip.y]
-    dot = v1[0] * v2[0] + v1[1] * v2[1]
-    norm1 = (v1[0] ** 2 + v1[1] ** 2) ** 0.5
-    norm2 = (v2[0] ** 2 + v2[1] ** 2) ** 0.5
-    if norm1 == 0 or norm2 == 0:
-        return False
-    cos_sim = dot / (norm1 * norm2)
-    return cos_sim >= threshold
-
-
-def calculate_all_straightness(lm):
-    global index_straight, middle_straight, ring_straight, thumb_straight, pinky_straight
-    index_straight = finger_straight(lm[5], lm[6], lm[8])
-    middle_straight = finger_straight(lm[9], lm[10], lm[12])
-    ring_straight = finger_straight(lm[13], lm[14], lm[16])
-    thumb_straight = finger_straight(lm[1], lm[2], lm[4])
-    pinky_straight = finger_straight(lm[17], lm[18], lm[20])
-    return
-
-
-def is_two_gesture(lm):
-    # Returns True if index and middle are pointing in the opposite direction of ring and pinky
-    # by comparing their pip-to-tip vectors using dot product
-    index_pip, index_tip = lm[6], lm[8]
-    middle_pip, middle_tip = lm[10], lm[12]
-    ring_pip, ring_tip = lm[14], lm[16]
-    pinky_pip, pinky_tip = lm[18], lm[20]
-
-    # Get pip-to-tip vectors
-    v_index = [index_tip.x - index_pip.x, index_tip.y - index_pip.y]
-    v_middle = [middle_tip.x - middle_pip.x, middle_tip.y - middle_pip.y]
-    v_ring = [ring_tip.x - ring_pip.x, ring_tip.y - ring_pip.y]
-    v_pinky = [pinky_tip.x - pinky_pip.x, pinky_tip.y - pinky_pip.y]
-
-    # sum_of_ring_pinky_vectors_length = (v_ring[0] ** 2 + v_ring[1] ** 2) ** 0.5 + (v_pinky[0] ** 2 + v_pinky[0] ** 2) ** 0.5
-    # print(f"this is sum: {sum_of_ring_pinky_vectors_length}")
-
-    # Normalize vectors
-    def normalize(v):
-        norm = (v[0] ** 2 + v[1] ** 2) ** 0.5
-        if norm == 0:
-            return [0, 0]
-        return [v[0] / norm, v[1] / norm]
-
-    v_index = normalize(v_index)
-    v_middle = normalize(v_middle)
-    v_ring = normalize(v_ring)
-    v_pinky = normalize(v_pinky)
-
-    im_dot = v_index[0] * v_middle[0] + v_index[1] * v_middle[1]
-    mp_dot = v_middle[0] * v_pinky[0] + v_middle[1] * v_pinky[1]
-    # rp_dot = v_ring[0] * v_pinky[0] + v_ring[1] * v_pinky[1]
-
-    # print(f"imdot: {im_dot:.3f}, mrdot: {mr_dot:.3f}, rpdot: {rp_dot:.3f}")
-    # Threshold for "opposite" direction (dot < -0.7 is about 135 degrees apart)
-    return im_dot > 0.5 and mp_dot < -0.6
-
-
-def is_ok_gesture(lm, close_threshold=0.1):
-    # OK: index tip and thumb tip are close, middle, ring, and pinky are straight
-    index_tip = lm[8]
-    thumb_tip = lm[4]
-    dist = ((index_tip.x - thumb_tip.x) ** 2 + (index_tip.y - thumb_tip.y) ** 2) ** 0.5
-    if dist > close_threshold:
-        return False
-    return not index_straight and middle_straight and ring_straight and pinky_straight
-
-
-def is_three_gesture(lm):
-    # Three: index, middle, ring are straight, thumb and pinky are NOT straight
-    return (
-        index_straight
-        and middle_straight
-        and ring_straight
-        and (not thumb_straight)
-        and (not pinky_straight)
-    )
+# HUD render resolution (1.0 = native, 0.5 = half size, stretched by the window)
+HUD_SCALE = 1.0
+# the HUD is redrawn at this rate on the main thread, independent of inference
+HUD_RENDER_HZ = 60
+# predict the cursor up to this far past the last inference result (0 = off)
+CURSOR_EXTRAPOLATE_SEC = 0.1
 
+SHOW_PREVIEW = False
 
-def is_four_gesture(lm):
-    # Returns True if index, middle, ring, pinky are up, thumb is across palm (not up)
-    # Use dot product to check straightness of each finger
-    # Thumb should NOT be straight
-    # Four: all fingers straight, thumb not straight
-    return (
-        (not thumb_straight)
-        and index_straight
-        and middle_straight
-        and ring_straight
-        and pinky_straight
-    )
-
-
-def is_seven_gesture(lm):
-    # Returns True if index and middle are pointing in the opposite direction of ring and pinky
-    # by comparing their pip-to-tip vectors using dot product
-    index_pip, index_tip = lm[6], lm[8]
-    middle_pip, middle_tip = lm[10], lm[12]
-    ring_pip, ring_tip = lm[14], lm[16]
-    pinky_pip, pinky_tip = lm[18], lm[20]
-
-    # Get pip-to-tip vectors
-    v_index = [index_tip.x - index_pip.x, index_tip.y - index_pip.y]
-    v_middle = [middle_tip.x - middle_pip.x, middle_tip.y - middle_pip.y]
-    v_ring = [ring_tip.x - ring_pip.x, ring_tip.y - ring_pip.y]
-    v_pinky = [pinky_tip.x - pinky_pip.x, pinky_tip.y - pinky_pip.y]
-
-    # sum_of_ring_pinky_vectors_length = (v_ring[0] ** 2 + v_ring[1] ** 2) ** 0.5 + (v_pinky[0] ** 2 + v_pinky[0] ** 2) ** 0.5
-    # print(f"this is sum: {sum_of_ring_pinky_vectors_length}")
-
-    # Normalize vectors
-    def normalize(v):
-        norm = (v[0] ** 2 + v[1] ** 2) ** 0.5
-        if norm == 0:
-            return [0, 0]
-        return [v[0] / norm, v[1] / norm]
-
-    v_index = normalize(v_index)
-    v_middle = normalize(v_middle)
-    v_ring = normalize(v_ring)
-    v_pinky = normalize(v_pinky)
-
-    im_dot = v_index[0] * v_middle[0] + v_index[1] * v_middle[1]
-    mp_dot = v_middle[0] * v_pinky[0] + v_middle[1] * v_pinky[1]
-    # rp_dot = v_ring[0] * v_pinky[0] + v_ring[1] * v_pinky[1]
-
-    # print(f"imdot: {im_dot:.3f}, mpdot: {mp_dot:.3f}, thumb: {thumb_straight}, index: {index_straight}")
-    # Threshold for "opposite" direction (dot < -0.7 is about 135 degrees apart)
-    return im_dot < 0.6 and mp_dot > 0.5 and thumb_straight and index_straight
-
-
-def decide_gesture(lm):
-    calculate_all_straightness(lm)
-    if is_two_gesture(lm):
-        return "two"
-    if is_seven_gesture(lm):
-        return "seven"
-    if is_ok_gesture(lm):
-        return "ok"
-    if is_four_gesture(lm):
-        return "four"
-    # if is_three_gesture(lm):
-    #     return "three"
-    return None
-
-
-def estimate_velocity(samples):
-    """
-    samples: list of (t, x, y) with x,y in pixels
-    Returns (vx, vy) in px/s computed between the oldest and the newest point,
-    and total dx, dy over that window.
-    """
-    if len(samples) < 2:
-        return 0.0, 0.0, 0.0, 0.0
-    t0, x0, y0, _ = samples[0]  # the first point
-    t1, x1, y1, _ = samples[-1]  # the last point
-    # dt = max(1e-3, t1 - t0)
-    dt = t1 - t0
-    vx = (x1 - x0) / dt
-    vy = (y1 - y0) / dt
-    return vx, vy, (x1 - x0), (y1 - y0)
-
-
-def fast_swipe_detector(lm, track_hist, w, h, now):
-    global last_trigger_time
-    # Only evaluate if we have enough recent samples
-    vx, vy, dx, dy = estimate_velocity(list(track_hist))
-    hand_wide_portion = max(0.1, palm_area(lm)[0])  # avoid div by zero
-
-    # Check horizontal dominance and speed
-    fast_enough = abs(vx) / (hand_wide_portion * SCREEN_W) >= VX_THRESH and abs(
-        dy
-    ) <= HORIZ_RATIO * abs(dx)
-    diff_side = (track_hist[0][1] - track_hist[0][3]) * (
-        track_hist[-1][1] - track_hist[-1][3]
-    ) < 0
-
-    # print(f"abs vx: {abs(vx):.3f}, hand width: {hand_wide_portion * SCREEN_W:.3f}, absdy: {abs(dy):.3f}, horiz_ratio x abs(dx): {HORIZ_RATIO * abs(dx):.3f}, fast_enough: {fast_enough}, firstdiff: {track_hist[0][1] - track_hist[0][3]:.3f}, lastdiff: {track_hist[-1][1] - track_hist[-1][3]:.3f}, diff_side: {diff_side}")
-
-    if fast_enough and (now - last_trigger_time) >= TRIGGER_COOLDOWN and diff_side:
-        last_trigger_time = now  # reset window so it won't retrigger from same motion
-        if vx > 0:
-            return 1
-        else:
-            return -1
-    return 0
-
-
-# vvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv alt tab section vvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvvv
-# ---- DWM (skip cloaked windows like UWP background hosts) ----
-dwmapi = ctypes.WinDLL("dwmapi")
-DWMWA_CLOAKED = 14
-
-
-def is_cloaked(hwnd):
-    cloaked = wintypes.DWORD()
-    if (
-        dwmapi.DwmGetWindowAttribute(
-            wintypes.HWND(hwnd),
-            wintypes.DWORD(DWMWA_CLOAKED),
-            ctypes.byref(cloaked),
-            ctypes.sizeof(cloaked),
-        )
-        == 0
-    ):
-        return cloaked.value != 0
-    return False
-
-
-# ---- Alt-Tab eligibility (approx.) ----
-GWL_EXSTYLE = -20
-WS_EX_TOOLWINDOW = 0x00000080
-WS_EX_APPWINDOW = 0x00040000
-GW_OWNER = 4
-
-
-def appears_in_alt_tab(hwnd):
-    if not win32gui.IsWindowVisible(hwnd):
-        return False
-    if not win32gui.GetWindowText(hwnd):
-        return False
-    if is_cloaked(hwnd):
-        return False
-    ex = win32gui.GetWindowLong(hwnd, GWL_EXSTYLE)
-    if ex & WS_EX_TOOLWINDOW:
-        return False
-    owner = win32gui.GetWindow(hwnd, GW_OWNER)
-    if owner and not (ex & WS_EX_APPWINDOW):
-        return False
-    return True
-
-
-# ---- IVirtualDesktopManager for "current desktop only" ----
-class IVirtualDesktopManager(IUnknown):
-    _iid_ = GUID("{A5CD92FF-29BE-454C-8D04-D82879FB3F1B}")
-    _methods_ = [
-        COMMETHOD(
-            [],
-            HRESULT,
-            "IsWindowOnCurrentVirtualDesktop",
-            (["in"], wintypes.HWND, "topLevelWindow"),
-            (["out"], ctypes.POINTER(wintypes.BOOL), "onCurrentDesktop"),
-        ),
-        COMMETHOD(
-            [],
-            HRESULT,
-            "GetWindowDesktopId",
-            (["in"], wintypes.HWND, "topLevelWindow"),
-            (["out"], ctypes.POINTER(GUID), "desktopId"),
-        ),
-        COMMETHOD(
-            [],
-            HRESULT,
-            "MoveWindowToDesktop",
-            (["in"], wintypes.HWND, "topLevelWindow"),
-            (["in"], ctypes.POINTER(GUID), "desktopId"),
-        ),
-    ]
-
-
-CoInitialize()
-CLSID_VDM = GUID("{AA509086-5CA9-4C25-8F95-589D3C07B48A}")
-_vdm = CreateObject(CLSID_VDM, interface=IVirtualDesktopManager)
-
-
-def _on_current_desktop(hwnd):
-    try:
-        return bool(_vdm.IsWindowOnCurrentVirtualDesktop(wintypes.HWND(hwnd)))
-    except Exception:
-        return False
-
-
-def get_current_desktop_alt_tab_windows():
-    result = []
-
-    def cb(hwnd, _):
-        if appears_in_alt_tab(hwnd) and _on_current_desktop(hwnd):
-            result.append(hwnd)
-        return True
-
-    win32gui.EnumWindows(cb, None)
-    return result
-
-
-def start_alt_tab_switcher():
-    global alt_switch_active, last_target_index, num_apps_cached
-    if alt_switch_active:
-        return  # already working
-
-    # Count apps on this desktop and show the switcher
-    windows = get_current_desktop_alt_tab_windows()
-    num_apps_cached = max(1, len(windows))  # avoid 0
-
-    # Open the switcher: hold Alt, press Tab once (selection starts at index 1)
-    pyautogui.keyDown("alt")
-    pyautogui.press("tab")
-    alt_switch_active = True
-    last_target_index = 1
-    print(f"[OK] Alt-Tab shown (apps={num_apps_cached})")
-
-
-def update_alt_tab_selection(steps, prefer_dir=None):
-    """
-    Move selection on a circular Alt-Tab ring of size num_apps_cached.
-    1-indexed positions. prefer_dir: 'left' or 'right' to resolve direction.
-    """
-    global last_target_index, ok_origin
-    if not alt_switch_active or num_apps_cached <= 1:
-        return
-
-    N = num_apps_cached
-    # wrap target into 1..N
-    target = ((int(last_target_index + steps) - 1) % N) + 1
-
-    cur = last_target_index or 1  # current selection (1..N)
-
-    # distances on the ring
-    forward = (target - cur) % N  # steps going right
-    backward = (cur - target) % N  # steps going left
-
-    # choose direction
-    if prefer_dir == "left":
-        key = "left"
-        times = backward if backward != 0 else 0
-    elif prefer_dir == "right":
-        key = "right"
-        times = forward if forward != 0 else 0
-    else:
-        # shortest path by default
-        if forward <= backward:
-            key, times = "right", forward
-        else:
-            key, times = "left", backward
+# camera index, "synthetic" or a video file path
+CAMERA_SOURCE = 1
+# run inference and gesture logic on their own worker threads
+PIPELINED = False
+# after the first detection, run the model on a crop around the hand only
+USE_ROI_TRACKER = False
+ROI_INPUT_SIZE = 256  # crop is resized to this square before inference
+MAX_HANDS = 2  # the biggest one is the tracked hand
+# run the model on keyframes only, optical flow carries the landmarks in between
+USE_FLOW_TRACKER = False
+FLOW_MAX_INTERVAL = 6  # frames between keyframes while the hand is still
+# save every frame's raw landmarks for replay (e.g. "session.lmrec"), None = off
+RECORD_LANDMARKS = None
+# live capture -> key / HUD latency percentiles in the top-left corner of the HUD
+SHOW_LATENCY = False
+# gesture model trained with gesture_classifier.py (e.g. "gestures.npz"), None = built-in rules
+GESTURE_MODEL = None
+# --backend legacy (mp.solutions, blocking), tasks (MediaPipe Tasks, LIVE_STREAM)
+# or process (mp.solutions in --workers N processes)
+args = add_backend_args(argparse.ArgumentParser("virtual touchpad")).parse_args()
+
+# ---- Idle mode: nobody gesturing -> low resolution, low inference rate ----
+CAPTURE_RESOLUTION = (1280, 720)
+IDLE_RESOLUTION = (640, 360)  # after logic.IDLE_AFTER_SEC without a hand
+IDLE_FPS = 4  # inference rate while idle
+# while idle a lighter second model (legacy backend) looks for a hand: one hand
+# at most and the lite landmark model. With nobody in view MediaPipe runs only
+# its palm detector; the landmarks run on the one frame that wakes it up.
+IDLE_DETECTOR = True
+idle_last_infer = 0.0
+# tasks / process backends: while waiting for the next camera frame, look for a
+# finished result this often, so it does not sit there until the next frame
+RESULT_POLL_SEC = 0.005
+wake_detect_time = None  # capture time of the frame that ended the idle state
+wake_latencies = []  # detection -> back at full resolution, seconds
+
+# Alt-Tab eligible windows on the current desktop, in z-order. Cached; the
+# WinEvent hooks (installed here, on the HUD thread) mark it stale on changes.
+ALT_TAB_CACHE_TTL = 2.0  # seconds before the window list is re-enumerated anyway
+window_catalog = WindowCatalog(Win32WindowBackend(), ttl=ALT_TAB_CACHE_TTL).watch()
 
-    for _ in range(times):
-        pyautogui.press(key)
+# instantiate objects
+mp_hands = mp.solutions.hands
+mp_draw = mp.solutions.drawing_utils
 
-    last_target_index = target
-    ok_origin[0] += steps * ok_unitpixels
 
+roi_tracker = flow_tracker = None
 
-def end_alt_tab_switcher():
-    global alt_switch_active, last_target_index
-    if not alt_switch_active:
-        return
-    pyautogui.keyUp("alt")  # confirm selection
-    alt_switch_active = False
-    print("[OK] Alt-Tab confirmed")
-    last_target_index = None
 
+def make_detector(make_hands):
+    global roi_tracker, flow_tracker
+    detector = make_hands()
+    if USE_ROI_TRACKER:
+        # crops get their own instance so MediaPipe's tracking state stays consistent
+        detector = roi_tracker = RoiHandTracker(detector, make_hands(), input_size=ROI_INPUT_SIZE, max_hands=MAX_HANDS)
+    if USE_FLOW_TRACKER:
+        detector = flow_tracker = FlowHandTracker(detector, max_interval=FLOW_MAX_INTERVAL)
+    return detector
 
-# ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^ alt tab section ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
-# instantiate objects
-mp_hands = mp.solutions.hands
-mp_draw = mp.solutions.drawing_utils
-hands = mp_hands.Hands(
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7,
-    max_num_hands=2,
-    static_image_mode=False,
+if (USE_ROI_TRACKER or USE_FLOW_TRACKER) and args.backend != "legacy":
+    print(f"[ROI/FLOW] need the legacy backend, {args.backend} runs the model on every full frame")
+    USE_ROI_TRACKER = USE_FLOW_TRACKER = False
+backend = make_hand_backend(
+    args.backend,
+    max_hands=MAX_HANDS,
+    min_detection=0.7,
+    min_tracking=0.7,
+    model_path=args.hand_model,
+    wrap=make_detector,
+    workers=args.workers,
 )
-
-cap = cv2.VideoCapture(1, cv2.CAP_DSHOW)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)  # 1280
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)  # 720
+if IDLE_DETECTOR and args.backend == "legacy":
+    idle_backend = make_hand_backend("legacy", max_hands=1, min_detection=0.7, min_tracking=0.7, model_complexity=0)
+else:
+    # tasks / process: another model instance or worker for idle costs more than it saves
+    idle_backend = backend
+recorder = LandmarkRecorder(RECORD_LANDMARKS) if RECORD_LANDMARKS else None
+
+# frames are read on a background thread; the loop always gets the newest one
+cap = LatestFrameGrabber(
+    open_source(CAMERA_SOURCE, *CAPTURE_RESOLUTION, api=cv2.CAP_DSHOW)
+).start()
 
 # ---------- Transparent, full-screen, click-through overlay ----------
 HUD_WINDOW = "Hand HUD"
@@ -545,327 +216,265 @@ except Exception:
     pass  # non-Windows or missing pywin32
 
 
-def draw_cursor(img, x, y, color=(0, 255, 255)):
-    cv2.circle(img, (x, y), 10, color, -1)
-    cv2.circle(img, (x, y), 20, color, 2)
-    cv2.line(img, (x - 30, y), (x + 30, y), color, 1)
-    cv2.line(img, (x, y - 30), (x, y + 30), color, 1)
+# Only the regions drawn last frame get cleared (see hud_compositor.py)
+hud = HudCompositor(SCREEN_W, SCREEN_H, scale=HUD_SCALE, trail_fade_sec=logic.TRAIL_FADE_SEC)
 
 
-def draw_trail(hud_img, trail_points, now):
-    """
-    hud_img: your transparent HUD (black = transparent)
-    trail_points: deque of (x, y, t)
-    now: current time.time()
-    """
-    if len(trail_points) < 2:
-        return
+# ---- main loop, split into stages so it can also run pipelined (pipeline.py) ----
+# a result an async backend finished between two camera frames; t = capture
+# time of its frame, done = (tag, result) as infer() / poll() return it
+Polled = namedtuple("Polled", "t done")
 
-    # Draw older segments thinner and dimmer
-    # Color is yellow-ish; older => darker
-    for i in range(1, len(trail_points)):
-        x0, y0, t0 = trail_points[i - 1]
-        x1, y1, t1 = trail_points[i]
-
-        # age of the newer endpoint
-        age = now - t1
-        a = 1.0 - min(max(age / TRAIL_FADE_SEC, 0.0), 1.0)  # 1..0
-
-        # Skip fully-faded points
-        if a <= 0.0:
-            continue
-
-        # Thickness and color scale with 'a'
-        thickness = max(1, int(10 * a))
-        # (B, G, R) — darker as it fades
-        color = (int(60 * a), int(220 * a), int(255 * a))
-
-        # Line segment
-        cv2.line(
-            hud_img,
-            (int(x0), int(y0)),
-            (int(x1), int(y1)),
-            color,
-            thickness,
-            lineType=cv2.LINE_AA,
-        )
-        # Small dot at the newer point
-        cv2.circle(
-            hud_img,
-            (int(x1), int(y1)),
-            max(2, int(8 * a)),
-            color,
-            -1,
-            lineType=cv2.LINE_AA,
-        )
 
+def next_frame():
+    """The pipeline's source: the newest camera frame, or a Polled result that came first."""
+    if not backend.asynchronous:
+        return cap.get()
+    while True:
+        grabbed = cap.get(timeout=RESULT_POLL_SEC)
+        if grabbed is not None or not cap.is_running():
+            return grabbed
+        done = backend.poll()  # idle_backend is backend for the async ones
+        if done is not None:
+            return Polled(done[0][0], done)
 
-# Extra dots under/above the middle-tip cursor
-def draw_gesture_points(hud_img, x, y, gesture, offset_px=SCREEN_H/10):
-    """
-    Draw extra points relative to (x,y) based on gesture.
-    two  -> one above
-    ok   -> two under
-    four -> one above + two under
-    """
-    if not gesture:
-        return
 
-    offsets = [(0, 0)]
-    # Configure offsets (dx, dy)
-    if gesture == "two":
-        offsets = [(0, -offset_px)]  # one above
-    elif gesture == "ok":
-        offsets = [(0, offset_px), (0, 2 * offset_px)]  # two under
-    elif gesture == "four":
-        offsets = [
-            (0, -offset_px),
-            (0, offset_px),
-            (0, 2 * offset_px),
-        ]  # 1 above, 2 under
-    elif gesture == "seven":
-        offsets = [
-            (offset_px * 2, -(offset_px)),
-            (-(offset_px), -(offset_px)),
-        ]
-
-    # Style: slightly smaller & dimmer than main cursor
-    for dx, dy in offsets:
-        cx, cy = int(x + dx), int(y + dy)
-        cv2.circle(hud_img, (cx, cy), 8, (40, 210, 255), -1, lineType=cv2.LINE_AA)
-        cv2.circle(hud_img, (cx, cy), 14, (40, 210, 255), 2, lineType=cv2.LINE_AA)
-
-
-# main loop
-while cap.isOpened():
-    success, frame = cap.read()
-    if not success:
-        break
+def on_idle(now, idle):
+    # gesture logic went idle / woke up: switch the camera resolution
+    global wake_detect_time
+    if idle:
+        cap.set_resolution(*IDLE_RESOLUTION)
+        print(f"[IDLE] idling at {IDLE_FPS} fps")
+    else:
+        wake_detect_time = now
+        cap.set_resolution(*CAPTURE_RESOLUTION)
 
-    # Flip frame horizontally (mirror effect)
-    frame = cv2.flip(frame, 1)
-    h, w, _ = frame.shape
-    now = time.time()
 
-    # Convert to RGB for MediaPipe
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    result = hands.process(rgb)
+def draw_hand(frame, hand):
+    if args.backend == "legacy":
+        mp_draw.draw_landmarks(frame, hand, mp_hands.HAND_CONNECTIONS)
+        return
+    # Tasks results are plain objects, draw_landmarks only takes the protobufs
+    h, w = frame.shape[:2]
+    pts = [(int(lm.x * w), int(lm.y * h)) for lm in hand.landmark]
+    for a, b in mp_hands.HAND_CONNECTIONS:
+        cv2.line(frame, pts[a], pts[b], (224, 224, 224), 2)
+    for p in pts:
+        cv2.circle(frame, p, 3, (0, 0, 255), -1)
+
+
+logic.configure(
+    injector,
+    window_catalog,
+    (SCREEN_W, SCREEN_H),
+    idle_hook=on_idle,
+    preview_hook=draw_hand if SHOW_PREVIEW else None,
+    model=load_classifier(GESTURE_MODEL) if GESTURE_MODEL else None,
+)
 
-    if result.multi_hand_landmarks:
-        # Find the biggest hand by bounding box area
-        hand = max(
-            result.multi_hand_landmarks, key=lambda hl: hand_area(hl.landmark)[2]
-        )
 
-        # Draw landmarks and connections for the biggest hand
-        if SHOW_PREVIEW:
-            mp_draw.draw_landmarks(frame, hand, mp_hands.HAND_CONNECTIONS)
-
-        # Draw landmark indices
-        # for id, lm in enumerate(hand.landmark):
-        # cv2.putText(frame, str(id), (int(lm.x * w), int(lm.y * h)), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
-
-        # track middle tip
-        x = int(
-            hand.landmark[12].x * SCREEN_W
-        )  # we make sure these x and y can DEFINITELY reach all screen
-        y = int(hand.landmark[12].y * SCREEN_H)
-        # x = int(x * (SCREEN_W / w))
-
-        # Drop points older than TRAIL_FADE_SEC (time-based fade)
-        trail.append((x, y, now))
-        while trail and (now - trail[0][2]) > TRAIL_FADE_SEC:
-            trail.popleft()
-
-        # detect gesture first
-        detected_gesture = decide_gesture(hand.landmark)
-        if detected_gesture:
-            # hand is detected and gesture is posed
-            if (
-                gesture is not None
-                and gesture != detected_gesture
-                and now - last_seen_time > cancel_cooldown
-            ):
-                # gesture has changed from one to another
-                gesture_cancel_time = now
-                ok_origin = None
-                zoom_origin = None
-                if gesture == "ok":
-                    # if previous gesture is OK, we need to end the alt-tab session
-                    end_alt_tab_switcher()
-                print(
-                    f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
-                )
-                print("======================")
-                print()
-                gesture = detected_gesture
-                gesture_start_time = now
-                print(
-                    f"[DETECT] Gesture '{gesture}' detected at {gesture_start_time:.2f}"
-                )
-                track_hist.clear()
-                trail.clear()
-
-            if gesture is None:
-                # no gesture is being recorded currently, so we have the new gesture.
-                gesture = detected_gesture
-                gesture_start_time = now
-                print(
-                    f"[DETECT] Gesture '{gesture}' detected at {gesture_start_time:.2f}"
-                )
-                track_hist.clear()
-                trail.clear()
-
-            # simply update the last seen time for the gesture
-            if gesture is not None and gesture == detected_gesture:
-                last_seen_time = now
-        else:
-            # hand is detected but no known gesture is posed
-            if gesture is not None and now - last_seen_time > cancel_cooldown:
-                # already past the cd time -> this gesture should be killed!
-                print(
-                    f"[cd] Passed the cd time! last gesture was seen {now - last_seen_time} secs ago, killing..."
-                )
-                gesture_cancel_time = now
-                ok_origin = None
-                zoom_origin = None
-                if gesture == "ok":
-                    end_alt_tab_switcher()
-                print(
-                    f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
-                )
-                print("======================")
-                print()
-                gesture = None
-
-        track_hist.append((now, x, y, hand.landmark[0].x * SCREEN_W))
-        # Keep a sliding window of samples (using middle finger, since it is used in all gestures)
-        # And trim it to the desired time window (WINDOW_SEC)
-        while track_hist and (now - track_hist[0][0]) > WINDOW_SEC:
-            track_hist.popleft()
+def infer(grabbed):
+    """capture -> RGB -> hand model -> mirrored landmarks"""
+    global idle_last_infer
+    model = idle_backend if logic.idle else backend
+    if isinstance(grabbed, Polled):
+        done = grabbed.done  # picked up by next_frame(), no new frame to submit
+    elif logic.idle and grabbed.t - idle_last_infer < 1.0 / IDLE_FPS:
+        # low inference rate: frames in between keep the HUD alive and collect
+        # a result the async backend finished meanwhile
+        probe.begin(grabbed.seq, grabbed.t)
+        probe.count("idle_skipped")
+        done = model.poll()
+        if done is None:
+            return grabbed.t, None, None, grabbed.seq
     else:
-        # hand is not even detected
-        if gesture is not None and now - last_seen_time > cancel_cooldown:
-            # already past the cd time -> this gesture should be killed!
-            gesture_cancel_time = now
-            ok_origin = None
-            zoom_origin = None
-            if gesture == "ok":
-                end_alt_tab_switcher()
-            print(
-                f"[CANCEL] Gesture '{gesture}' cancelled at {gesture_cancel_time:.2f}"
-            )
-            print("======================")
-            print()
-            gesture = None
-
-    if gesture is not None and len(track_hist) >= 3:
-        # Draw gesture name if active
-        if SHOW_PREVIEW:
-            cv2.putText(
-                frame, gesture, (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 255, 0), 4
-            )
+        seq = grabbed.seq
+        probe.begin(seq, grabbed.t)
+        if logic.idle:
+            idle_last_infer = grabbed.t
+        frame = grabbed.image
+        # Convert to RGB for MediaPipe, into a reused buffer; the frame is not
+        # flipped, the landmarks are mirrored afterwards instead
+        rgb = to_rgb(frame)
+        probe.mark(seq, "convert")
+        done = model.infer(rgb, grabbed.t, (grabbed.t, frame, seq))
+        if done is None:
+            # async backend: this frame is in flight and nothing newer is back yet
+            probe.count("inference_pending")
+            return grabbed.t, None, None, seq
+    # the result may belong to an earlier frame than the one just submitted
+    (t, frame, seq), result = done
+    result = mirror_result(result)
+    probe.mark(seq, "inference")
+    if SHOW_PREVIEW:
+        frame = cv2.flip(frame, 1)  # the preview still shows a mirror image
+    # t is the capture time (monotonic), not the time we got around to it
+    return t, frame, result, seq
 
-        if gesture == "two" or gesture == "four":
-            swipe_direction = fast_swipe_detector(hand.landmark, track_hist, w, h, now)
-            if swipe_direction == 1:
-                if gesture == "two":
-                    # switch to previous page
-                    pyautogui.keyDown("alt")
-                    pyautogui.press("left")
-                    pyautogui.keyUp("alt")
-                    print("[SWIPE] FAST LEFT → hotkey fired")
-                else:
-                    # switch to previous desktop
-                    pyautogui.keyDown("ctrl")
-                    pyautogui.keyDown("win")
-                    pyautogui.press("left")
-                    pyautogui.keyUp("win")
-                    pyautogui.keyUp("ctrl")
-                    print("[SWIPE] FAST LEFT → hotkey fired")
-                    time.sleep(0.12)  # let Windows finish switching
-                    create_hud_window()  # HUD is now on the new desktop
-            elif swipe_direction == -1:
-                if gesture == "two":
-                    # switch to next page
-                    pyautogui.keyDown("alt")
-                    pyautogui.press("right")
-                    pyautogui.keyUp("alt")
-                    print("[SWIPE] FAST RIGHT → hotkey fired")
-                else:
-                    # switch to next desktop
-                    pyautogui.keyDown("ctrl")
-                    pyautogui.keyDown("win")
-                    pyautogui.press("right")
-                    pyautogui.keyUp("win")
-                    pyautogui.keyUp("ctrl")
-                    print("[SWIPE] FAST RIGHT → hotkey fired")
-                    time.sleep(0.12)  # let Windows finish switching
-                    create_hud_window()  # HUD is now on the new desktop
-
-        elif gesture == "ok":
-            # 1) on first OK frame, set origin and open Alt-Tab
-            if ok_origin is None:
-                ok_origin = [x, y]  # you compute x,y earlier from landmark[12]
-                start_alt_tab_switcher()
-
-            # 2) map finger x to a target index (1..num_apps_cached)
-            #    index 1 is the first app after the currently active one
-            dx = x - ok_origin[0]
-            # positive dx → move right; negative → left
-            ok_unitpixels = SCREEN_W / (num_apps_cached * 1.5)
-            steps = round(dx / ok_unitpixels)
-            if steps == 0:
-                continue  # no movement
-            prefer_dir = "left" if steps < 0 else ("right" if steps > 0 else None)
-            update_alt_tab_selection(steps, prefer_dir)
-
-        elif gesture == "seven":
-            # 1) on first OK frame, set origin
-            if zoom_origin is None:
-                zoom_origin = [x, y]  # you compute x,y earlier from landmark[12]
-
-            # 2) map finger x to a target index (1..num_apps_cached)
-            #    index 1 is the first app after the currently active one
-            dy = y - zoom_origin[1]
-            # positive dx → move right; negative → left
-            zoom_unitpixel = SCREEN_H / 6  # 6 units should be enough
-            steps = round(dy / zoom_unitpixel)
-
-            if steps < 0:
-                for _ in range(-steps):
-                    pyautogui.hotkey("ctrl", "+")
-            else:
-                for _ in range(steps):
-                    pyautogui.hotkey("ctrl", "-")
-            zoom_origin[1] += steps * zoom_unitpixel
 
+def act(inferred):
+    """Record the raw result, then run the gesture logic (touchpad_logic.act)."""
+    global wake_detect_time
+    now, frame, result, seq = inferred
+    if recorder is not None and result is not None:  # None = skipped idle tick
+        recorder.write(now, result)
+    if (
+        wake_detect_time is not None
+        and not logic.idle
+        and frame is not None
+        and frame.shape[1] == CAPTURE_RESOLUTION[0]
+    ):
+        wake_latencies.append(time.monotonic() - wake_detect_time)
+        wake_detect_time = None
+    injector.tag = seq  # actions posted now belong to this frame
+    snap = logic.act((now, frame, result))
+    injector.tag = None
+    probe.mark(seq, "classify")
+    if snap is None:
+        if result is not None:
+            probe.count("ok_unchanged_skipped")  # OK held still: HUD not redrawn
+        return None
+    snap["seq"] = seq
+    return snap
+
+
+def render(snap, t_render, cursor=None):
+    """
+    t_render: monotonic time of this HUD frame (trail fading is relative to it)
+    cursor:   extrapolated (x, y) to draw instead of the snapshot's position
+    """
     # --------- Render transparent overlay with fingertip cursor ----------
-    hud = hud_buffer
-    hud.fill(0)
-    draw_trail(hud, trail, now)
+    x, y, gesture = snap["x"], snap["y"], snap["gesture"]
+    trail = snap["trail"]
+    if cursor is not None and x is not None:
+        x, y = int(cursor[0]), int(cursor[1])
+        trail = trail + [(x, y, t_render)]  # trail reaches the predicted tip
+    hud.begin_frame()
+    hud.draw_trail(trail, t_render)
     # Draw the cursor always (or only when gesture == "ok" if you prefer)
     if gesture is not None and x is not None and y is not None:
         # Always draw cursor (or restrict to gesture == "ok")
-        draw_cursor(hud, x, y, (0, 255, 255))
-        if gesture == detected_gesture:
-            draw_gesture_points(hud, x, y, gesture)
+        hud.draw_cursor(x, y, (0, 255, 255))
+        if gesture == snap["detected_gesture"]:
+            hud.draw_gesture_points(x, y, gesture)
+
+        if gesture == "ok" and snap["ok_active"]:
+            hud.draw_vline(x, (0, 120, 255))
+
+    if snap.get("alt_tab_target"):
+        (left, top, right, bottom), title = snap["alt_tab_target"]
+        hud.draw_box(left, top, right, bottom, (0, 120, 255))
+        hud.draw_label(title[:60], left + 12, top + 36, (0, 200, 255))
 
-        if gesture is not None and gesture == "ok" and ok_origin is not None:
-            cv2.line(hud, (x, 0), (x, SCREEN_H), (0, 120, 255), 1)
+    if SHOW_LATENCY:
+        rates = f"hud {render_rate.rate():.0f} fps  inference {infer_rate.rate():.0f} fps  "
+        hud.draw_label(rates + probe.hud_text(), 20, 40, (255, 255, 255), font_scale=0.7)
 
     # Black stays transparent; non-black shows up
-    cv2.imshow(HUD_WINDOW, hud)
-    if SHOW_PREVIEW:
-        small = cv2.resize(frame, (640, 360))
+    cv2.imshow(HUD_WINDOW, hud.end_frame())
+    probe.mark(snap["seq"], "present")
+    if SHOW_PREVIEW and snap["frame"] is not None:  # no frame on skipped idle ticks
+        small = cv2.resize(snap["frame"], (640, 360))
         cv2.imshow("Hand Gesture", small)
 
-    if cv2.waitKey(5) & 0xFF == 27 or keyboard.is_pressed("q"):  # Esc to exit
+
+# serial: every stage inline on the gesture thread; pipelined: inference and the
+# gesture logic each get a worker thread. Either way the main thread only owns
+# the HUD window (HighGUI needs that) and redraws it at HUD_RENDER_HZ.
+pipeline = Pipeline(
+    next_frame, [("inference", infer), ("action", act)], threaded=PIPELINED
+).start()
+latest = LatestSnapshot()
+infer_rate = RateMeter()
+render_rate = RateMeter()
+gesture_running = True
+
+
+def gesture_loop():
+    # never waits on the HUD: each result just replaces the previous snapshot
+    while gesture_running:
+        snap = pipeline.get()
+        if snap is None:
+            break
+        latest.publish(snap)
+        infer_rate.tick()
+
+
+gesture_thread = threading.Thread(target=gesture_loop, name="gesture-loop", daemon=True)
+gesture_thread.start()
+
+extrapolator = CursorExtrapolator(max_ahead=CURSOR_EXTRAPOLATE_SEC)
+seen_version = 0
+period = 1.0 / HUD_RENDER_HZ
+next_frame = time.monotonic()
+while gesture_thread.is_alive():
+    version, snap = latest.latest()
+    t_render = time.monotonic()
+    if snap is not None:
+        if version != seen_version:
+            seen_version = version
+            if snap["x"] is None or snap["gesture"] is None:
+                extrapolator.reset()
+            else:
+                extrapolator.update(snap["now"], snap["x"], snap["y"])
+        if logic.hud_needs_recreate:
+            logic.hud_needs_recreate = False
+            create_hud_window()  # HUD is now on the new desktop
+        cursor = extrapolator.predict(t_render) if CURSOR_EXTRAPOLATE_SEC > 0 else None
+        render(snap, t_render, cursor)
+        render_rate.tick(t_render)
+
+    # waitKey is both the frame pacing sleep and the window message pump
+    next_frame += period
+    wait_ms = max(1, int((next_frame - time.monotonic()) * 1000))
+    if wait_ms > 2 * period * 1000:  # fell far behind (e.g. window recreated): resync
+        next_frame = time.monotonic()
+    if cv2.waitKey(wait_ms) & 0xFF == 27 or keyboard.is_pressed("q"):  # Esc to exit
         break
 
-cap.release()
-end_alt_tab_switcher()
+gesture_running = False
+pipeline.stop()
+cap.release()  # unblocks a serial pipeline waiting for the next frame
+gesture_thread.join(timeout=2.0)
+print(pipeline.report())
+print(f"[CAP] {cap.stats()}")
+probe.count("camera_dropped", cap.stats()["dropped"])
+print(probe.report("LATENCY"))
+logic.end_alt_tab_switcher()
+injector.stop()
+print(f"[INPUT] {injector.stats()}")
+if logic.SMOOTH_LANDMARKS:
+    print(f"[SMOOTH] filter resets: {logic.landmark_filter.resets}")
+if logic.gesture_model is not None:
+    print(f"[GESTURE] {GESTURE_MODEL}: {logic.low_confidence_frames} frames below "
+          f"{logic.GESTURE_MIN_CONFIDENCE} confidence ignored")
+if recorder is not None:
+    recorder.close()
+    print(f"[REC] {recorder.frames} frames -> {recorder.path}")
+window_catalog.backend.close()
+print(f"[WINDOWS] {window_catalog.stats()}")
 cv2.destroyAllWindows()
-hands.close()
+backend.close()
+print(f"[INFER] {args.backend}: {backend.stats()}")
+if idle_backend is not backend:
+    idle_backend.close()
+    print(f"[INFER] idle detector: {idle_backend.stats()}")
+if roi_tracker is not None:
+    print(f"[ROI] {roi_tracker.stats()}")
+if flow_tracker is not None:
+    print(f"[FLOW] {flow_tracker.stats()}")
+if wake_latencies:
+    print(
+        f"[IDLE] {len(wake_latencies)} wake-ups, latency avg "
+        f"{np.mean(wake_latencies) * 1000:.0f} ms, max {np.max(wake_latencies) * 1000:.0f} ms "
+        f"(+ up to {1000 / IDLE_FPS:.0f} ms until the idle detector runs)"
+    )
+
+hud_stats = hud.stats()
+print(
+    f"[HUD] avg {hud_stats['avg_pixels_touched']:.0f} px touched/frame "
+    f"({hud_stats['avg_touched_ratio'] * 100:.1f}% of {hud_stats['buffer_pixels']} px), "
+    f"{render_rate.total} HUD frames for {infer_rate.total} inference results"
+)
 
 """ TODO: minimalize it! too fat"""
\ No newline at end of file
@@ -0,0 +1,393 @@
+# window_catalog.py — cached list of the Alt-Tab windows on the current desktop
+#
+# Enumerating every top-level window through the DWM / style / COM virtual
+# desktop checks is slow, and the list rarely changes while a gesture is held.
+# WindowCatalog keeps the eligible windows in z-order and only re-enumerates
+# after a change notification or when the cache is older than `ttl` seconds.
+# All OS calls sit behind a backend so the catalog logic runs on Linux too.
+import threading
+import time
+
+
+class WindowCatalog:
+    def __init__(self, backend, ttl=2.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._windows = []  # hwnds in z-order, [0] is the foreground window
+        self._titles = {}
+        self._stamp = None  # monotonic time of the last refresh
+        self._dirty = True
+
+        # counters
+        self.refreshes = 0
+        self.hits = 0
+
+    def watch(self):
+        """Subscribe to the backend's window change notifications (if it has any)."""
+        watch = getattr(self.backend, "watch", None)
+        if watch is not None:
+            watch(self.invalidate)
+        return self
+
+    def invalidate(self, *_):
+        self._dirty = True
+
+    def refresh(self):
+        wins = [hwnd for hwnd in self.backend.enum_windows() if self.backend.is_eligible(hwnd)]
+        titles = {hwnd: self.backend.title(hwnd) for hwnd in wins}
+        with self._lock:
+            self._windows = wins
+            self._titles = titles
+            self._stamp = time.monotonic()
+            self._dirty = False
+            self.refreshes += 1
+        return wins
+
+    def windows(self):
+        """Eligible windows in z-order (cached)."""
+        if self._dirty or self._stamp is None or time.monotonic() - self._stamp > self.ttl:
+            return self.refresh()
+        self.hits += 1
+        return self._windows
+
+    def __len__(self):
+        return len(self.windows())
+
+    def at(self, index):
+        """Window at Alt-Tab position `index` (0 = current window), wrapped around."""
+        wins = self.windows()
+        if not wins:
+            return None
+        return wins[index % len(wins)]
+
+    def title(self, hwnd):
+        return self._titles.get(hwnd, "")
+
+    def rect(self, hwnd):
+        return self.backend.rect(hwnd)
+
+    def focus(self, hwnd):
+        """Bring hwnd to the front directly; the z-order changed, so drop the cache."""
+        ok = self.backend.focus(hwnd)
+        self.invalidate()
+        return ok
+
+    def stats(self):
+        return {"refreshes": self.refreshes, "hits": self.hits, "windows": len(self._windows)}
+
+
+# ---------------- Backends ----------------
+class FakeWindowBackend:
+    """
+    In-memory window manager for tests and benchmarks.
+    windows: list of dicts with hwnd, title, and optionally visible, tool,
+             desktop, rect; list order is the z-order (topmost first).
+    """
+
+    def __init__(self, windows=(), desktop=0, check_cost=0.0):
+        self._wins = [dict(w) for w in windows]
+        self.desktop = desktop
+        self.check_cost = check_cost  # seconds per eligibility check, to mimic OS calls
+        self._listeners = []
+        self.enum_calls = 0
+        self.checks = 0
+        self.focused = []
+
+    # -- catalog interface --
+    def enum_windows(self):
+        self.enum_calls += 1
+        return [w["hwnd"] for w in self._wins]
+
+    def is_eligible(self, hwnd):
+        self.checks += 1
+        if self.check_cost:
+            time.sleep(self.check_cost)
+        w = self._get(hwnd)
+        return (
+            w is not None
+            and w.get("visible", True)
+            and bool(w.get("title"))
+            and not w.get("tool", False)
+            and w.get("desktop", 0) == self.desktop
+        )
+
+    def title(self, hwnd):
+        w = self._get(hwnd)
+        return w["title"] if w else ""
+
+    def rect(self, hwnd):
+        w = self._get(hwnd)
+        return w.get("rect", (0, 0, 0, 0)) if w else (0, 0, 0, 0)
+
+    def focus(self, hwnd):
+        w = self._get(hwnd)
+        if w is None:
+            return False
+        self._wins.remove(w)
+        self._wins.insert(0, w)
+        self.focused.append(hwnd)
+        self._notify()
+        return True
+
+    def watch(self, callback):
+        self._listeners.append(callback)
+
+    # -- test helpers --
+    def _get(self, hwnd):
+        for w in self._wins:
+            if w["hwnd"] == hwnd:
+                return w
+        return None
+
+    def _notify(self):
+        for cb in self._listeners:
+            cb()
+
+    def add(self, window, notify=True):
+        self._wins.insert(0, dict(window))
+        if notify:
+            self._notify()
+
+    def remove(self, hwnd, notify=True):
+        self._wins = [w for w in self._wins if w["hwnd"] != hwnd]
+        if notify:
+            self._notify()
+
+    def switch_desktop(self, desktop, notify=True):
+        self.desktop = desktop
+        if notify:
+            self._notify()
+
+
+class Win32WindowBackend:
+    """Real windows through pywin32, DWM and IVirtualDesktopManager (Windows only)."""
+
+    DWMWA_CLOAKED = 14
+    GWL_EXSTYLE = -20
+    WS_EX_TOOLWINDOW = 0x00000080
+    WS_EX_APPWINDOW = 0x00040000
+    GW_OWNER = 4
+    SW_RESTORE = 9
+    VK_MENU = 0x12
+    KEYEVENTF_KEYUP = 0x0002
+
+    # events that can change the Alt-Tab list
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_CREATE = 0x8000
+    EVENT_OBJECT_HIDE = 0x8003  # CREATE, DESTROY, SHOW, HIDE
+    EVENT_OBJECT_CLOAKED = 0x8017
+    EVENT_OBJECT_UNCLOAKED = 0x8018
+    WINEVENT_SKIPOWNPROCESS = 0x0002
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        import win32gui
+
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._win32gui = win32gui
+        self._user32 = ctypes.windll.user32
+        self._dwmapi = ctypes.WinDLL("dwmapi")
+        # COM objects belong to the thread that created them, and the catalog is
+        # refreshed from the gesture loop / pipeline workers, so every calling
+        # thread initializes COM and gets its own IVirtualDesktopManager
+        self._local = threading.local()
+        self.desktop_check_errors = 0
+        self._hooks = []
+        self._hook_proc = None
+
+    def enum_windows(self):
+        result = []
+
+        def cb(hwnd, _):
+            result.append(hwnd)
+            return True
+
+        self._win32gui.EnumWindows(cb, None)
+        return result
+
+    def _is_cloaked(self, hwnd):
+        ctypes, wintypes = self._ctypes, self._wintypes
+        cloaked = wintypes.DWORD()
+        if (
+            self._dwmapi.DwmGetWindowAttribute(
+                wintypes.HWND(hwnd),
+                wintypes.DWORD(self.DWMWA_CLOAKED),
+                ctypes.byref(cloaked),
+                ctypes.sizeof(cloaked),
+            )
+            == 0
+        ):
+            return cloaked.value != 0
+        return False
+
+    def _appears_in_alt_tab(self, hwnd):
+        g = self._win32gui
+        if not g.IsWindowVisible(hwnd):
+            return False
+        if not g.GetWindowText(hwnd):
+            return False
+        if self._is_cloaked(hwnd):
+            return False
+        ex = g.GetWindowLong(hwnd, self.GWL_EXSTYLE)
+        if ex & self.WS_EX_TOOLWINDOW:
+            return False
+        owner = g.GetWindow(hwnd, self.GW_OWNER)
+        if owner and not (ex & self.WS_EX_APPWINDOW):
+            return False
+        return True
+
+    def _vdm(self):
+        vdm = getattr(self._local, "vdm", None)
+        if vdm is None:
+            vdm = self._local.vdm = _create_virtual_desktop_manager()
+        return vdm
+
+    def _on_current_desktop(self, hwnd):
+        try:
+            return bool(self._vdm().IsWindowOnCurrentVirtualDesktop(self._wintypes.HWND(hwnd)))
+        except Exception as e:
+            # keep the window rather than empty the whole catalog on a COM failure
+            self.desktop_check_errors += 1
+            if not getattr(self._local, "warned", False):
+                self._local.warned = True
+                print(f"[WINDOWS] virtual desktop check failed on thread "
+                      f"{threading.current_thread().name}: {e!r}")
+            return True
+
+    def is_eligible(self, hwnd):
+        return self._appears_in_alt_tab(hwnd) and self._on_current_desktop(hwnd)
+
+    def title(self, hwnd):
+        return self._win32gui.GetWindowText(hwnd)
+
+    def rect(self, hwnd):
+        try:
+            return self._win32gui.GetWindowRect(hwnd)
+        except Exception:
+            return (0, 0, 0, 0)
+
+    def focus(self, hwnd):
+        g = self._win32gui
+        try:
+            if g.IsIconic(hwnd):
+                g.ShowWindow(hwnd, self.SW_RESTORE)
+            # a synthetic Alt tap lets a background process take the foreground
+            self._user32.keybd_event(self.VK_MENU, 0, 0, 0)
+            self._user32.keybd_event(self.VK_MENU, 0, self.KEYEVENTF_KEYUP, 0)
+            g.SetForegroundWindow(hwnd)
+            return True
+        except Exception:
+            return False
+
+    def watch(self, callback):
+        """
+        WinEvent hooks for window create/destroy/show/hide/cloak and foreground
+        changes. Out-of-context hooks fire on the installing thread while it
+        pumps messages (cv2.waitKey does), so install from the HUD thread.
+        """
+        ctypes, wintypes = self._ctypes, self._wintypes
+        WINEVENTPROC = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+
+        def proc(hook, event, hwnd, id_object, id_child, thread, time_ms):
+            if id_object == 0 and id_child == 0:  # OBJID_WINDOW, the window itself
+                callback()
+
+        self._hook_proc = WINEVENTPROC(proc)  # keep a reference alive
+        for lo, hi in (
+            (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND),
+            (self.EVENT_OBJECT_CREATE, self.EVENT_OBJECT_HIDE),
+            (self.EVENT_OBJECT_CLOAKED, self.EVENT_OBJECT_UNCLOAKED),
+        ):
+            hook = self._user32.SetWinEventHook(
+                lo, hi, 0, self._hook_proc, 0, 0, self.WINEVENT_SKIPOWNPROCESS
+            )
+            if hook:
+                self._hooks.append(hook)
+
+    def close(self):
+        for hook in self._hooks:
+            self._user32.UnhookWinEvent(hook)
+        self._hooks = []
+
+
+def _create_virtual_desktop_manager():
+    """
+    IVirtualDesktopManager for "current desktop only" checks. Initializes COM on
+    the calling thread; the object is only valid on that thread.
+    """
+    import ctypes
+    from ctypes import wintypes
+    from comtypes import GUID, IUnknown, COMMETHOD, HRESULT, CoInitialize
+    from comtypes.client import CreateObject
+
+    class IVirtualDesktopManager(IUnknown):
+        _iid_ = GUID("{A5CD92FF-29BE-454C-8D04-D82879FB3F1B}")
+        _methods_ = [
+            COMMETHOD(
+                [],
+                HRESULT,
+                "IsWindowOnCurrentVirtualDesktop",
+                (["in"], wintypes.HWND, "topLevelWindow"),
+                (["out"], ctypes.POINTER(wintypes.BOOL), "onCurrentDesktop"),
+            ),
+            COMMETHOD(
+                [],
+                HRESULT,
+                "GetWindowDesktopId",
+                (["in"], wintypes.HWND, "topLevelWindow"),
+                (["out"], ctypes.POINTER(GUID), "desktopId"),
+            ),
+            COMMETHOD(
+                [],
+                HRESULT,
+                "MoveWindowToDesktop",
+                (["in"], wintypes.HWND, "topLevelWindow"),
+                (["in"], ctypes.POINTER(GUID), "desktopId"),
+            ),
+        ]
+
+    CoInitialize()
+    CLSID_VDM = GUID("{AA509086-5CA9-4C25-8F95-589D3C07B48A}")
+    return CreateObject(CLSID_VDM, interface=IVirtualDesktopManager)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark on the fake backend: opening the switcher 200 times with and
+# without the cache (test_window_catalog.py checks the cache logic).
+#   python window_catalog.py
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    N_WINDOWS = 120  # a typical desktop has far more top-level windows than Alt-Tab shows
+    wins = [
+        {"hwnd": 1000 + i, "title": f"window {i}" if i % 3 else "", "tool": i % 7 == 0, "desktop": i % 2}
+        for i in range(N_WINDOWS)
+    ]
+    backend = FakeWindowBackend(wins, check_cost=20e-6)
+
+    t0 = time.perf_counter()
+    for _ in range(200):
+        uncached = [h for h in backend.enum_windows() if backend.is_eligible(h)]
+    t_uncached = (time.perf_counter() - t0) / 200
+
+    backend.checks = backend.enum_calls = 0
+    catalog = WindowCatalog(backend, ttl=2.0).watch()
+    t0 = time.perf_counter()
+    for _ in range(200):
+        cached = catalog.windows()
+    t_cached = (time.perf_counter() - t0) / 200
+
+    print(f"{N_WINDOWS} top-level windows, {len(cached)} eligible")
+    print(f"re-enumerate every time: {t_uncached * 1e3:7.3f} ms per open")
+    print(f"catalog                : {t_cached * 1e3:7.3f} ms per open  {catalog.stats()}")
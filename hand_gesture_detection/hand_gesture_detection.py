@@ -1,7 +1,15 @@
 # Remember to use 3.8 ~ 3.11
+import os
+import sys
 import cv2
 import mediapipe as mp
 
+# reuse the threaded grabber from the plugin scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "FloWorkPlugin", "src", "Actions", "python_scripts"))
+from frame_grabber import LatestFrameGrabber, open_source
+from frame_buffers import to_rgb, mirror_image, mirror_result
+
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 hands = mp_hands.Hands(
@@ -25,21 +33,21 @@ hands = mp_hands.Hands(
 # cv2.destroyAllWindows()
 # LOOP
 
-cap = cv2.VideoCapture(5) # this number would vary across diff machines, figure them out with the "LOOP", and change it into your own
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+CAMERA_SOURCE = 5 # this number would vary across diff machines, figure them out with the "LOOP", and change it into your own ("synthetic" or a video path also work)
+cap = LatestFrameGrabber(open_source(CAMERA_SOURCE, 1280, 720)).start()
 
-while cap.isOpened():
+while cap.is_running():
     success, frame = cap.read()
     if not success:
         break
 
-    # Flip frame horizontally (mirror effect)
-    frame = cv2.flip(frame, 1)
+    # Convert to RGB for MediaPipe (into a reused buffer) and run it on the raw
+    # image; the landmarks are mirrored afterwards
+    rgb_frame = to_rgb(frame)
+    result = mirror_result(hands.process(rgb_frame))
 
-    # Convert to RGB for MediaPipe
-    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    result = hands.process(rgb_frame)
+    # Flip frame horizontally (mirror effect), only for display
+    frame = mirror_image(frame)
 
     if result.multi_hand_landmarks:
         for hand_landmarks in result.multi_hand_landmarks: